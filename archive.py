@@ -0,0 +1,82 @@
+"""
+Archivace dohraných her - komprimovaný JSON snímek a jeho zpětné načtení
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+import config
+import models
+
+ARCHIVE_FORMAT = "zradci-archive"
+ARCHIVE_VERSION = 1
+
+
+def default_path(game_id: int) -> str:
+    """Výchozí cesta archivu hry"""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(config.ARCHIVE_DIR, f"hra-{game_id}-{stamp}.json.gz")
+
+
+def archive_game(path: Optional[str] = None) -> str:
+    """Uložení aktuální (dohrané) hry do archivu a její smazání z živé databáze - vrací cestu archivu"""
+    game_id = models.current_game()
+    state = models.get_game_state()
+    if not state or not state['finished']:
+        raise ValueError(f"Hra {game_id} ještě neskončila")
+    if models.count_pending_outbox():
+        raise ValueError(f"Hra {game_id} má nedoručené emaily - spusťte 'zradci mailer --once'")
+
+    archive = {
+        "format": ARCHIVE_FORMAT,
+        "version": ARCHIVE_VERSION,
+        "schema_version": models.get_schema_version(),
+        "game_id": game_id,
+        "archived_at": datetime.now().isoformat(),
+        "tables": models.dump_game(),
+    }
+
+    path = path or default_path(game_id)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Nejdřív bezpečně zapsat archiv, teprve potom mazat z databáze
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            f.write(json.dumps(archive, ensure_ascii=False).encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+    models.reset_game()
+    return path
+
+
+def read_archive(path: str) -> dict:
+    """Načtení a kontrola archivu ze souboru"""
+    with gzip.open(path, "rb") as f:
+        archive = json.loads(f.read().decode("utf-8"))
+
+    if archive.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"{path} není archiv hry Zrádci")
+    if archive.get("version", 0) > ARCHIVE_VERSION:
+        raise ValueError(f"Archiv {path} má novější formát ({archive['version']}), aktualizujte aplikaci")
+    return archive
+
+
+def open_archive(path: str) -> int:
+    """Otevření archivu jako úložiště jen pro čtení - vrací ID archivované hry"""
+    archive = read_archive(path)
+
+    storage = models.MemoryStorage()
+    models.set_storage(storage)
+    models.init_db()
+    with models.use_game(archive["game_id"]):
+        models.load_game(archive["tables"])
+
+    # Od teď už jen čtení
+    models.close_db()
+    storage.read_only = True
+    return archive["game_id"]
@@ -0,0 +1,93 @@
+"""
+Benchmark emailové pipeline proti lokálnímu devmail serveru
+
+Měří rozeslání hromadné zprávy všem hráčům (outbox -> mailer -> SMTP) a načtení
+hlasů z příchozích emailů (IMAP -> voting) pro různé počty hráčů. Hra běží
+v paměti, produkční databáze ani skutečný poskytovatel se nepoužijí.
+
+    python benchmark_mail.py --players 10 100 1000 --latency 0.001
+"""
+import argparse
+import contextlib
+import io
+import time
+from email.message import EmailMessage
+
+import config
+import devmail
+import mailer
+import models
+import voting
+
+GAME_ADDRESS = "hra@zradci.test"
+
+
+def _vote_email(voter: str, target_id: int) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = voter
+    msg["To"] = GAME_ADDRESS
+    msg["Subject"] = "Re: Hra Zrádci"
+    msg.set_content(str(target_id))
+    return msg.as_bytes()
+
+
+def run_case(server: devmail.DevMailServer, players: int) -> dict:
+    """Jedno měření pro daný počet hráčů - vrací naměřené hodnoty"""
+    result = {"players": players}
+    with models.use_storage(models.MemoryStorage()):
+        models.init_db()
+        emails = [f"hrac{i}@example.com" for i in range(players)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            ids = [models.add_player(f"Hráč {i}", email) for i, email in enumerate(emails)]
+        models.init_game_state()
+
+        # Rozeslání: stejný text všem (jako oznámení fáze)
+        transactions = server.smtp_transactions
+        started = time.perf_counter()
+        models.enqueue_messages([(email, "🌙 Padla noc. Zrádci volí.") for email in emails], "Hra Zrádci")
+        with contextlib.redirect_stdout(io.StringIO()):
+            delivered = mailer.deliver_pending()
+        elapsed = time.perf_counter() - started
+        result["sent"] = delivered["sent"]
+        result["retry"] = delivered["retry"]
+        result["send_s"] = elapsed
+        result["send_rate"] = delivered["sent"] / elapsed if elapsed else 0.0
+        result["smtp_tx"] = server.smtp_transactions - transactions
+
+        # Příjem: každý hráč pošle jeden hlas
+        models.update_game_phase(config.PHASE_DAY_VOTE)
+        inbox = server.inbox(GAME_ADDRESS)
+        for i, email in enumerate(emails):
+            inbox.append(_vote_email(email, ids[(i + 1) % players]))
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            recorded = voting.ingest_email_votes()
+        elapsed = time.perf_counter() - started
+        result["votes"] = recorded
+        result["ingest_s"] = elapsed
+        result["ingest_rate"] = recorded / elapsed if elapsed else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rozesílání a příjmu emailů (devmail)")
+    parser.add_argument("--players", type=int, nargs="+", default=[10, 100, 1000], help="Počty hráčů")
+    parser.add_argument("--latency", type=float, default=0.0, help="Zpoždění odpovědí serveru (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Podíl dočasně odmítnutých zpráv")
+    parser.add_argument("--seed", type=int, default=1, help="Seed náhodných chyb")
+    args = parser.parse_args()
+
+    with devmail.DevMailServer(latency=args.latency, fail_rate=args.fail_rate, seed=args.seed) as server:
+        server.configure(GAME_ADDRESS)
+        print(f"{'hráčů':>6} {'odesláno':>9} {'SMTP tx':>8} {'opakovat':>9} {'zpráv/s':>9} "
+              f"{'hlasů':>6} {'hlasů/s':>9}")
+        for players in args.players:
+            r = run_case(server, players)
+            print(
+                f"{r['players']:>6} {r['sent']:>9} {r['smtp_tx']:>8} {r['retry']:>9} {r['send_rate']:>9.0f} "
+                f"{r['votes']:>6} {r['ingest_rate']:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
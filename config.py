@@ -9,10 +9,35 @@ load_dotenv(override=False)
 # Email konfigurace
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.seznam.cz")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
-SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", str(SMTP_PORT == 465)).lower() == "true"  # TLS od začátku spojení (port 465)
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"  # Jinak STARTTLS
 EMAIL_FROM = os.getenv("EMAIL_FROM", "")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "")
 IMAP_SERVER = os.getenv("IMAP_SERVER", "imap.seznam.cz")
+IMAP_PORT = int(os.getenv("IMAP_PORT", "993"))
+IMAP_USE_SSL = os.getenv("IMAP_USE_SSL", "true").lower() == "true"
+MAIL_CAFILE = os.getenv("MAIL_CAFILE") or None  # Vlastní CA pro TLS (např. certifikát lokálního devmail)
+IMAP_IDLE_TIMEOUT = 300  # Jak dlouho nejvýš trvá jeden IMAP IDLE, pak se obnoví (RFC 2177: < 29 min)
+IMAP_POLL_INTERVAL = 30  # Interval kontroly schránky, když server IDLE neumí (sekundy)
+IMAP_FETCH_BATCH = 200  # Počet zpráv stažených jedním příkazem FETCH
+IMAP_BODY_LIMIT = 2048  # Kolik bajtů textu zprávy se stahuje (hlas je na prvním řádku, přílohy ne)
+IMAP_RECONNECT_MAX = 300  # Maximální prodleva před novým připojením po výpadku IMAP (sekundy)
+EMAIL_CHECK_DELIVERABILITY = os.getenv("EMAIL_CHECK_DELIVERABILITY", "false").lower() == "true"  # DNS ověření domény při registraci
+SMTP_IDLE_TIMEOUT = 60  # Po kolika sekundách nečinnosti se SMTP spojení zavře
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))  # Limit pro připojení a každou odpověď SMTP serveru (sekundy)
+SMTP_MAX_WORKERS = 8  # Počet vláken pro souběžné odesílání
+SMTP_MAX_CONNECTIONS = 4  # Limit současných spojení na SMTP server
+SMTP_MAX_RECIPIENTS = 50  # Limit příjemců jedné zprávy u poskytovatele (hromadná oznámení)
+
+# Outbox a mailer
+MAIL_DELIVERY = os.getenv("MAIL_DELIVERY", "worker")  # "worker" = doručuje 'zradci mailer', "inline" = hned po přechodu
+MAILER_INTERVAL = 5  # Jak často mailer kontroluje outbox (sekundy)
+OUTBOX_BATCH_SIZE = 100  # Počet emailů v jedné dávce
+OUTBOX_MAX_ATTEMPTS = 8  # Po tolika neúspěšných pokusech jde email do dead-letter
+OUTBOX_BACKOFF_BASE = 30  # Prodleva před 2. pokusem, každý další se zdvojnásobí (sekundy)
+OUTBOX_BACKOFF_MAX = 3600  # Maximální prodleva mezi pokusy
+OUTBOX_LEASE_SECONDS = 300  # Za jak dlouho se vezme znovu dávka, kterou mailer nedokončil (pád)
+EMAIL_SUBJECT = "Hra Zrádci"
 UPDATE_INTERVAL = float(os.getenv("UPDATE_INTERVAL", 2.0))
 
 # OpenAI API konfigurace
@@ -21,6 +46,19 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
 
 # Databáze
 DATABASE_PATH = "storage.db"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")  # "sqlite" nebo "memory" (simulace, testy)
+DB_BUSY_TIMEOUT_MS = 5000  # Jak dlouho čekat na zámek jiného procesu
+DB_CACHE_SIZE_KB = 8192  # Velikost page cache jednoho připojení
+DB_STATEMENT_CACHE = 256  # Počet připravených dotazů držených v připojení
+DEFAULT_GAME_ID = 1  # Hra, se kterou se pracuje bez přepínače --game
+ARCHIVE_DIR = "archive"  # Kam se ukládají archivy dohraných her
+CHECKPOINT_DIR = "checkpoints"  # Kam se ukládají checkpointy živé databáze
+CHECKPOINT_KEEP = 10  # Kolik nejnovějších checkpointů ponechat
+CHECKPOINT_PAGES = 256  # Počet stránek kopírovaných v jednom kroku zálohy
+EVENT_WRITE_BEHIND = os.getenv("EVENT_WRITE_BEHIND", "0") == "1"  # Komentáře moderátora k událostem na pozadí, mimo fázový přechod
+EVENT_QUEUE_SIZE = 1000  # Kapacita fronty událostí (plná fronta zdrží přechod = backpressure)
+EVENT_BATCH_SIZE = 50  # Maximum komentářů doplněných v jedné transakci
+EVENT_FLUSH_TIMEOUT = float(os.getenv("EVENT_FLUSH_TIMEOUT", "5"))  # Jak dlouho při ukončení procesu čekat na komentáře (s)
 
 # Herní nastavení
 MIN_PLAYERS = 6
@@ -48,6 +86,11 @@ PHASE_GAME_OVER = "konec_hry"
 ROLE_TRAITOR = "zrádce"
 ROLE_FAITHFUL = "věrný"
 
+# Vítěz (hodnota game_state.winner) a jeho zobrazení
+WINNER_TRAITORS = "traitors"
+WINNER_FAITHFUL = "faithful"
+WINNER_NAMES = {WINNER_TRAITORS: "ZRÁDCI", WINNER_FAITHFUL: "VĚRNÍ"}
+
 # Zprávy
 MESSAGES = {
     "game_start": "🎮 Hra Zrádci začíná! Obdržíte svou roli v soukromé zprávě.",
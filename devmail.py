@@ -0,0 +1,643 @@
+"""
+Lokální SMTP + IMAP server pro vývoj, testy a benchmarky (náhrada poskytovatele)
+
+Umí jen to, co používají email_sender a email_receiver: SMTP s AUTH PLAIN/LOGIN
+a STARTTLS, IMAP s LOGIN, SELECT, SEARCH, FETCH, STORE (i přes UID) a IDLE. Poštu drží v paměti
+nebo v maildiru, volitelně přidává zpoždění a náhodné dočasné chyby.
+
+    with DevMailServer() as server:
+        server.configure("hra@zradci.test", "heslo")
+        ...  # email_sender / email_receiver teď mluví s lokálním serverem
+
+Samostatně: python devmail.py --smtp-port 2525 --imap-port 1143
+"""
+import base64
+import mailbox
+import os
+import random
+import re
+import select
+import socketserver
+import ssl
+import threading
+import time
+from email.utils import parseaddr
+from typing import Dict, List, Optional
+
+import config
+
+
+# === ÚLOŽIŠTĚ POŠTY ===
+
+class DevMessage:
+    """Jedna zpráva ve schránce"""
+    __slots__ = ("uid", "flags", "data", "key")
+
+    def __init__(self, uid: int, data: bytes, flags: Optional[set] = None, key: Optional[str] = None):
+        self.uid = uid
+        self.data = data
+        self.flags = flags if flags is not None else set()
+        self.key = key
+
+
+class Mailbox:
+    """Schránka v paměti - UID rostou od 1, UIDVALIDITY je čas vytvoření"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.messages: List[DevMessage] = []
+        self.uidvalidity = int(time.time())
+        self.uidnext = 1
+        self.changed = threading.Condition(self.lock)
+
+    def append(self, data: bytes) -> DevMessage:
+        with self.lock:
+            message = DevMessage(self.uidnext, data)
+            self.uidnext += 1
+            self.messages.append(message)
+            self._stored(message)
+            self.changed.notify_all()
+            return message
+
+    def set_flags(self, message: DevMessage, flags: set):
+        with self.lock:
+            message.flags = flags
+            self._flags_changed(message)
+
+    def _stored(self, message: DevMessage):
+        pass
+
+    def _flags_changed(self, message: DevMessage):
+        pass
+
+
+class MaildirMailbox(Mailbox):
+    """Schránka v maildiru (přežije restart serveru, lze ji prohlížet běžnými nástroji)"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.maildir = mailbox.Maildir(path, create=True)
+        # Klíče maildiru začínají časem doručení
+        for key in sorted(self.maildir.keys()):
+            stored = self.maildir[key]
+            flags = {"\\Seen"} if "S" in stored.get_flags() else set()
+            self.messages.append(DevMessage(self.uidnext, stored.as_bytes(), flags, key))
+            self.uidnext += 1
+
+    def _stored(self, message: DevMessage):
+        message.key = self.maildir.add(mailbox.MaildirMessage(message.data))
+
+    def _flags_changed(self, message: DevMessage):
+        stored = self.maildir[message.key]
+        stored.set_subdir("cur")
+        stored.set_flags("S" if "\\Seen" in message.flags else "")
+        self.maildir[message.key] = stored
+
+
+class MailStore:
+    """Schránky podle adresy příjemce (v paměti, nebo v maildiru pod `path`)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self._mailboxes: Dict[str, Mailbox] = {}
+        self._lock = threading.Lock()
+
+    def mailbox(self, address: str) -> Mailbox:
+        address = address.lower()
+        with self._lock:
+            if address not in self._mailboxes:
+                if self.path:
+                    self._mailboxes[address] = MaildirMailbox(os.path.join(self.path, address))
+                else:
+                    self._mailboxes[address] = Mailbox()
+            return self._mailboxes[address]
+
+    def deliver(self, recipients: List[str], data: bytes):
+        for recipient in recipients:
+            self.mailbox(recipient).append(data)
+
+    def count(self) -> int:
+        """Počet zpráv ve všech schránkách"""
+        with self._lock:
+            return sum(len(mb.messages) for mb in self._mailboxes.values())
+
+
+# === SPOLEČNÉ ===
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Řádkový protokol s volitelným zpožděním a přechodem na TLS"""
+    # Krátké odpovědi by jinak čekaly na zpožděné ACK klienta (Nagle)
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.devmail: "DevMailServer" = self.server.devmail
+
+    def send_line(self, line: str):
+        if self.devmail.latency:
+            time.sleep(self.devmail.latency)
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+        self.wfile.flush()
+
+    def read_line(self) -> Optional[str]:
+        line = self.rfile.readline(65536)
+        if not line:
+            return None
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    def start_tls(self):
+        self.wfile.flush()
+        self.request = self.devmail.ssl_context.wrap_socket(self.request, server_side=True)
+        self.connection = self.request
+        self.rfile = self.request.makefile("rb")
+        self.wfile = self.request.makefile("wb")
+
+    def check_login(self, user: str, password: str) -> bool:
+        users = self.devmail.users
+        return users is None or users.get(user.lower()) == password
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handler, devmail: "DevMailServer"):
+        self.devmail = devmail
+        super().__init__(address, handler)
+        if devmail.ssl_context is not None and devmail.implicit_tls:
+            self.socket = devmail.ssl_context.wrap_socket(self.socket, server_side=True)
+
+
+# === SMTP ===
+
+class SMTPHandler(_Handler):
+    """SMTP (RFC 5321) - EHLO, STARTTLS, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def handle(self):
+        self.tls = self.devmail.ssl_context is not None and self.devmail.implicit_tls
+        self.user = None
+        self._reset()
+        self.send_line("220 devmail ESMTP připraven")
+
+        while True:
+            line = self.read_line()
+            if line is None:
+                return
+            verb, _, arg = line.partition(" ")
+            verb = verb.upper()
+
+            if verb in ("EHLO", "HELO"):
+                self._reset()
+                if verb == "HELO":
+                    self.send_line("250 devmail")
+                    continue
+                features = ["devmail", "8BITMIME", "SIZE 10485760", "AUTH PLAIN LOGIN"]
+                if self.devmail.ssl_context is not None and not self.tls:
+                    features.append("STARTTLS")
+                for feature in features[:-1]:
+                    self.send_line(f"250-{feature}")
+                self.send_line(f"250 {features[-1]}")
+            elif verb == "STARTTLS" and self.devmail.ssl_context is not None and not self.tls:
+                self.send_line("220 Začínám TLS")
+                self.start_tls()
+                self.tls = True
+            elif verb == "AUTH":
+                self._auth(arg)
+            elif verb == "MAIL":
+                if self.devmail.users is not None and self.user is None:
+                    self.send_line("530 Nejdřív se přihlaste")
+                    continue
+                self._reset()
+                self.sender = self._address(arg)
+                self.send_line("250 OK")
+            elif verb == "RCPT":
+                if self.sender is None:
+                    self.send_line("503 Nejdřív MAIL FROM")
+                    continue
+                address = self._address(arg)
+                refusal = self.devmail.refuse.get(address)
+                if refusal:
+                    self.send_line(refusal)
+                    continue
+                self.recipients.append(address)
+                self.send_line("250 OK")
+            elif verb == "DATA":
+                if not self.recipients:
+                    self.send_line("503 Nejdřív RCPT TO")
+                    continue
+                self.send_line("354 Pište zprávu, konec <CRLF>.<CRLF>")
+                data = self._read_data()
+                if data is None:
+                    return
+                if self.devmail.should_fail():
+                    self.send_line("451 Dočasná chyba (devmail), zkuste později")
+                else:
+                    self.devmail.store.deliver(self.recipients, data)
+                    self.devmail.smtp_transactions += 1
+                    self.send_line("250 OK zpráva přijata")
+                self._reset()
+            elif verb == "RSET":
+                self._reset()
+                self.send_line("250 OK")
+            elif verb == "NOOP":
+                self.send_line("250 OK")
+            elif verb == "QUIT":
+                self.send_line("221 Na shledanou")
+                return
+            else:
+                self.send_line("502 Příkaz není podporován")
+
+    def _reset(self):
+        self.sender = None
+        self.recipients = []
+
+    @staticmethod
+    def _address(arg: str) -> str:
+        # "FROM:<a@b.cz> SIZE=123" / "TO:<a@b.cz>"
+        value = arg.split(":", 1)[1] if ":" in arg else arg
+        return parseaddr(value.strip().split(" ")[0])[1].lower()
+
+    def _auth(self, arg: str):
+        mechanism, _, initial = arg.partition(" ")
+        mechanism = mechanism.upper()
+        try:
+            if mechanism == "PLAIN":
+                if not initial:
+                    self.send_line("334 ")
+                    initial = self.read_line() or ""
+                _, user, password = base64.b64decode(initial).decode("utf-8").split("\0")
+            elif mechanism == "LOGIN":
+                if initial:
+                    user = base64.b64decode(initial).decode("utf-8")
+                else:
+                    self.send_line("334 " + base64.b64encode(b"Username:").decode())
+                    user = base64.b64decode(self.read_line() or "").decode("utf-8")
+                self.send_line("334 " + base64.b64encode(b"Password:").decode())
+                password = base64.b64decode(self.read_line() or "").decode("utf-8")
+            else:
+                self.send_line("504 Nepodporovaný mechanismus")
+                return
+        except ValueError:
+            self.send_line("501 Chybný formát AUTH")
+            return
+
+        if self.check_login(user, password):
+            self.user = user
+            self.send_line("235 Přihlášeno")
+        else:
+            self.send_line("535 Špatné jméno nebo heslo")
+
+    def _read_data(self) -> Optional[bytes]:
+        lines = []
+        while True:
+            line = self.rfile.readline(1 << 20)
+            if not line:
+                return None
+            if line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            if line.startswith(b".."):
+                line = line[1:]
+            lines.append(line)
+
+
+# === IMAP ===
+
+class IMAPHandler(_Handler):
+    """IMAP4rev1 (podmnožina) - CAPABILITY, LOGIN, SELECT, SEARCH, FETCH, STORE, IDLE, NOOP, LOGOUT"""
+
+    def handle(self):
+        self.user = None
+        self.mailbox: Optional[Mailbox] = None
+        self.send_line("* OK devmail IMAP4rev1 připraven")
+
+        while True:
+            line = self.read_line()
+            if line is None:
+                return
+            tag, _, rest = line.partition(" ")
+            command, _, arg = rest.partition(" ")
+            command = command.upper()
+
+            if command == "CAPABILITY":
+                self.send_line(f"* CAPABILITY {self._capabilities()}")
+                self.send_line(f"{tag} OK CAPABILITY hotovo")
+            elif command == "NOOP":
+                self.send_line(f"{tag} OK NOOP hotovo")
+            elif command == "LOGOUT":
+                self.send_line("* BYE devmail končí")
+                self.send_line(f"{tag} OK LOGOUT hotovo")
+                return
+            elif command == "LOGIN":
+                user, password = (_parse_imap_args(arg) + ["", ""])[:2]
+                if self.check_login(user, password):
+                    self.user = user
+                    self.send_line(f"{tag} OK [CAPABILITY {self._capabilities()}] Přihlášeno")
+                else:
+                    self.send_line(f"{tag} NO [AUTHENTICATIONFAILED] Špatné jméno nebo heslo")
+            elif self.user is None:
+                self.send_line(f"{tag} BAD Nejdřív LOGIN")
+            elif command in ("SELECT", "EXAMINE"):
+                self._select(tag, command)
+            elif self.mailbox is None:
+                self.send_line(f"{tag} BAD Nejdřív SELECT")
+            elif command == "SEARCH":
+                self._search(tag, arg)
+            elif command == "FETCH":
+                self._fetch(tag, arg)
+            elif command == "STORE":
+                self._store(tag, arg)
+            elif command == "UID":
+                command, _, arg = arg.partition(" ")
+                handler = {"SEARCH": self._search, "FETCH": self._fetch, "STORE": self._store}.get(command.upper())
+                if handler:
+                    handler(tag, arg, uid=True)
+                else:
+                    self.send_line(f"{tag} BAD UID {command} není podporován")
+            elif command == "IDLE":
+                if not self._idle(tag):
+                    return
+            elif command in ("CLOSE", "UNSELECT"):
+                self.mailbox = None
+                self.send_line(f"{tag} OK {command} hotovo")
+            else:
+                self.send_line(f"{tag} BAD Příkaz není podporován")
+
+    def _capabilities(self) -> str:
+        return "IMAP4rev1 IDLE AUTH=PLAIN"
+
+    def _select(self, tag: str, command: str):
+        self.mailbox = self.devmail.store.mailbox(self.user)
+        with self.mailbox.lock:
+            exists = len(self.mailbox.messages)
+            self.send_line("* FLAGS (\\Seen)")
+            self.send_line(f"* {exists} EXISTS")
+            self.send_line("* 0 RECENT")
+            self.send_line(f"* OK [UIDVALIDITY {self.mailbox.uidvalidity}] UID platné")
+            self.send_line(f"* OK [UIDNEXT {self.mailbox.uidnext}] Další UID")
+        mode = "READ-ONLY" if command == "EXAMINE" else "READ-WRITE"
+        self.send_line(f"{tag} OK [{mode}] {command} hotovo")
+
+    def _messages(self, sequence: str, uid: bool) -> List[tuple]:
+        """[(pořadové číslo, zpráva)] pro sadu čísel zpráv, nebo UID (příkazy UID ...)"""
+        messages = self.mailbox.messages
+        if not uid:
+            return [(n, messages[n - 1]) for n in _parse_sequence(sequence, len(messages))]
+        last_uid = messages[-1].uid if messages else 0
+        wanted = set(_parse_sequence(sequence, last_uid))
+        return [(n, m) for n, m in enumerate(messages, start=1) if m.uid in wanted]
+
+    def _search(self, tag: str, arg: str, uid: bool = False):
+        criteria = arg.upper().split()
+        with self.mailbox.lock:
+            selected = enumerate(self.mailbox.messages, start=1)
+            if "UID" in criteria:
+                selected = self._messages(criteria[criteria.index("UID") + 1], uid=True)
+            found = []
+            for number, message in selected:
+                seen = "\\Seen" in message.flags
+                if ("UNSEEN" in criteria and seen) or ("SEEN" in criteria and not seen):
+                    continue
+                found.append(str(message.uid if uid else number))
+        self.send_line("* SEARCH" + "".join(f" {n}" for n in found))
+        self.send_line(f"{tag} OK SEARCH hotovo")
+
+    def _fetch(self, tag: str, arg: str, uid: bool = False):
+        sequence, _, items = arg.partition(" ")
+        items = items.upper()
+        sections = re.findall(r"(BODY(?:\.PEEK)?\[([A-Z]*)\](?:<(\d+)\.(\d+)>)?|RFC822)", items)
+        with self.mailbox.lock:
+            for number, message in self._messages(sequence, uid):
+                parts = []
+                if uid or "UID" in items:
+                    parts.append(f"UID {message.uid}".encode())
+                if "FLAGS" in items:
+                    parts.append(f"FLAGS ({' '.join(sorted(message.flags))})".encode())
+                for item, section, offset, length in sections:
+                    data = _section(message.data, section)
+                    name = "RFC822" if item == "RFC822" else f"BODY[{section}]"
+                    if offset:
+                        data = data[int(offset):int(offset) + int(length)]
+                        name += f"<{offset}>"
+                    parts.append(f"{name} {{{len(data)}}}\r\n".encode() + data)
+                    if ".PEEK" not in item:
+                        self.mailbox.set_flags(message, message.flags | {"\\Seen"})
+                self.wfile.write(f"* {number} FETCH (".encode() + b" ".join(parts) + b")\r\n")
+        self.send_line(f"{tag} OK FETCH hotovo")
+
+    def _store(self, tag: str, arg: str, uid: bool = False):
+        sequence, _, rest = arg.partition(" ")
+        action, _, flag_list = rest.partition(" ")
+        flags = set(flag_list.strip("()").split())
+        action = action.upper()
+        with self.mailbox.lock:
+            for number, message in self._messages(sequence, uid):
+                if action.startswith("+FLAGS"):
+                    new_flags = message.flags | flags
+                elif action.startswith("-FLAGS"):
+                    new_flags = message.flags - flags
+                else:
+                    new_flags = flags
+                self.mailbox.set_flags(message, new_flags)
+                if not action.endswith(".SILENT"):
+                    uid_item = f"UID {message.uid} " if uid else ""
+                    self.send_line(f"* {number} FETCH ({uid_item}FLAGS ({' '.join(sorted(new_flags))}))")
+        self.send_line(f"{tag} OK STORE hotovo")
+
+    def _idle(self, tag: str) -> bool:
+        """IDLE (RFC 2177) - hlásí nové zprávy, dokud klient nepošle DONE; False = klient odešel"""
+        self.send_line("+ čekám na poštu")
+        with self.mailbox.lock:
+            known = len(self.mailbox.messages)
+        while True:
+            with self.mailbox.changed:
+                if len(self.mailbox.messages) == known:
+                    self.mailbox.changed.wait(0.05)
+                count = len(self.mailbox.messages)
+            if count != known:
+                self.send_line(f"* {count} EXISTS")
+                known = count
+            if self._client_waiting():
+                line = self.read_line()
+                if line is None:
+                    return False
+                if line.upper() == "DONE":
+                    self.send_line(f"{tag} OK IDLE hotovo")
+                    return True
+                self.send_line(f"{tag} BAD Během IDLE se čeká na DONE")
+                return True
+
+    def _client_waiting(self) -> bool:
+        """Má klient něco poslané (bez blokování)"""
+        sock = self.connection
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            return True
+        return bool(select.select([sock], [], [], 0)[0])
+
+
+def _section(data: bytes, section: str) -> bytes:
+    """Část zprávy pro BODY[...]: '' = celá, HEADER = hlavička i s prázdným řádkem, TEXT = tělo"""
+    if not section:
+        return data
+    for separator in (b"\r\n\r\n", b"\n\n"):
+        index = data.find(separator)
+        if index != -1:
+            split = index + len(separator)
+            return data[:split] if section == "HEADER" else data[split:]
+    return data if section == "HEADER" else b""
+
+
+def _parse_imap_args(arg: str) -> List[str]:
+    """Atomy a řetězce v uvozovkách: 'a "b c"' -> ['a', 'b c']"""
+    return [
+        quoted.replace('\\"', '"').replace("\\\\", "\\") if quoted or not atom else atom
+        for quoted, atom in re.findall(r'"((?:[^"\\]|\\.)*)"|(\S+)', arg)
+    ]
+
+
+def _parse_sequence(sequence: str, last: int) -> List[int]:
+    """Sada čísel zpráv '1,3:5,7:*' -> [1, 3, 4, 5, 7, ...] (jen existující)"""
+    numbers = []
+    for part in sequence.split(","):
+        start, _, end = part.partition(":")
+        low = last if start == "*" else int(start)
+        high = low if not end else (last if end == "*" else int(end))
+        if low > high:
+            low, high = high, low
+        numbers.extend(n for n in range(low, high + 1) if 1 <= n <= last)
+    return numbers
+
+
+# === SERVER ===
+
+class DevMailServer:
+    """
+    SMTP + IMAP server na pozadí (vlákna), pro testy a benchmarky.
+
+    Args:
+        host: Adresa, na které server poslouchá
+        smtp_port, imap_port: Porty (0 = libovolný volný)
+        maildir: Složka pro maildir, jinak se pošta drží v paměti
+        certfile, keyfile: Certifikát pro TLS (bez něj server mluví jen nešifrovaně)
+        implicit_tls: TLS hned od spojení (porty 465/993), jinak STARTTLS
+        users: {adresa: heslo}, None = přijme jakékoli přihlášení
+        latency: Zpoždění každé odpovědi serveru (sekundy)
+        fail_rate: Pravděpodobnost dočasné chyby 451 u přijetí zprávy
+        seed: Seed náhodných chyb (reprodukovatelné běhy)
+        refuse: {adresa: odpověď} - odmítnutí příjemce u RCPT, např. "451 4.7.1 Greylisted"
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        smtp_port: int = 0,
+        imap_port: int = 0,
+        maildir: Optional[str] = None,
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+        implicit_tls: bool = False,
+        users: Optional[Dict[str, str]] = None,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        seed: Optional[int] = None,
+        refuse: Optional[Dict[str, str]] = None,
+    ):
+        self.host = host
+        self.store = MailStore(maildir)
+        self.users = {u.lower(): p for u, p in users.items()} if users is not None else None
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.refuse = {a.lower(): reply for a, reply in (refuse or {}).items()}
+        self.implicit_tls = implicit_tls
+        self.smtp_transactions = 0
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        self.ssl_context = None
+        if certfile:
+            self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.ssl_context.load_cert_chain(certfile, keyfile)
+
+        self._smtp = _Server((host, smtp_port), SMTPHandler, self)
+        self._imap = _Server((host, imap_port), IMAPHandler, self)
+        self.smtp_port = self._smtp.server_address[1]
+        self.imap_port = self._imap.server_address[1]
+        self._threads = []
+
+    def should_fail(self) -> bool:
+        if not self.fail_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.fail_rate
+
+    def start(self) -> "DevMailServer":
+        for server in (self._smtp, self._imap):
+            thread = threading.Thread(target=server.serve_forever, daemon=True, name="devmail")
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in (self._smtp, self._imap):
+            server.shutdown()
+            server.server_close()
+        self._threads = []
+
+    def __enter__(self) -> "DevMailServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def configure(self, address: str, password: str = "devmail"):
+        """Nasměrování email_sender a email_receiver (config) na tento server"""
+        tls = self.ssl_context is not None
+        config.SMTP_SERVER = self.host
+        config.SMTP_PORT = self.smtp_port
+        config.SMTP_USE_SSL = tls and self.implicit_tls
+        config.SMTP_USE_TLS = tls
+        config.IMAP_SERVER = self.host
+        config.IMAP_PORT = self.imap_port
+        config.IMAP_USE_SSL = tls and self.implicit_tls
+        config.EMAIL_FROM = address
+        config.EMAIL_PASSWORD = password
+        if self.users is not None:
+            self.users.setdefault(address.lower(), password)
+
+    def inbox(self, address: str) -> Mailbox:
+        """Schránka adresy (pro kontrolu v testech)"""
+        return self.store.mailbox(address)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lokální SMTP + IMAP server pro vývoj hry Zrádci")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--smtp-port", type=int, default=2525)
+    parser.add_argument("--imap-port", type=int, default=1143)
+    parser.add_argument("--maildir", help="Ukládat poštu do maildiru (jinak v paměti)")
+    parser.add_argument("--certfile", help="Certifikát pro TLS")
+    parser.add_argument("--keyfile", help="Klíč k certifikátu")
+    parser.add_argument("--implicit-tls", action="store_true", help="TLS hned od spojení místo STARTTLS")
+    parser.add_argument("--latency", type=float, default=0.0, help="Zpoždění odpovědí (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Podíl dočasně odmítnutých zpráv")
+    args = parser.parse_args()
+
+    server = DevMailServer(
+        args.host, args.smtp_port, args.imap_port, args.maildir, args.certfile, args.keyfile,
+        args.implicit_tls, latency=args.latency, fail_rate=args.fail_rate,
+    )
+    with server:
+        print(f"📮 devmail: SMTP {args.host}:{server.smtp_port}, IMAP {args.host}:{server.imap_port} (Ctrl+C ukončí)")
+        print(
+            f"   SMTP_SERVER={args.host} SMTP_PORT={server.smtp_port} "
+            f"SMTP_USE_SSL={str(args.implicit_tls).lower()} SMTP_USE_TLS={str(bool(args.certfile)).lower()}"
+        )
+        print(f"   IMAP_SERVER={args.host} IMAP_PORT={server.imap_port} IMAP_USE_SSL={str(args.implicit_tls).lower()}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -3,10 +3,15 @@ Email integrace – příjem zpráv od hráčů
 """
 import imaplib
 import email
+import re
+import select
+import threading
+import time
 from email.message import Message
 from email.header import decode_header
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from schemas import Vote
+import models
 import ssl
 import config
 
@@ -18,7 +23,11 @@ def _decode_header(value: Optional[str]) -> str:
     decoded = []
     for text, encoding in parts:
         if isinstance(text, bytes):
-            decoded.append(text.decode(encoding or 'utf-8', errors='replace'))
+            try:
+                decoded.append(text.decode(encoding or 'utf-8', errors='replace'))
+            except LookupError:
+                # Neznámé kódování (např. 'unknown-8bit' u 8bitové hlavičky bez označení) - zkusíme UTF-8
+                decoded.append(text.decode('utf-8', errors='replace'))
         else:
             decoded.append(text)
     return ''.join(decoded)
@@ -39,77 +48,294 @@ def _extract_text(msg: Message) -> str:
     return ''
 
 
-def fetch_unread_messages(mark_as_read: bool = True) -> List[Dict[str, str]]:
+def connect() -> imaplib.IMAP4:
+    """Nové (nepřihlášené) IMAP spojení podle konfigurace"""
+    if config.IMAP_USE_SSL:
+        context = ssl.create_default_context(cafile=config.MAIL_CAFILE)
+        return imaplib.IMAP4_SSL(config.IMAP_SERVER, config.IMAP_PORT, ssl_context=context)
+    return imaplib.IMAP4(config.IMAP_SERVER, config.IMAP_PORT)
+
+
+def is_configured() -> bool:
+    """Je nastavený příjem přes IMAP?"""
+    return bool(config.IMAP_SERVER and config.EMAIL_FROM and config.EMAIL_PASSWORD)
+
+
+def _parse_message(raw_email: bytes) -> Dict[str, str]:
+    msg = email.message_from_bytes(raw_email)
+    return {
+        'from': _decode_header(msg.get('From')),
+        'subject': _decode_header(msg.get('Subject')),
+        'text': _extract_text(msg).strip(),
+        'key': (msg.get('Message-ID') or '').strip(),
+    }
+
+
+def _sync_key() -> str:
+    """Klíč schránky v tabulce imap_sync"""
+    return f"{config.IMAP_SERVER}/{config.EMAIL_FROM.lower()}/INBOX"
+
+
+def _uid_set(uids: List[int]) -> str:
+    """Seřazená UID jako sada pro IMAP s rozsahy: [1, 2, 3, 7] -> '1:3,7'"""
+    ranges = []
+    for uid in uids:
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(str(low) if low == high else f"{low}:{high}" for low, high in ranges)
+
+
+def _select_inbox(imap: imaplib.IMAP4) -> int:
+    """SELECT INBOX - vrací UIDVALIDITY schránky"""
+    status, _ = imap.select('INBOX')
+    if status != 'OK':
+        raise imap.error("INBOX nelze otevřít")
+    _, data = imap.response('UIDVALIDITY')
+    if not data or data[0] is None:
+        raise imap.error("Server neposlal UIDVALIDITY schránky")
+    return int(data[0])
+
+
+def _new_uids(imap: imaplib.IMAP4, uidvalidity: int) -> List[int]:
+    """UID zpráv, které ještě nebyly zpracované (podle uloženého posledního UID)"""
+    sync = models.get_imap_sync(_sync_key())
+    if sync is None or sync[0] != uidvalidity:
+        # První stažení nebo přečíslovaná schránka - začíná se od nepřečtených
+        last_uid = 0
+        status, data = imap.uid('SEARCH', 'UNSEEN')
+    else:
+        last_uid = sync[1]
+        status, data = imap.uid('SEARCH', f'UID {last_uid + 1}:*')
+    if status != 'OK':
+        return []
+    # "N:*" vrací vždy aspoň poslední zprávu, i když má UID menší než N
+    return sorted(uid for uid in map(int, data[0].split()) if uid > last_uid)
+
+
+def _parse_fetch_response(data: list, uidvalidity: int) -> List[Dict[str, str]]:
+    """Zprávy z odpovědi na UID FETCH (hlavička a začátek textu každé zprávy)"""
+    parts = []
+    for item in data:
+        head, literal = item if isinstance(item, tuple) else (item, None)
+        # Nová zpráva začíná pořadovým číslem: b'3 (UID 7 BODY[HEADER] {512}'
+        if re.match(rb'\d+ \(', head):
+            parts.append({'uid': None, 'header': b'', 'text': b''})
+        if not parts:
+            continue
+        match = re.search(rb'UID (\d+)', head)
+        if match:
+            parts[-1]['uid'] = int(match.group(1))
+        if literal is not None:
+            parts[-1]['header' if b'BODY[HEADER]' in head else 'text'] = literal
+    messages = []
+    for part in parts:
+        if part['uid'] is None:
+            continue
+        message = _parse_message(part['header'] + part['text'])
+        # Bez Message-ID identifikuje email schránka a UID (tvar IMAP URL, RFC 5092)
+        if not message['key']:
+            message['key'] = (
+                f"imap://{config.EMAIL_FROM.lower()}@{config.IMAP_SERVER}/INBOX"
+                f";UIDVALIDITY={uidvalidity}/;UID={part['uid']}"
+            )
+        messages.append(message)
+    return messages
+
+
+def _fetch_uids(imap: imaplib.IMAP4, uids: List[int], uidvalidity: int) -> List[Dict[str, str]]:
+    """
+    Stažení zpráv podle UID - jeden FETCH na dávku, jen hlavičky a prvních
+    IMAP_BODY_LIMIT bajtů textu (přílohy se nestahují). PEEK nemění \\Seen.
+    """
+    items = f"(UID BODY.PEEK[HEADER] BODY.PEEK[TEXT]<0.{config.IMAP_BODY_LIMIT}>)"
+    messages: List[Dict[str, str]] = []
+    for start in range(0, len(uids), config.IMAP_FETCH_BATCH):
+        status, data = imap.uid('FETCH', _uid_set(uids[start:start + config.IMAP_FETCH_BATCH]), items)
+        if status != 'OK':
+            raise imap.error(f"FETCH selhal: {data!r}")
+        messages.extend(_parse_fetch_response(data, uidvalidity))
+    return messages
+
+
+def _receive(
+    imap: imaplib.IMAP4,
+    uidvalidity: int,
+    mark_as_read: bool = True,
+    process: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+) -> List[Dict[str, str]]:
+    """
+    Nové zprávy ve vybrané schránce (na už otevřeném spojení)
+
+    Po zpracování (`process`) se zprávy označí jako přečtené jedním STORE
+    a uloží se nejvyšší UID, další stažení začne až za ním.
+    """
+    uids = _new_uids(imap, uidvalidity)
+    if not uids:
+        return []
+
+    messages = _fetch_uids(imap, uids, uidvalidity)
+    if process:
+        process(messages)
+
+    if mark_as_read:
+        imap.uid('STORE', _uid_set(uids), '+FLAGS.SILENT', '(\\Seen)')
+        models.set_imap_sync(_sync_key(), uidvalidity, uids[-1])
+    return messages
+
+
+def fetch_unread_messages(
+    mark_as_read: bool = True,
+    process: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+) -> List[Dict[str, str]]:
     """
-    Načtení nepřečtených emailů
+    Načtení nových emailů (od posledního stažení)
 
     Args:
-        mark_as_read: zda se mají zprávy označit jako přečtené
+        mark_as_read: zda se mají zprávy označit jako přečtené (a příště už nestahovat)
+        process: zpracování zpráv ještě před označením (při chybě se stáhnou znovu)
 
     Returns:
-        List slovníků: {from, subject, text}
+        List slovníků: {from, subject, text, key} (key = Message-ID, jinak IMAP URL zprávy)
     """
-    if not config.IMAP_SERVER or not config.EMAIL_FROM or not config.EMAIL_PASSWORD:
+    if not is_configured():
         print("⚠️  IMAP není nakonfigurováno")
         return []
 
-    messages: List[Dict[str, str]] = []
-
     try:
-        context = ssl.create_default_context()
-        with imaplib.IMAP4_SSL(config.IMAP_SERVER) as imap:
+        with connect() as imap:
             imap.login(config.EMAIL_FROM, config.EMAIL_PASSWORD)
-            imap.select('INBOX')
+            return _receive(imap, _select_inbox(imap), mark_as_read, process)
 
-            status, data = imap.search(None, 'UNSEEN')
-            if status != 'OK':
-                return []
+    except Exception as e:
+        print(f"❌ Chyba při příjmu emailů: {e}")
+        return []
 
-            for msg_id in data[0].split():
-                _, msg_data = imap.fetch(msg_id, '(RFC822)')
-                raw_email = msg_data[0][1]
 
-                msg = email.message_from_bytes(raw_email)
+def _announces_mail(line: bytes) -> bool:
+    """Neoznačená odpověď serveru ohlašující novou poštu ('* 3 EXISTS', '* 1 RECENT')"""
+    return line.startswith(b'*') and (b'EXISTS' in line or b'RECENT' in line)
 
-                sender = _decode_header(msg.get('From'))
-                subject = _decode_header(msg.get('Subject'))
-                text = _extract_text(msg)
 
-                messages.append({
-                    'from': sender,
-                    'subject': subject,
-                    'text': text.strip(),
-                })
+def _has_input(imap: imaplib.IMAP4) -> bool:
+    """
+    Čeká už odpověď serveru ke čtení (bez blokování)?
 
-                if mark_as_read:
-                    imap.store(msg_id, '+FLAGS', '\\Seen')
+    select() vidí jen socket - řádky, které imaplib načetl do bufferu `imap.file`
+    (např. spolu s '+' na IDLE), nebo které drží TLS vrstva, by čekaly až do timeoutu.
+    """
+    sock = imap.socket()
+    if isinstance(sock, ssl.SSLSocket) and sock.pending():
+        return True
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        # Z bufferu, jinak jedno neblokující čtení ze socketu
+        return bool(imap.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.settimeout(timeout)
 
-        return messages
 
-    except Exception as e:
-        print(f"❌ Chyba při příjmu emailů: {e}")
-        return []
+def _idle(imap: imaplib.IMAP4, timeout: float, stop: threading.Event) -> bool:
+    """
+    IMAP IDLE (RFC 2177) - čeká, až server ohlásí novou poštu, nejdéle `timeout` sekund
+
+    imaplib v Pythonu < 3.14 IDLE neumí, příkaz se proto posílá ručně. Vrací True,
+    pokud server něco ohlásil (EXISTS/RECENT), False po vypršení nebo při `stop`.
+    """
+    tag = imap._new_tag().decode()
+    imap.send(f"{tag} IDLE\r\n".encode())
 
+    # Před pokračováním '+' smí server poslat neoznačené odpovědi ('* 3 EXISTS', '* OK Still here')
+    notified = False
+    while True:
+        line = imap.readline()
+        if not line:
+            raise imap.abort("Server ukončil spojení během IDLE")
+        if line.startswith(b'+'):
+            break
+        if line.startswith(tag.encode()):
+            raise imap.error(f"IDLE odmítnuto: {line!r}")
+        notified = notified or _announces_mail(line)
 
-def count_email_votes() -> list[Vote]:
-    """Načtení a parsování hlasů z emailů s logováním"""
-    msgs = fetch_unread_messages()
-    votes = []
-    
-    print(f"📧 Nalezeno {len(msgs)} nepřečtených emailů")
-    
-    for msg in msgs:
-        vote = Vote(
-            from_email=msg['from'],
-            text=msg['text']
-        )
-        
-        # Logování pro debug
-        if vote.from_player_id and vote.for_player_id:
-            print(f"✅ Platný hlas: hráč ID {vote.from_player_id} → cíl ID {vote.for_player_id}")
-        else:
-            print(f"❌ Neplatný hlas z '{msg['from'][:30]}...' (hráč: {vote.from_player_id}, cíl: {vote.for_player_id})")
-        
-        votes.append(vote)
-    
-    return votes
+    deadline = time.monotonic() + timeout
+    try:
+        while not notified and not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Po sekundách, aby šlo naslouchání ukončit přes `stop`
+            if not _has_input(imap) and not select.select([imap.socket()], [], [], min(remaining, 1.0))[0]:
+                continue
+            line = imap.readline()
+            if not line:
+                raise imap.abort("Server ukončil spojení během IDLE")
+            notified = _announces_mail(line)
+    finally:
+        imap.send(b"DONE\r\n")
+        # Dočtení do tagované odpovědi na IDLE (mezitím mohou přijít další ohlášky)
+        while True:
+            line = imap.readline()
+            if not line:
+                raise imap.abort("Server ukončil spojení během IDLE")
+            if line.startswith(tag.encode()):
+                break
+    if line.split()[1:2] != [b'OK']:
+        raise imap.error(f"IDLE skončilo chybou: {line!r}")
+    return notified
+
+
+def listen(on_messages: Callable[[List[Dict[str, str]]], None], stop: Optional[threading.Event] = None):
+    """
+    Dlouho běžící příjem emailů: jedno přihlášené IMAP spojení a IDLE
+
+    Nové zprávy se předají `on_messages` hned po ohlášení serverem a teprve po
+    jejich zpracování se označí jako přečtené. Když server IDLE neumí, schránka
+    se kontroluje po IMAP_POLL_INTERVAL. Po výpadku spojení i po chybě zpracování
+    (např. zamčená databáze) se spojení obnovuje s exponenciálním odstupem
+    (nejvýše IMAP_RECONNECT_MAX) a nepotvrzené zprávy se stáhnou znovu.
+    """
+    stop = stop or threading.Event()
+    failures = 0
+    while not stop.is_set():
+        try:
+            with connect() as imap:
+                imap.login(config.EMAIL_FROM, config.EMAIL_PASSWORD)
+                uidvalidity = _select_inbox(imap)
+                supports_idle = 'IDLE' in imap.capabilities
+                print(f"📡 Připojeno k {config.IMAP_SERVER} ({'IDLE' if supports_idle else 'dotazování'})")
+
+                while not stop.is_set():
+                    _receive(imap, uidvalidity, process=on_messages)
+                    failures = 0
+
+                    if supports_idle:
+                        _idle(imap, config.IMAP_IDLE_TIMEOUT, stop)
+                    elif not stop.wait(config.IMAP_POLL_INTERVAL):
+                        imap.noop()
+
+        except Exception as e:
+            # Naslouchání nesmí skončit (běží i jako vlákno ve 'watch'); zprávy bez STORE se stáhnou znovu
+            failures += 1
+            delay = min(2 ** (failures - 1), config.IMAP_RECONNECT_MAX)
+            if isinstance(e, (imaplib.IMAP4.error, OSError)):
+                print(f"⚠️  Výpadek IMAP ({e}), nové připojení za {delay} s")
+            else:
+                print(f"❌ Zpracování emailů selhalo ({type(e).__name__}: {e}), nový pokus za {delay} s")
+            stop.wait(delay)
+
+
+def count_email_votes(msgs: Optional[List[Dict[str, str]]] = None) -> list[Vote]:
+    """Načtení a parsování hlasů z emailů (validace a přiřazení ke hře viz voting.ingest_email_votes)"""
+    if msgs is None:
+        msgs = fetch_unread_messages()
+
+    print(f"📧 Nalezeno {len(msgs)} nových emailů")
+
+    return [
+        Vote(from_email=msg['from'], text=msg['text'], subject=msg['subject'], message_key=msg.get('key') or None)
+        for msg in msgs
+    ]
@@ -1,20 +1,172 @@
 """
 Email integrace pro komunikaci s hráči
 """
+import atexit
+import queue
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage
-from typing import Optional
+from typing import List, Optional, Tuple
 import ssl
 import config
 from email_validator import EmailNotValidError, validate_email
 
 
-def is_valid_email(email: str) -> bool:
+def normalize_email(email: str, check_deliverability: Optional[bool] = None) -> Tuple[str, bool]:
+    """
+    Normalizovaná adresa a její platnost - ověřuje se jednou při registraci hráče
+
+    Args:
+        email: Adresa
+        check_deliverability: DNS ověření domény (výchozí podle EMAIL_CHECK_DELIVERABILITY)
+
+    Returns:
+        (normalizovaná adresa, platná) - neplatná adresa se vrací jen oříznutá
+    """
+    if check_deliverability is None:
+        check_deliverability = config.EMAIL_CHECK_DELIVERABILITY
     try:
-        r = validate_email(email)
-        return True if r else False
-    except Exception:
-        return False
+        result = validate_email(email, check_deliverability=check_deliverability)
+        return result.normalized, True
+    except EmailNotValidError:
+        return email.strip(), False
+
+
+class SMTPSession:
+    """
+    Jedno přihlášené SMTP spojení znovu použité pro další zprávy.
+
+    Připojí se a přihlásí při první zprávě, po výpadku spojení se jednou
+    transparentně připojí znovu a po SMTP_IDLE_TIMEOUT nečinnosti se zavře.
+    """
+
+    # Chyby, po kterých má smysl zkusit zprávu znovu přes nové spojení
+    RETRY_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ssl.SSLEOFError, ConnectionError, TimeoutError)
+
+    def __init__(self):
+        self._server = None
+        self._lock = threading.RLock()
+        self._last_used = 0.0
+        self._idle_timer = None
+
+    def _connect(self) -> smtplib.SMTP:
+        context = ssl.create_default_context(cafile=config.MAIL_CAFILE) # Vytvoří bezpečný SSL kontext
+        # TLS od začátku spojení (port 465), jinak STARTTLS (nebo nešifrovaně, např. lokální devmail)
+        if config.SMTP_USE_SSL:
+            server = smtplib.SMTP_SSL(config.SMTP_SERVER, config.SMTP_PORT, context=context, timeout=config.SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT, timeout=config.SMTP_TIMEOUT)
+        try:
+            if not config.SMTP_USE_SSL and config.SMTP_USE_TLS:
+                server.starttls(context=context)
+            if config.EMAIL_PASSWORD:
+                server.login(config.EMAIL_FROM, config.EMAIL_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def send(self, msg: EmailMessage, to_addrs: Optional[List[str]] = None) -> dict:
+        """
+        Odeslání zprávy přes sdílené spojení (při výpadku jeden pokus přes nové)
+
+        Args:
+            msg: Zpráva
+            to_addrs: Příjemci v obálce (výchozí podle hlaviček zprávy)
+
+        Returns:
+            Odmítnutí příjemci {email: (kód, odpověď)} - prázdné, pokud server přijal všechny
+        """
+        with self._lock:
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                refused = self._server.send_message(msg, to_addrs=to_addrs)
+            except self.RETRY_ERRORS:
+                self._drop()
+                self._server = self._connect()
+                refused = self._server.send_message(msg, to_addrs=to_addrs)
+            self._last_used = time.monotonic()
+            self._schedule_idle_close()
+            return refused or {}
+
+    def _schedule_idle_close(self):
+        """Časovač zavření po nečinnosti - jeden na celé období nečinnosti, ne na zprávu"""
+        if self._idle_timer is None:
+            self._idle_timer = threading.Timer(config.SMTP_IDLE_TIMEOUT, self._close_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def _close_if_idle(self):
+        with self._lock:
+            self._idle_timer = None
+            if self._server is None:
+                return
+            idle = time.monotonic() - self._last_used
+            if idle >= config.SMTP_IDLE_TIMEOUT:
+                self.close()
+            else:
+                self._idle_timer = threading.Timer(config.SMTP_IDLE_TIMEOUT - idle, self._close_if_idle)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+
+    def _drop(self):
+        """Zahození (pravděpodobně mrtvého) spojení bez QUIT"""
+        if self._server is not None:
+            try:
+                self._server.close()
+            except Exception:
+                pass
+            self._server = None
+
+    def close(self):
+        """Slušné ukončení spojení (QUIT)"""
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            if self._server is not None:
+                try:
+                    self._server.quit()
+                except Exception:
+                    pass
+                self._drop()
+
+
+# Pool SMTP spojení - nejvýš SMTP_MAX_CONNECTIONS současně otevřených na server
+_idle_sessions = queue.LifoQueue()
+_sessions = []
+_sessions_lock = threading.Lock()
+
+
+def _checkout_session() -> SMTPSession:
+    """Volné spojení z poolu, nové (do limitu), nebo počkání na uvolněné"""
+    try:
+        return _idle_sessions.get_nowait()
+    except queue.Empty:
+        pass
+    with _sessions_lock:
+        if len(_sessions) < config.SMTP_MAX_CONNECTIONS:
+            session = SMTPSession()
+            _sessions.append(session)
+            return session
+    return _idle_sessions.get()
+
+
+def _checkin_session(session: SMTPSession):
+    _idle_sessions.put(session)
+
+
+def close_connection():
+    """Zavření všech SMTP spojení (jinak se zavřou samy po nečinnosti nebo při ukončení)"""
+    with _sessions_lock:
+        for session in _sessions:
+            session.close()
+
+
+atexit.register(close_connection)
 
 
 def send_message(email: str, text: str, subject: str = "Hra Zrádci") -> bool:
@@ -29,11 +181,41 @@ def send_message(email: str, text: str, subject: str = "Hra Zrádci") -> bool:
     Returns:
         True pokud byla zpráva úspěšně odeslána
     """
-    if not is_valid_email(email):
-        print(f"❌ Chyba při odesílání emailu na '{email}': email není platný")
-        return False
+    session = _checkout_session()
+    try:
+        return _deliver(session, email, text, subject)
+    finally:
+        _checkin_session(session)
 
-    if not config.SMTP_SERVER or not config.SMTP_PORT or not config.EMAIL_FROM:
+
+def is_configured() -> bool:
+    """Je nastavené odesílání přes SMTP?"""
+    return bool(config.SMTP_SERVER and config.SMTP_PORT and config.EMAIL_FROM)
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """Chyba, kterou opakování nespraví (trvalé odmítnutí 5xx)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # Kód má každý příjemce zvlášť - 4xx (greylisting, plná schránka) se opakuje
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(500 <= code < 600 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+def _build_message(email: str, text: str, subject: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg['From'] = config.EMAIL_FROM
+    msg['To'] = email
+    msg.set_content(text)
+    return msg
+
+
+def _deliver(session: SMTPSession, email: str, text: str, subject: str) -> bool:
+    """Odeslání jedné zprávy přes dané spojení"""
+    if not is_configured():
         print(f"⚠️  Email není nakonfigurováno. Zpráva pro {email}:")
         print(f"📧 Předmět: {subject}")
         print(f"📝 {text}")
@@ -41,16 +223,7 @@ def send_message(email: str, text: str, subject: str = "Hra Zrádci") -> bool:
         return False
 
     try:
-        msg = EmailMessage()
-        msg['Subject'] = subject
-        msg['From'] = config.EMAIL_FROM
-        msg['To'] = email
-        msg.set_content(text)
-
-        context = ssl.create_default_context() # Vytvoří bezpečný SSL kontext
-        with smtplib.SMTP_SSL(config.SMTP_SERVER, config.SMTP_PORT, context=context) as server:
-            server.login(config.EMAIL_FROM, config.EMAIL_PASSWORD)
-            server.send_message(msg)
+        session.send(_build_message(email, text, subject))
 
         print("Email úspěšně odeslán!")
         return True
@@ -68,25 +241,113 @@ def send_message_to_multiple(emails: list[str], text: str, subject: str = "Hra Z
         text: Text zprávy
         subject: Předmět emailu
     """
-    sended = []
-    for email in emails:
-        sended.append(send_message(email, text, subject))
-    return all(sended)
+    return all(send_bulk([(email, text) for email in emails], subject))
+
+
+def _run_parallel(units: List[List[int]], work, parallel: bool = True):
+    """
+    Zavolání work(session, unit) pro každou skupinu indexů zpráv - skupiny
+    souběžně přes pool spojení, každá celá přes jedno spojení
+    """
+    if not units:
+        return
+
+    def run_unit(unit: List[int]):
+        session = _checkout_session()
+        try:
+            work(session, unit)
+        finally:
+            _checkin_session(session)
+
+    workers = min(config.SMTP_MAX_WORKERS, len(units)) if parallel else 1
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp") as pool:
+        list(pool.map(run_unit, units))
+
+
+def send_bulk(messages: List[Tuple[str, str]], subject: str = "Hra Zrádci") -> List[bool]:
+    """
+    Paralelní odeslání zpráv přes pool SMTP spojení
 
+    Zprávy jednoho příjemce odchází v zadaném pořadí, selhání jedné zprávy
+    neovlivní ostatní.
 
-def validate_email(email: str) -> bool:
+    Args:
+        messages: Seznam dvojic (email, text)
+        subject: Předmět emailů
+
+    Returns:
+        Výsledek odeslání pro každou zprávu (ve stejném pořadí)
     """
-    Jednoduchá validace emailové adresy
+    results = [False] * len(messages)
+
+    by_recipient = {}
+    for index, (email, _) in enumerate(messages):
+        by_recipient.setdefault(email, []).append(index)
+
+    def work(session: SMTPSession, unit: List[int]):
+        for index in unit:
+            email, text = messages[index]
+            results[index] = _deliver(session, email, text, subject)
+
+    # Bez SMTP se zprávy jen vypisují - sekvenčně, ať se výpis nepromíchá
+    _run_parallel(list(by_recipient.values()), work, parallel=is_configured())
+    return results
+
+
+def _group_broadcasts(messages: List[Tuple[str, str, str]]) -> List[List[int]]:
+    """
+    Rozdělení zpráv na doručení: stejný předmět i text pro více příjemců = jedna
+    zpráva se skrytými příjemci (po SMTP_MAX_RECIPIENTS), ostatní jednotlivě
+    """
+    by_content = {}
+    for index, (email, text, subject) in enumerate(messages):
+        by_content.setdefault((subject, text), []).append(index)
+
+    units = []
+    for indexes in by_content.values():
+        # Stejnou zprávu jednomu příjemci dvakrát nespojujeme
+        if len({messages[index][0] for index in indexes}) < len(indexes):
+            units.extend([index] for index in indexes)
+            continue
+        for start in range(0, len(indexes), config.SMTP_MAX_RECIPIENTS):
+            units.append(indexes[start:start + config.SMTP_MAX_RECIPIENTS])
+    return units
+
+
+def deliver_bulk(messages: List[Tuple[str, str, str]]) -> List[Optional[Exception]]:
+    """
+    Paralelní odeslání zpráv bez výpisů (pro mailer)
+
+    Hromadná oznámení (stejný předmět a text) odchází jako jedna zpráva
+    se všemi příjemci v obálce, hlavička To je neprozradí.
 
     Args:
-        email: Emailová adresa k ověření
+        messages: Seznam trojic (email, text, subject)
 
     Returns:
-        True pokud má email validní formát
+        Pro každou zprávu None (doručeno), nebo chyba, se kterou odeslání selhalo
     """
-    import re
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    errors = [None] * len(messages)
+
+    def work(session: SMTPSession, unit: List[int]):
+        recipients = [messages[index][0] for index in unit]
+        _, text, subject = messages[unit[0]]
+        msg = _build_message(recipients[0] if len(unit) == 1 else "undisclosed-recipients:;", text, subject)
+        try:
+            refused = session.send(msg, to_addrs=recipients)
+        except smtplib.SMTPRecipientsRefused as e:
+            # Odmítnuti všichni - každý příjemce dostane svůj kód (4xx/5xx)
+            refused = e.recipients
+        except Exception as e:
+            for index in unit:
+                errors[index] = e
+            return
+        for index, email in zip(unit, recipients):
+            if email in refused:
+                errors[index] = smtplib.SMTPRecipientsRefused({email: refused[email]})
+
+    _run_parallel(_group_broadcasts(messages), work)
+    return errors
 
 
 # Simulace příchozích zpráv pro testování
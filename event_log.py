@@ -0,0 +1,113 @@
+"""
+Komentáře moderátora na pozadí (write-behind) - přechod zapíše události hned, LLM komentář doplní vlákno
+
+Sémantika:
+- Události se zapisují synchronně v transakci fázového přechodu, na pozadí se jen doplňuje
+  komentář moderátora (volání LLM) - ve stejném pořadí, v jakém události vznikly (jeden zapisovač, FIFO).
+- Plná fronta (EVENT_QUEUE_SIZE) zdrží volajícího, dokud zapisovač neuvolní místo.
+- Událost čekající na komentář má moderator_note NULL. Při ukončení procesu se na frontu čeká
+  nejvýš EVENT_FLUSH_TIMEOUT sekund; co se nestihne, zůstane NULL a doplní to backfill_commentary()
+  v dlouho běžícím procesu ('zradci mailer').
+"""
+import atexit
+import queue
+import threading
+from typing import List, Optional
+
+import config
+import models
+import narrator
+
+_queue = queue.Queue(maxsize=config.EVENT_QUEUE_SIZE)
+_writer = None
+_writer_lock = threading.Lock()
+_queued = set()  # ID událostí ve frontě - backfill je nezařadí podruhé
+
+
+def queue_commentary(event_ids: List[int]):
+    """Zařazení událostí aktuální hry do fronty k doplnění komentáře"""
+    if not event_ids:
+        return
+    _ensure_writer()
+    game_id = models.current_game()
+    for event_id in event_ids:
+        _enqueue(game_id, event_id)
+
+
+def backfill_commentary(limit: int = config.EVENT_BATCH_SIZE) -> int:
+    """Zařazení událostí (všech her), kterým chybí komentář - např. proces skončil dřív, vrací počet"""
+    missing = [(game_id, event_id) for game_id, event_id in models.get_events_without_notes(limit)
+               if event_id not in _queued]
+    if missing:
+        _ensure_writer()
+    for game_id, event_id in missing:
+        _enqueue(game_id, event_id)
+    return len(missing)
+
+
+def flush_events(timeout: Optional[float] = None) -> bool:
+    """Počkání, dokud nejsou doplněné všechny komentáře ve frontě - False, pokud vypršel timeout"""
+    if _writer is None:
+        return True
+    with _queue.all_tasks_done:
+        return _queue.all_tasks_done.wait_for(lambda: not _queue.unfinished_tasks, timeout)
+
+
+def pending_events() -> int:
+    """Počet událostí čekajících na komentář (ve frontě i právě zpracovávaných)"""
+    return len(_queued)
+
+
+def _ensure_writer():
+    """Spuštění zapisovacího vlákna při první události"""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            if _writer is None:
+                atexit.register(_flush_at_exit)
+            _writer = threading.Thread(target=_write_loop, name="event-writer", daemon=True)
+            _writer.start()
+
+
+def _enqueue(game_id: int, event_id: int):
+    with _writer_lock:
+        if event_id in _queued:
+            return
+        _queued.add(event_id)
+    _queue.put((game_id, event_id))
+
+
+def _flush_at_exit():
+    """Při ukončení procesu počkat na komentáře jen omezeně - zbytek zůstane NULL pro backfill"""
+    if not flush_events(config.EVENT_FLUSH_TIMEOUT):
+        print(f"⚠️  Komentář moderátora se nestihl doplnit u {pending_events()} událostí, doplní ho 'zradci mailer'")
+
+
+def _write_loop():
+    """Zapisovač: odebírá dávky z fronty a doplňuje komentáře v jedné transakci"""
+    while True:
+        batch = [_queue.get()]
+        while len(batch) < config.EVENT_BATCH_SIZE:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            _write_batch(batch)
+        except Exception as e:
+            print(f"❌ Doplnění komentářů k {len(batch)} událostem selhalo: {e}")
+        finally:
+            with _writer_lock:
+                _queued.difference_update(event_id for _, event_id in batch)
+            for _ in batch:
+                _queue.task_done()
+
+
+def _write_batch(batch: list):
+    """Vygenerování komentářů moderátora a jejich zápis k událostem"""
+    notes = []
+    for game_id, event_id in batch:
+        with models.use_game(game_id):
+            notes.append((narrator.generate_narrator_commentary(), event_id))
+    models.set_event_notes(notes)
@@ -2,21 +2,83 @@
 Hlavní herní logika pro hru Zrádci
 """
 import random
-from typing import List
+from contextlib import contextmanager
+from typing import List, Optional
 from rich.console import Console
 from rich.table import Table
 import config
 import models
 import email_sender
+import event_log
+import mailer
 import narrator
 
 
 console = Console()
 
 
-def assign_roles():
+class _Transition:
+    """Jeden fázový přechod: snapshot stavu, zprávy do outboxu a události"""
+
+    def __init__(self, snapshot: models.GameSnapshot):
+        self.snapshot = snapshot
+        self.outbox = []
+        self.commentary = []  # ID událostí, ke kterým se po commitu doplní komentář moderátora
+
+    def send(self, player: dict, text: str):
+        # Platnost adresy se ověřila jednou při registraci hráče
+        if not player['email_valid']:
+            console.print(f"[red]❌ {player['name']} nemá platný email '{player['email']}', zpráva se neodešle[/red]")
+            return
+        self.outbox.append((player['email_normalized'], text))
+
+    def event(self, round_number: int, phase: str, event_type: str, description: str, moderator: bool = True):
+        """Událost přechodu - komentář moderátora se doplní po commitu (s EVENT_WRITE_BEHIND na pozadí)"""
+        # Komentář (volání LLM) až po commitu - zámek databáze nesmí čekat na síť,
+        # do té doby je NULL (chybějící komentář doplní i 'zradci mailer')
+        event_id = models.add_event(round_number, phase, event_type, description, None if moderator else "")
+        if moderator:
+            self.commentary.append(event_id)
+
+    def broadcast(self, players: List[dict], text: str):
+        for player in players:
+            self.send(player, text)
+
+
+@contextmanager
+def _transition():
+    """Zápisy fázového přechodu v jedné transakci, emaily do outboxu ve stejné transakci"""
+    with models.transaction() as snapshot:
+        tx = _Transition(snapshot)
+        yield tx
+        models.enqueue_messages(tx.outbox, email_subject())
+
+    if config.EVENT_WRITE_BEHIND:
+        event_log.queue_commentary(tx.commentary)
+    else:
+        add_commentary(tx.commentary)
+
+    # Emaily doručuje samostatně běžící 'zradci mailer' - přechod na SMTP nečeká.
+    # Bez nastaveného SMTP se zprávy jen vypíšou do konzole, to jde hned.
+    if config.MAIL_DELIVERY == "inline" or not email_sender.is_configured():
+        mailer.deliver_pending()
+
+
+def email_subject() -> str:
+    """Předmět emailů aktuální hry - jiné než výchozí hry nesou tag '#ID' pro směrování odpovědí"""
+    game_id = models.current_game()
+    if game_id == config.DEFAULT_GAME_ID:
+        return config.EMAIL_SUBJECT
+    return f"{config.EMAIL_SUBJECT} #{game_id}"
+
+
+def assign_roles(tx: Optional[_Transition] = None):
     """Náhodné přiřazení rolí hráčům"""
-    players = models.get_all_players()
+    if tx is None:
+        with _transition() as tx:
+            return assign_roles(tx)
+
+    players = list(tx.snapshot.players)
 
     if len(players) < config.MIN_PLAYERS:
         console.print(f"[red]❌ Nedostatek hráčů! Minimum je {config.MIN_PLAYERS}[/red]")
@@ -32,20 +94,15 @@ def assign_roles():
     # Náhodné zamíchání
     random.shuffle(players)
 
-    # Přiřazení rolí
-    traitors = []
-    for i, player in enumerate(players):
-        role = config.ROLE_TRAITOR if i < num_traitors else config.ROLE_FAITHFUL
-        models.update_player_role(player['id'], role)
-        if role == config.ROLE_TRAITOR:
-            traitors.append(player)
-
-    # Odeslání rolí hráčům
-    traitors_names = ", ".join([t['name'] for t in traitors])
+    # Přiřazení rolí - jeden hromadný zápis
+    traitors = players[:num_traitors]
+    assignments = [(p['id'], config.ROLE_TRAITOR) for p in traitors]
+    assignments += [(p['id'], config.ROLE_FAITHFUL) for p in players[num_traitors:]]
+    tx.snapshot.set_roles(assignments)
 
+    # Odeslání rolí hráčům (zprávy se skládají z přiřazení v paměti)
     for player in players:
-        player_data = models.get_player(player['id'])
-        if player_data['role'] == config.ROLE_TRAITOR:
+        if player['role'] == config.ROLE_TRAITOR:
             other_traitors = [t['name'] for t in traitors if t['id'] != player['id']]
             message = config.MESSAGES['role_traitor'].format(
                 traitors=", ".join(other_traitors) if other_traitors else "Jste jediný zrádce!"
@@ -53,9 +110,9 @@ def assign_roles():
         else:
             message = config.MESSAGES['role_faithful']
 
-        email_sender.send_message(player_data['email'], message)
+        tx.send(player, message)
 
-    add_event(1, config.PHASE_INIT, "roles_assigned", f"Role přiřazeny: {num_traitors} zrádců", moderator=False)
+    tx.event(1, config.PHASE_INIT, "roles_assigned", f"Role přiřazeny: {num_traitors} zrádců", moderator=False)
     console.print("[green]✅ Role přiřazeny a odeslány hráčům[/green]")
     return True
 
@@ -64,19 +121,20 @@ def start_game():
     """Zahájení hry"""
     console.print("[bold cyan]🎮 SPOUŠTÍM HRU ZRÁDCI[/bold cyan]")
 
-    # Inicializace stavu
-    models.init_game_state()
+    with _transition() as tx:
+        # Inicializace stavu
+        models.init_game_state()
+        tx.snapshot.reload()
 
-    # Přiřazení rolí
-    if not assign_roles():
-        return False
+        # Přiřazení rolí
+        if not assign_roles(tx):
+            return False
 
-    # Odeslání úvodní zprávy všem
-    players = models.get_all_players()
-    for player in players:
-        email_sender.send_message(player['email'], config.MESSAGES['game_start'])
+        # Odeslání úvodní zprávy všem
+        tx.broadcast(tx.snapshot.players, config.MESSAGES['game_start'])
+
+        tx.event(1, config.PHASE_INIT, "game_started", "Hra zahájena", moderator=False)
 
-    add_event(1, config.PHASE_INIT, "game_started", "Hra zahájena", moderator=False)
     console.print("[green]✅ Hra úspěšně zahájena![/green]")
     console.print("[yellow]💡 Použijte 'zradci next' pro postup do další fáze[/yellow]")
 
@@ -85,89 +143,90 @@ def start_game():
 
 def next_phase():
     """Postup do další fáze hry"""
-    state = models.get_game_state()
+    with _transition() as tx:
+        state = tx.snapshot.state
 
-    if not state or not state['started']:
-        console.print("[red]❌ Hra ještě nezačala! Použijte 'start'[/red]")
-        return
+        if not state or not state['started']:
+            console.print("[red]❌ Hra ještě nezačala! Použijte 'start'[/red]")
+            return
 
-    if state['finished']:
-        console.print("[red]❌ Hra již skončila![/red]")
-        return
+        if state['finished']:
+            console.print("[red]❌ Hra již skončila![/red]")
+            return
 
-    current_phase = state['phase']
-    round_num = state['round_number']
+        current_phase = state['phase']
+        round_num = state['round_number']
 
-    console.print(f"[cyan]📍 Aktuální fáze: {current_phase}, Kolo: {round_num}[/cyan]")
+        console.print(f"[cyan]📍 Aktuální fáze: {current_phase}, Kolo: {round_num}[/cyan]")
 
-    # Rozhodování o další fázi
-    if current_phase == config.PHASE_INIT:
-        _start_night_traitor_chat(round_num)
+        # Rozhodování o další fázi
+        if current_phase == config.PHASE_INIT:
+            _start_night_traitor_chat(tx, round_num)
 
-    elif current_phase == config.PHASE_NIGHT_TRAITOR_CHAT:
-        _start_night_vote(round_num)
+        elif current_phase == config.PHASE_NIGHT_TRAITOR_CHAT:
+            _start_night_vote(tx, round_num)
 
-    elif current_phase == config.PHASE_NIGHT_VOTE:
-        _process_night_result(round_num)
+        elif current_phase == config.PHASE_NIGHT_VOTE:
+            _process_night_result(tx, round_num)
 
-    elif current_phase == config.PHASE_NIGHT_REVOTE:
-        _process_night_revote_result(round_num)
+        elif current_phase == config.PHASE_NIGHT_REVOTE:
+            _process_night_revote_result(tx, round_num)
 
-    elif current_phase == config.PHASE_MORNING_RESULT:
-        _start_day_discussion(round_num)
+        elif current_phase == config.PHASE_MORNING_RESULT:
+            _start_day_discussion(tx, round_num)
 
-    elif current_phase == config.PHASE_DAY_DISCUSSION:
-        _start_day_vote(round_num)
+        elif current_phase == config.PHASE_DAY_DISCUSSION:
+            _start_day_vote(tx, round_num)
 
-    elif current_phase == config.PHASE_DAY_VOTE:
-        _process_day_result(round_num)
+        elif current_phase == config.PHASE_DAY_VOTE:
+            _process_day_result(tx, round_num)
 
-    elif current_phase == config.PHASE_DAY_REVOTE:
-        _process_day_revote_result(round_num)
+        elif current_phase == config.PHASE_DAY_REVOTE:
+            _process_day_revote_result(tx, round_num)
 
-    elif current_phase == config.PHASE_DAY_RESULT:
-        # Kontrola vítězství
-        if check_win_condition():
-            return
-        # Nové kolo
-        models.increment_round()
-        _start_night_traitor_chat(round_num + 1)
+        elif current_phase == config.PHASE_DAY_RESULT:
+            # Kontrola vítězství
+            if check_win_condition(tx):
+                return
+            # Nové kolo
+            tx.snapshot.next_round()
+            _start_night_traitor_chat(tx, round_num + 1)
 
 
-def add_event(round_number: int, phase: str, event_type: str, description: str, moderator: bool = True):
-    """Aktualizace události, včetně moderačního komentáře"""
-    narrator_commentary = narrator.generate_narrator_commentary()  # if moderator else ""
-    models.add_event(round_number, phase, event_type, description, narrator_commentary)
+def add_commentary(event_ids: List[int]):
+    """Doplnění moderačního komentáře k zapsaným událostem (mimo transakci přechodu)"""
+    notes = [(narrator.generate_narrator_commentary(), event_id) for event_id in event_ids]
+    models.set_event_notes(notes)
 
 
-def _start_night_traitor_chat(round_num: int):
+def _start_night_traitor_chat(tx: _Transition, round_num: int):
     """Zahájení noční diskuze zrádců"""
     console.print(f"[magenta]🌙 KOLO {round_num} - Noční diskuze zrádců[/magenta]")
 
-    traitors = models.get_players_by_role(config.ROLE_TRAITOR, alive_only=True)
+    traitors = tx.snapshot.players_by_role(config.ROLE_TRAITOR)
 
     for traitor in traitors:
-        email_sender.send_message(traitor['email'], config.MESSAGES['night_begins'])
+        tx.send(traitor, config.MESSAGES['night_begins'])
 
-    models.update_game_phase(config.PHASE_NIGHT_TRAITOR_CHAT)
-    add_event(round_num, config.PHASE_NIGHT_TRAITOR_CHAT, "night_chat", "Noční diskuze zahájena")
+    tx.snapshot.set_phase(config.PHASE_NIGHT_TRAITOR_CHAT)
+    tx.event(round_num, config.PHASE_NIGHT_TRAITOR_CHAT, "night_chat", "Noční diskuze zahájena")
 
     console.print("[yellow]💡 Zrádci se radí... Použijte 'next' pro přechod k hlasování[/yellow]")
 
 
-def _start_night_vote(round_num: int):
+def _start_night_vote(tx: _Transition, round_num: int):
     """Zahájení nočního hlasování zrádců"""
     console.print(f"[magenta]⚔️ KOLO {round_num} - Noční volba oběti[/magenta]")
 
-    traitors = models.get_players_by_role(config.ROLE_TRAITOR, alive_only=True)
-    alive_players = models.get_alive_players()
+    traitors = tx.snapshot.players_by_role(config.ROLE_TRAITOR)
+    alive_players = tx.snapshot.alive_players()
 
     # Seznam hráčů k eliminaci (kromě zrádců)
     targets = [p for p in alive_players if p['role'] != config.ROLE_TRAITOR]
 
     if not targets:
         console.print("[yellow]⚠️  Žádní věrní hráči k eliminaci![/yellow]")
-        models.update_game_phase(config.PHASE_NIGHT_VOTE)
+        tx.snapshot.set_phase(config.PHASE_NIGHT_VOTE)
         return
 
     # Vytvoření seznamu pro volbu
@@ -175,16 +234,16 @@ def _start_night_vote(round_num: int):
     message = config.MESSAGES['night_vote_prompt'].format(players=player_list)
 
     for traitor in traitors:
-        email_sender.send_message(traitor['email'], message)
+        tx.send(traitor, message)
 
-    models.update_game_phase(config.PHASE_NIGHT_VOTE)
-    add_event(round_num, config.PHASE_NIGHT_VOTE, "night_vote", "Noční hlasování zahájeno")
+    tx.snapshot.set_phase(config.PHASE_NIGHT_VOTE)
+    tx.event(round_num, config.PHASE_NIGHT_VOTE, "night_vote", "Noční hlasování zahájeno")
 
     console.print(f"[yellow]🗳️  Čekám na hlasy {len(traitors)} zrádců...[/yellow]")
     console.print("[yellow]💡 Použijte 'vote' pro zadání hlasů nebo 'next' pro vyhodnocení[/yellow]")
 
 
-def _process_night_result(round_num: int):
+def _process_night_result(tx: _Transition, round_num: int):
     """Vyhodnocení nočního hlasování"""
     console.print(f"[magenta]☀️ KOLO {round_num} - Výsledek noci[/magenta]")
 
@@ -195,11 +254,11 @@ def _process_night_result(round_num: int):
         message = config.MESSAGES['morning_result_none']
 
         # Oznámení
-        alive_players = models.get_alive_players()
+        alive_players = tx.snapshot.alive_players()
         for player in alive_players:
-            email_sender.send_message(player['email'], message)
+            tx.send(player, message)
 
-        models.update_game_phase(config.PHASE_MORNING_RESULT)
+        tx.snapshot.set_phase(config.PHASE_MORNING_RESULT)
         console.print("[yellow]💡 Použijte 'next' pro zahájení denní diskuze[/yellow]")
     else:
         # Kontrola remízy - zrádci se musí shodnout
@@ -213,42 +272,42 @@ def _process_night_result(round_num: int):
             tied_ids = [player_id for player_id, _ in tied_candidates]
             tied_names = []
             for player_id in tied_ids:
-                player = models.get_player(player_id)
+                player = tx.snapshot.player(player_id)
                 tied_names.append(player['name'])
                 console.print(f"   - {player['name']} ({max_votes} hlasů)")
 
             # Zahájit opakované noční hlasování
-            _start_night_revote(round_num, tied_ids, tied_names)
+            _start_night_revote(tx, round_num, tied_ids, tied_names)
         else:
             # Shoda - eliminovat oběť
             victim_id, vote_count = votes[0]
-            victim = models.get_player(victim_id)
+            victim = tx.snapshot.player(victim_id)
 
             console.print(f"[red]💀 Eliminován: {victim['name']} ({vote_count} hlasů)[/red]")
 
-            models.eliminate_player(victim_id, round_num)
+            tx.snapshot.eliminate(victim_id, round_num)
             message = config.MESSAGES['morning_result'].format(player=victim['name'])
-            add_event(round_num, config.PHASE_MORNING_RESULT, "night_elimination", f"{victim['name']} eliminován")
+            tx.event(round_num, config.PHASE_MORNING_RESULT, "night_elimination", f"{victim['name']} eliminován")
 
             # Oznámení
-            alive_players = models.get_alive_players()
+            alive_players = tx.snapshot.alive_players()
             for player in alive_players:
-                email_sender.send_message(player['email'], message)
+                tx.send(player, message)
 
-            models.update_game_phase(config.PHASE_MORNING_RESULT)
+            tx.snapshot.set_phase(config.PHASE_MORNING_RESULT)
 
             console.print("[yellow]💡 Použijte 'next' pro zahájení denní diskuze[/yellow]")
 
 
-def _start_night_revote(round_num: int, tied_candidate_ids: List[int], tied_names: List[str]):
+def _start_night_revote(tx: _Transition, round_num: int, tied_candidate_ids: List[int], tied_names: List[str]):
     """Zahájení opakovaného nočního hlasování při remíze"""
     console.print(f"[magenta]🔄 KOLO {round_num} - Opakované noční hlasování[/magenta]")
 
-    traitors = models.get_players_by_role(config.ROLE_TRAITOR, alive_only=True)
+    traitors = tx.snapshot.players_by_role(config.ROLE_TRAITOR)
 
     if not traitors:
         console.print("[yellow]⚠️  Žádní živí zrádci![/yellow]")
-        models.update_game_phase(config.PHASE_MORNING_RESULT)
+        tx.snapshot.set_phase(config.PHASE_MORNING_RESULT)
         return
 
     tied_players_names = ", ".join(tied_names)
@@ -262,17 +321,17 @@ def _start_night_revote(round_num: int, tied_candidate_ids: List[int], tied_name
     vote_message = config.MESSAGES['night_revote_prompt'].format(players=candidates_list)
 
     for traitor in traitors:
-        email_sender.send_message(traitor['email'], vote_message)
+        tx.send(traitor, vote_message)
         console.print(f"   ⚔️  {traitor['name']} musí hlasovat znovu")
 
-    models.update_game_phase(config.PHASE_NIGHT_REVOTE)
-    add_event(round_num, config.PHASE_NIGHT_REVOTE, "night_revote", f"Opakované noční hlasování: {tied_players_names}")
+    tx.snapshot.set_phase(config.PHASE_NIGHT_REVOTE)
+    tx.event(round_num, config.PHASE_NIGHT_REVOTE, "night_revote", f"Opakované noční hlasování: {tied_players_names}")
 
     console.print(f"[yellow]🗳️  Čekám na hlasy {len(traitors)} zrádců...[/yellow]")
     console.print("[yellow]💡 Použijte 'vote' pro zadání hlasů nebo 'next' pro vyhodnocení[/yellow]")
 
 
-def _process_night_revote_result(round_num: int):
+def _process_night_revote_result(tx: _Transition, round_num: int):
     """Vyhodnocení opakovaného nočního hlasování"""
     console.print(f"[magenta]☀️ KOLO {round_num} - Výsledek opakovaného hlasování[/magenta]")
 
@@ -294,60 +353,60 @@ def _process_night_revote_result(round_num: int):
         else:
             # Shoda dosažena - eliminovat oběť
             victim_id, vote_count = votes[0]
-            victim = models.get_player(victim_id)
+            victim = tx.snapshot.player(victim_id)
 
             console.print(f"[red]💀 Eliminován: {victim['name']} ({vote_count} hlasů)[/red]")
 
-            models.eliminate_player(victim_id, round_num)
+            tx.snapshot.eliminate(victim_id, round_num)
             message = config.MESSAGES['morning_result'].format(player=victim['name'])
-            add_event(round_num, config.PHASE_MORNING_RESULT, "night_elimination", f"{victim['name']} eliminován (opakované hlasování)")
+            tx.event(round_num, config.PHASE_MORNING_RESULT, "night_elimination", f"{victim['name']} eliminován (opakované hlasování)")
 
     # Oznámení
-    alive_players = models.get_alive_players()
+    alive_players = tx.snapshot.alive_players()
     for player in alive_players:
-        email_sender.send_message(player['email'], message)
+        tx.send(player, message)
 
-    models.update_game_phase(config.PHASE_MORNING_RESULT)
+    tx.snapshot.set_phase(config.PHASE_MORNING_RESULT)
 
     console.print("[yellow]💡 Použijte 'next' pro zahájení denní diskuze[/yellow]")
 
 
-def _start_day_discussion(round_num: int):
+def _start_day_discussion(tx: _Transition, round_num: int):
     """Zahájení denní diskuze"""
     console.print(f"[cyan]💬 KOLO {round_num} - Denní diskuze[/cyan]")
 
-    alive_players = models.get_alive_players()
+    alive_players = tx.snapshot.alive_players()
 
     for player in alive_players:
-        email_sender.send_message(player['email'], config.MESSAGES['day_discussion'])
+        tx.send(player, config.MESSAGES['day_discussion'])
 
-    models.update_game_phase(config.PHASE_DAY_DISCUSSION)
-    add_event(round_num, config.PHASE_DAY_DISCUSSION, "day_discussion", "Denní diskuze zahájena")
+    tx.snapshot.set_phase(config.PHASE_DAY_DISCUSSION)
+    tx.event(round_num, config.PHASE_DAY_DISCUSSION, "day_discussion", "Denní diskuze zahájena")
 
     console.print("[yellow]💡 Hráči diskutují... Použijte 'next' pro zahájení hlasování[/yellow]")
 
 
-def _start_day_vote(round_num: int):
+def _start_day_vote(tx: _Transition, round_num: int):
     """Zahájení denního hlasování"""
     console.print(f"[cyan]🗳️ KOLO {round_num} - Denní hlasování[/cyan]")
 
-    alive_players = models.get_alive_players()
+    alive_players = tx.snapshot.alive_players()
 
     # Seznam všech živých hráčů
     player_list = "\n".join([f"{p['id']}. {p['name']}" for i, p in enumerate(alive_players)])
     message = config.MESSAGES['day_vote_prompt'].format(players=player_list)
 
     for player in alive_players:
-        email_sender.send_message(player['email'], message)
+        tx.send(player, message)
 
-    models.update_game_phase(config.PHASE_DAY_VOTE)
-    add_event(round_num, config.PHASE_DAY_VOTE, "day_vote", "Denní hlasování zahájeno")
+    tx.snapshot.set_phase(config.PHASE_DAY_VOTE)
+    tx.event(round_num, config.PHASE_DAY_VOTE, "day_vote", "Denní hlasování zahájeno")
 
     console.print(f"[yellow]🗳️  Čekám na hlasy {len(alive_players)} hráčů...[/yellow]")
     console.print("[yellow]💡 Použijte 'vote' pro zadání hlasů nebo 'next' pro vyhodnocení[/yellow]")
 
 
-def _process_day_result(round_num: int):
+def _process_day_result(tx: _Transition, round_num: int):
     """Vyhodnocení denního hlasování"""
     console.print(f"[cyan]📊 KOLO {round_num} - Výsledek hlasování[/cyan]")
 
@@ -358,11 +417,11 @@ def _process_day_result(round_num: int):
         message = config.MESSAGES['day_result_tie']
 
         # Oznámení
-        alive_players = models.get_alive_players()
+        alive_players = tx.snapshot.alive_players()
         for player in alive_players:
-            email_sender.send_message(player['email'], message)
+            tx.send(player, message)
 
-        models.update_game_phase(config.PHASE_DAY_RESULT)
+        tx.snapshot.set_phase(config.PHASE_DAY_RESULT)
         console.print("[yellow]💡 Použijte 'next' pro kontrolu vítězství a pokračování[/yellow]")
     else:
         # Kontrola remízy - najdi všechny hráče s nejvyšším počtem hlasů
@@ -377,41 +436,41 @@ def _process_day_result(round_num: int):
             tied_ids = [player_id for player_id, _ in tied_players]
             tied_names = []
             for player_id in tied_ids:
-                player = models.get_player(player_id)
+                player = tx.snapshot.player(player_id)
                 tied_names.append(player['name'])
                 console.print(f"   - {player['name']} ({max_votes} hlasů)")
 
             # Zahájit opakované hlasování
-            _start_day_revote(round_num, tied_ids, tied_names)
+            _start_day_revote(tx, round_num, tied_ids, tied_names)
         else:
             # Jasný vítěz - vyloučit hráče
             eliminated_id, vote_count = votes[0]
-            eliminated = models.get_player(eliminated_id)
+            eliminated = tx.snapshot.player(eliminated_id)
 
             console.print(f"[red]🚫 Vyloučen: {eliminated['name']} - {eliminated['role']} ({vote_count} hlasů)[/red]")
 
-            models.eliminate_player(eliminated_id, round_num)
+            tx.snapshot.eliminate(eliminated_id, round_num)
             message = config.MESSAGES['day_result'].format(
                 player=eliminated['name'],
                 role="⚔️ ZRÁDCE" if eliminated['role'] == config.ROLE_TRAITOR else "🛡️ VĚRNÝ"
             )
-            add_event(round_num, config.PHASE_DAY_RESULT, "day_elimination", f"{eliminated['name']} vyloučen")
+            tx.event(round_num, config.PHASE_DAY_RESULT, "day_elimination", f"{eliminated['name']} vyloučen")
 
             # Oznámení
-            alive_players = models.get_alive_players()
+            alive_players = tx.snapshot.alive_players()
             for player in alive_players:
-                email_sender.send_message(player['email'], message)
+                tx.send(player, message)
 
-            models.update_game_phase(config.PHASE_DAY_RESULT)
+            tx.snapshot.set_phase(config.PHASE_DAY_RESULT)
 
             console.print("[yellow]💡 Použijte 'next' pro kontrolu vítězství a pokračování[/yellow]")
 
 
-def _start_day_revote(round_num: int, tied_player_ids: List[int], tied_names: List[str]):
+def _start_day_revote(tx: _Transition, round_num: int, tied_player_ids: List[int], tied_names: List[str]):
     """Zahájení opakovaného hlasování při remíze"""
     console.print(f"[cyan]🔄 KOLO {round_num} - Opakované hlasování[/cyan]")
 
-    alive_players = models.get_alive_players()
+    alive_players = tx.snapshot.alive_players()
 
     # Volit mohou pouze ti, kteří NEJSOU v remíze
     eligible_voters = [p for p in alive_players if p['id'] not in tied_player_ids]
@@ -427,11 +486,11 @@ def _start_day_revote(round_num: int, tied_player_ids: List[int], tied_names: Li
         console.print("[yellow]⚠️  Všichni živí hráči jsou v remíze! Nikdo není vyloučen.[/yellow]")
         message = config.MESSAGES['day_result_tie']
 
-        all_players = models.get_all_players()
+        all_players = tx.snapshot.players
         for player in all_players:
-            email_sender.send_message(player['email'], message)
+            tx.send(player, message)
 
-        models.update_game_phase(config.PHASE_DAY_RESULT)
+        tx.snapshot.set_phase(config.PHASE_DAY_RESULT)
         console.print("[yellow]💡 Použijte 'next' pro kontrolu vítězství a pokračování[/yellow]")
         return
 
@@ -445,24 +504,24 @@ def _start_day_revote(round_num: int, tied_player_ids: List[int], tied_names: Li
     )
 
     for voter in eligible_voters:
-        email_sender.send_message(voter['email'], vote_message)
+        tx.send(voter, vote_message)
         console.print(f"   ✉️  {voter['name']} může hlasovat")
 
     # Zpráva hráčům v remíze (nemohou hlasovat)
     announcement = config.MESSAGES['day_revote_announcement'].format(tied_players=tied_players_names)
     for player_id in tied_player_ids:
-        player = models.get_player(player_id)
-        email_sender.send_message(player['email'], announcement)
+        player = tx.snapshot.player(player_id)
+        tx.send(player, announcement)
         console.print(f"   🚫 {player['name']} nemůže hlasovat (je v remíze)")
 
-    models.update_game_phase(config.PHASE_DAY_REVOTE)
-    add_event(round_num, config.PHASE_DAY_REVOTE, "day_revote", f"Opakované hlasování: {tied_players_names}")
+    tx.snapshot.set_phase(config.PHASE_DAY_REVOTE)
+    tx.event(round_num, config.PHASE_DAY_REVOTE, "day_revote", f"Opakované hlasování: {tied_players_names}")
 
     console.print(f"[yellow]🗳️  Čekám na hlasy {len(eligible_voters)} oprávněných voličů...[/yellow]")
     console.print("[yellow]💡 Použijte 'vote' pro zadání hlasů nebo 'next' pro vyhodnocení[/yellow]")
 
 
-def _process_day_revote_result(round_num: int):
+def _process_day_revote_result(tx: _Transition, round_num: int):
     """Vyhodnocení opakovaného hlasování"""
     console.print(f"[cyan]📊 KOLO {round_num} - Výsledek opakovaného hlasování[/cyan]")
 
@@ -482,60 +541,64 @@ def _process_day_revote_result(round_num: int):
         else:
             # Vyloučení hráče
             eliminated_id, vote_count = votes[0]
-            eliminated = models.get_player(eliminated_id)
+            eliminated = tx.snapshot.player(eliminated_id)
 
             console.print(f"[red]🚫 Vyloučen: {eliminated['name']} - {eliminated['role']} ({vote_count} hlasů)[/red]")
 
-            models.eliminate_player(eliminated_id, round_num)
+            tx.snapshot.eliminate(eliminated_id, round_num)
             message = config.MESSAGES['day_result'].format(
                 player=eliminated['name'],
                 role="⚔️ ZRÁDCE" if eliminated['role'] == config.ROLE_TRAITOR else "🛡️ VĚRNÝ"
             )
-            add_event(round_num, config.PHASE_DAY_RESULT, "day_elimination", f"{eliminated['name']} vyloučen (opakované hlasování)")
+            tx.event(round_num, config.PHASE_DAY_RESULT, "day_elimination", f"{eliminated['name']} vyloučen (opakované hlasování)")
 
     # Oznámení
-    all_players = models.get_all_players()
+    all_players = tx.snapshot.players
     for player in all_players:
-        email_sender.send_message(player['email'], message)
+        tx.send(player, message)
 
-    models.update_game_phase(config.PHASE_DAY_RESULT)
+    tx.snapshot.set_phase(config.PHASE_DAY_RESULT)
 
     console.print("[yellow]💡 Použijte 'next' pro kontrolu vítězství a pokračování[/yellow]")
 
 
-def check_win_condition() -> bool:
+def check_win_condition(tx: Optional[_Transition] = None) -> bool:
     """Kontrola podmínek vítězství"""
-    traitors = models.get_players_by_role(config.ROLE_TRAITOR, alive_only=True)
-    faithful = models.get_players_by_role(config.ROLE_FAITHFUL, alive_only=True)
+    if tx is None:
+        with _transition() as tx:
+            return check_win_condition(tx)
+
+    traitors = tx.snapshot.players_by_role(config.ROLE_TRAITOR)
+    faithful = tx.snapshot.players_by_role(config.ROLE_FAITHFUL)
 
     winner = None
     message = None
 
     # Zrádci vyhráli
     if len(traitors) >= len(faithful):
-        winner = "ZRÁDCI"
+        winner = config.WINNER_TRAITORS
         message = config.MESSAGES['traitors_win']
         console.print("[bold red]⚔️ ZRÁDCI VYHRÁLI![/bold red]")
 
     # Věrní vyhráli
     elif len(traitors) == 0:
-        winner = "faithful"
+        winner = config.WINNER_FAITHFUL
         message = config.MESSAGES['faithful_win']
         console.print("[bold green]🛡️ VĚRNÍ VYHRÁLI![/bold green]")
 
     if winner and message:
-        models.end_game(winner)
+        tx.snapshot.end_game(winner)
 
         # Oznámení výsledku
-        all_players = models.get_all_players()
+        all_players = tx.snapshot.players
         for player in all_players:
-            email_sender.send_message(player['email'], message)
+            tx.send(player, message)
 
-        add_event(
-            models.get_game_state()['round_number'],
+        tx.event(
+            tx.snapshot.state['round_number'],
             config.PHASE_GAME_OVER,
             "game_over",
-            f"Výhra: {winner}"
+            f"Výhra: {config.WINNER_NAMES[winner]}"
         )
 
         # Zobrazení finálního stavu
@@ -604,6 +667,6 @@ def show_final_results():
 
     console.print(table)
 
-    console.print(f"\n[bold]🏆 Vítěz: {state['winner'].upper()}[/bold]")
+    console.print(f"\n[bold]🏆 Vítěz: {config.WINNER_NAMES.get(state.winner, state.winner)}[/bold]")
     console.print(f"[bold]🔄 Celkem kol: {state['round_number']}[/bold]\n")
     
\ No newline at end of file
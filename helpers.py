@@ -6,6 +6,8 @@ def add_players_from_list(player_list: list[tuple[str, str]]):
     for name, email in player_list:
         try:
             player_id = models.add_player(name, email)
+            if not models.get_player(player_id)['email_valid']:
+                print(f"  [yellow]⚠️  Email '{email}' není platný - hráč nebude dostávat zprávy[/yellow]")
             print(f"  [green]✅ Přidán (ID: {player_id})[/green]\n")
 
         except Exception as e:
@@ -0,0 +1,79 @@
+"""
+Doručování emailů z outboxu - dávky, exponenciální backoff a dead-letter
+"""
+import time
+
+import config
+import email_sender
+import event_log
+import models
+
+
+def _retry_delay(attempts: int) -> float:
+    """Exponenciální backoff podle počtu dosavadních pokusů"""
+    return min(config.OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), config.OUTBOX_BACKOFF_MAX)
+
+
+def deliver_batch() -> dict:
+    """Doručení jedné dávky splatných emailů - vrací počty {sent, retry, dead, skipped}"""
+    result = {"sent": 0, "retry": 0, "dead": 0, "skipped": 0}
+    batch = models.claim_outbox_batch(config.OUTBOX_BATCH_SIZE, config.OUTBOX_LEASE_SECONDS)
+    if not batch:
+        return result
+
+    # Bez SMTP se zprávy jen vypíšou a do fronty se nevrací
+    if not email_sender.is_configured():
+        for message in batch:
+            email_sender.send_message(message.recipient, message.body, message.subject)
+        models.mark_outbox_done([message.id for message in batch], models.OUTBOX_SKIPPED)
+        result["skipped"] = len(batch)
+        return result
+
+    errors = email_sender.deliver_bulk([(m.recipient, m.body, m.subject) for m in batch])
+
+    sent, failures = [], []
+    now = time.time()
+    for message, error in zip(batch, errors):
+        if error is None:
+            sent.append(message.id)
+            continue
+        attempts = message.attempts + 1
+        if email_sender.is_permanent_error(error) or attempts >= config.OUTBOX_MAX_ATTEMPTS:
+            failures.append((message.id, str(error), None))
+            result["dead"] += 1
+            print(f"❌ Email #{message.id} pro '{message.recipient}' nedoručen (pokus {attempts}): {error}")
+        else:
+            failures.append((message.id, str(error), now + _retry_delay(attempts)))
+            result["retry"] += 1
+
+    models.mark_outbox_done(sent)
+    models.mark_outbox_failed(failures)
+    result["sent"] = len(sent)
+    return result
+
+
+def deliver_pending() -> dict:
+    """Doručení všech splatných emailů (po dávkách) - vrací součet počtů"""
+    total = {"sent": 0, "retry": 0, "dead": 0, "skipped": 0}
+    while True:
+        result = deliver_batch()
+        for key, count in result.items():
+            total[key] += count
+        if not any(result.values()):
+            return total
+
+
+def run(interval: float = config.MAILER_INTERVAL, once: bool = False):
+    """Smyčka mailera: doručit splatné emaily, doplnit chybějící komentáře moderátora, počkat, opakovat"""
+    while True:
+        # Komentáře, které krátce běžící příkaz (EVENT_WRITE_BEHIND) nestihl doplnit, dopíše vlákno na pozadí
+        event_log.backfill_commentary()
+        result = deliver_pending()
+        if any(result.values()):
+            print(
+                f"📬 Doručeno: {result['sent']}, k opakování: {result['retry']}, "
+                f"dead-letter: {result['dead']}, jen vypsáno: {result['skipped']}"
+            )
+        if once:
+            return
+        time.sleep(interval)
@@ -8,30 +8,48 @@ from rich.table import Table
 from rich.prompt import Prompt, Confirm
 from typing import Optional
 import random
+import os
 
 import models
 import game_engine
 import config
 import narrator
 import voting
+import email_receiver
+import archive as game_archive
+import mailer as outbox_mailer
 
 app = typer.Typer(help="🎮 Aplikace pro moderování hry Zrádci")
 console = Console()
 
 
+@app.callback()
+def main(
+    game: int = typer.Option(config.DEFAULT_GAME_ID, "--game", "-g", help="ID hry (jedna databáze může hostit více her)"),
+    archive: Optional[str] = typer.Option(None, "--archive", "-a", help="Prohlížení archivované hry (jen pro čtení)"),
+):
+    """🎮 Aplikace pro moderování hry Zrádci"""
+    if archive:
+        game = game_archive.open_archive(archive)
+    models.set_current_game(game)
+
+
 @app.command()
 def setup():
     """🔧 Inicializace databáze"""
     console.print("[cyan]🔧 Inicializuji databázi...[/cyan]")
-    models.init_db()
-    console.print("[green]✅ Databáze úspěšně inicializována![/green]")
+    applied = models.init_db()
+    for version, description, _ in models.MIGRATIONS:
+        if version in applied:
+            console.print(f"  [dim]⬆️  Migrace {version}: {description}[/dim]")
+    console.print(f"[green]✅ Databáze úspěšně inicializována! (schéma v{models.get_schema_version()})[/green]")
     console.print("[yellow]💡 Použijte 'add-players' pro přidání hráčů[/yellow]")
 
 
 @app.command()
 def reset():
-    """🔄 Reset hry - smazání všech dat"""
-    if Confirm.ask("⚠️  Opravdu chcete resetovat celou hru a smazat všechna data?"):
+    """🔄 Reset hry - smazání všech dat aktuální hry"""
+    if Confirm.ask(f"⚠️  Opravdu chcete resetovat celou hru {models.current_game()} a smazat všechna její data?"):
         models.reset_game()
         console.print("[green]✅ Hra byla resetována[/green]")
         console.print("[yellow]💡 Použijte 'setup' pro novou inicializaci[/yellow]")
@@ -39,12 +57,113 @@ def reset():
         console.print("[yellow]❌ Reset zrušen[/yellow]")
 
 
+@app.command()
+def archive(output: Optional[str] = typer.Option(None, "--output", "-o", help="Cesta archivu (výchozí ve složce archive/)")):
+    """📦 Archivace dohrané hry a její odstranění z databáze"""
+    try:
+        path = game_archive.archive_game(output)
+    except ValueError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        return
+    size_kb = os.path.getsize(path) / 1024
+    console.print(f"[green]✅ Hra {models.current_game()} archivována do {path} ({size_kb:.1f} kB)[/green]")
+    console.print(f"[yellow]💡 Prohlížení: zradci --archive {path} events[/yellow]")
+
+
+@app.command()
+def checkpoint(name: Optional[str] = typer.Option(None, "--name", "-n", help="Jméno checkpointu (výchozí datum a čas)")):
+    """💾 Checkpoint celé databáze (lze pustit i za běhu watch a příjmu emailů)"""
+    import time
+
+    started = time.perf_counter()
+    try:
+        result = models.create_checkpoint(name)
+    except ValueError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    console.print(f"[green]✅ Checkpoint '{result['name']}' uložen ({result['size'] / 1024:.1f} kB, {elapsed_ms:.0f} ms)[/green]")
+    console.print(f"[yellow]💡 Návrat: zradci restore {result['name']}[/yellow]")
+
+
+@app.command()
+def checkpoints():
+    """💾 Seznam checkpointů"""
+    from datetime import datetime
+
+    checkpoint_list = models.list_checkpoints()
+
+    if not checkpoint_list:
+        console.print("[yellow]⚠️  Žádné checkpointy[/yellow]")
+        return
+
+    table = Table(title="💾 Checkpointy")
+    table.add_column("Jméno", style="cyan")
+    table.add_column("Vytvořen", style="white")
+    table.add_column("Velikost", style="magenta")
+
+    for cp in checkpoint_list:
+        created = datetime.fromtimestamp(cp['created']).strftime("%Y-%m-%d %H:%M:%S")
+        table.add_row(cp['name'], created, f"{cp['size'] / 1024:.1f} kB")
+
+    console.print(table)
+
+
+@app.command()
+def restore(name: str):
+    """⏪ Obnovení aktuální hry z checkpointu (ostatní hry a emaily zůstanou)"""
+    import time
+
+    game_id = models.current_game()
+    if not Confirm.ask(f"⚠️  Opravdu chcete vrátit hru {game_id} do stavu checkpointu '{name}'? Novější změny hry se ztratí."):
+        console.print("[yellow]❌ Obnovení zrušeno[/yellow]")
+        return
+
+    started = time.perf_counter()
+    try:
+        models.restore_checkpoint(name)
+    except ValueError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    console.print(f"[green]✅ Hra {game_id} obnovena z checkpointu '{name}' ({elapsed_ms:.0f} ms)[/green]")
+
+
+@app.command()
+def games():
+    """🎲 Přehled všech her v databázi"""
+    game_list = models.get_games()
+
+    if not game_list:
+        console.print("[yellow]⚠️  Žádné hry[/yellow]")
+        return
+
+    table = Table(title="🎲 Hry")
+    table.add_column("ID", style="cyan")
+    table.add_column("Kolo", style="white")
+    table.add_column("Fáze", style="magenta")
+    table.add_column("Stav", style="green")
+
+    for game in game_list:
+        if game['finished']:
+            status = f"🏁 Vítěz: {config.WINNER_NAMES.get(game.winner, game.winner)}"
+        elif game['started']:
+            status = "▶️  Běží"
+        else:
+            status = "⏸️  Nezahájena"
+        table.add_row(str(game['id']), str(game['round_number']), game['phase'], status)
+
+    console.print(table)
+
+
 @app.command()
 def add_player(name: str, email: str):
     """➕ Přidání jednoho hráče"""
     try:
         player_id = models.add_player(name, email)
         console.print(f"[green]✅ Hráč přidán: {name} (ID: {player_id})[/green]")
+        if not models.get_player(player_id)['email_valid']:
+            console.print(f"[yellow]⚠️  Email '{email}' není platný - hráč nebude dostávat zprávy[/yellow]")
     except Exception as e:
         console.print(f"[red]❌ Chyba při přidávání hráče: {e}[/red]")
 
@@ -67,6 +186,8 @@ def add_players():
 
         try:
             player_id = models.add_player(name, email)
+            if not models.get_player(player_id)['email_valid']:
+                console.print(f"  [yellow]⚠️  Email '{email}' není platný - hráč nebude dostávat zprávy[/yellow]")
             console.print(f"  [green]✅ Přidán (ID: {player_id})[/green]\n")
             count += 1
         except Exception as e:
@@ -149,96 +270,15 @@ def vote(voter_id: int, target_id: int):
     """🗳️  Manuální zadání hlasu"""
     state = models.get_game_state()
 
-    if not state or not state['started']:
-        console.print("[red]❌ Hra ještě nezačala![/red]")
-        return
-
-    if state['finished']:
-        console.print("[red]❌ Hra již skončila![/red]")
+    error = voting.validate_vote(voter_id, target_id, state)
+    if error:
+        console.print(error)
         return
 
-    # Ověření hráčů
+    # Zaznamenání hlasu
+    models.add_vote(voter_id, target_id, state['round_number'], state['phase'])
     voter = models.get_player(voter_id)
     target = models.get_player(target_id)
-
-    if not voter or not target:
-        console.print("[red]❌ Neplatné ID hráče![/red]")
-        return
-
-    if not voter['alive']:
-        console.print(f"[red]❌ {voter['name']} je eliminován a nemůže hlasovat![/red]")
-        return
-
-    if not target['alive']:
-        console.print(f"[red]❌ {target['name']} je eliminován a nelze na něj hlasovat![/red]")
-        return
-
-    # Kontrola typu hlasování podle fáze
-    phase = state['phase']
-    round_num = state['round_number']
-
-    if phase == config.PHASE_NIGHT_VOTE:
-        # Pouze zrádci mohou hlasovat v noci
-        if voter['role'] != config.ROLE_TRAITOR:
-            console.print(f"[red]❌ {voter['name']} není zrádce a nemůže hlasovat v noci![/red]")
-            return
-        # Nemohou hlasovat pro jiného zrádce
-        if target['role'] == config.ROLE_TRAITOR:
-            console.print(f"[red]❌ Nelze hlasovat pro spoluzrádce![/red]")
-            return
-
-    elif phase == config.PHASE_NIGHT_REVOTE:
-        # V opakovaném nočním hlasování mohou hlasovat pouze zrádci
-        if voter['role'] != config.ROLE_TRAITOR:
-            console.print(f"[red]❌ {voter['name']} není zrádce a nemůže hlasovat v noci![/red]")
-            return
-
-        # Musí hlasovat pouze pro kandidáty z remíze
-        previous_votes = models.count_votes(round_num, config.PHASE_NIGHT_VOTE)
-        if previous_votes:
-            max_votes = previous_votes[0][1]
-            tied_candidate_ids = [player_id for player_id, count in previous_votes if count == max_votes]
-
-            # Target musí být v remíze
-            if target_id not in tied_candidate_ids:
-                tied_names = [models.get_player(pid)['name'] for pid in tied_candidate_ids]
-                console.print(f"[red]❌ Můžete hlasovat pouze pro kandidáty z remíze: {', '.join(tied_names)}[/red]")
-                return
-
-        # Stále nemohou hlasovat pro jiného zrádce
-        if target['role'] == config.ROLE_TRAITOR:
-            console.print(f"[red]❌ Nelze hlasovat pro spoluzrádce![/red]")
-            return
-
-    elif phase == config.PHASE_DAY_VOTE:
-        # Všichni živí mohou hlasovat
-        pass
-
-    elif phase == config.PHASE_DAY_REVOTE:
-        # V opakovaném hlasování mohou hlasovat pouze ti, kteří NEJSOU v remíze
-        # Zjistíme, kdo je v remíze z předchozího hlasování
-        previous_votes = models.count_votes(round_num, config.PHASE_DAY_VOTE)
-        if previous_votes:
-            max_votes = previous_votes[0][1]
-            tied_player_ids = [player_id for player_id, count in previous_votes if count == max_votes]
-
-            # Voter nesmí být v remíze
-            if voter_id in tied_player_ids:
-                console.print(f"[red]❌ {voter['name']} je v remíze a nemůže hlasovat![/red]")
-                return
-
-            # Target musí být v remíze
-            if target_id not in tied_player_ids:
-                tied_names = [models.get_player(pid)['name'] for pid in tied_player_ids]
-                console.print(f"[red]❌ Můžete hlasovat pouze pro hráče v remíze: {', '.join(tied_names)}[/red]")
-                return
-
-    else:
-        console.print(f"[red]❌ Nyní není fáze hlasování! Aktuální fáze: {phase}[/red]")
-        return
-
-    # Zaznamenání hlasu
-    models.add_vote(voter_id, target_id, round_num, phase)
     console.print(f"[green]✅ Hlas zaznamenán: {voter['name']} → {target['name']}[/green]")
 
 
@@ -277,14 +317,11 @@ def simulate_vote():
         traitors = models.get_players_by_role(config.ROLE_TRAITOR, alive_only=True)
 
         # Zjistíme kandidáty z remíze
-        previous_votes = models.count_votes(round_num, config.PHASE_NIGHT_VOTE)
-        if not previous_votes:
+        _, tied_candidate_ids = models.get_vote_leaders(round_num, config.PHASE_NIGHT_VOTE)
+        if not tied_candidate_ids:
             console.print("[red]❌ Žádné předchozí hlasy nenalezeny![/red]")
             return
 
-        max_votes = previous_votes[0][1]
-        tied_candidate_ids = [player_id for player_id, count in previous_votes if count == max_votes]
-
         # Pouze kandidáti, kteří nejsou zrádci
         all_alive = models.get_alive_players()
         tied_candidates = [p for p in all_alive if p['id'] in tied_candidate_ids and p['role'] != config.ROLE_TRAITOR]
@@ -322,14 +359,11 @@ def simulate_vote():
     elif phase == config.PHASE_DAY_REVOTE:
         # Simulace opakovaného hlasování
         # Zjistíme, kdo je v remíze
-        previous_votes = models.count_votes(round_num, config.PHASE_DAY_VOTE)
-        if not previous_votes:
+        _, tied_player_ids = models.get_vote_leaders(round_num, config.PHASE_DAY_VOTE)
+        if not tied_player_ids:
             console.print("[red]❌ Žádné předchozí hlasy nenalezeny![/red]")
             return
 
-        max_votes = previous_votes[0][1]
-        tied_player_ids = [player_id for player_id, count in previous_votes if count == max_votes]
-
         # Volit mohou pouze ti, kteří nejsou v remíze
         all_alive = models.get_alive_players()
         eligible_voters = [p for p in all_alive if p['id'] not in tied_player_ids]
@@ -442,11 +476,14 @@ def events(round_num: Optional[int] = None):
 @app.command()
 def watch(
     interval: float = typer.Option(config.UPDATE_INTERVAL, "--interval", "-i", help="Interval aktualizace v sekundách"),
+    ingest: bool = typer.Option(True, "--ingest/--no-ingest", help="Příjem hlasů emailem na pozadí (je-li IMAP nastavené)"),
 ):
     """👀 Sledovat stav hry v reálném čase (live dashboard)"""
     from rich.live import Live
     from rich.panel import Panel
     from rich.layout import Layout
+    from collections import deque
+    import threading
     import time
     from datetime import datetime
 
@@ -454,9 +491,13 @@ def watch(
     narrator_commentary = None
     last_generated_state = None
 
+    # Posledních 10 událostí - po prvním načtení se dotahují jen nové (kurzor = ID poslední)
+    recent_events = deque(maxlen=10)
+    events_cursor = None
+
     def generate_dashboard() -> Layout:
         """Vygenerovat aktuální dashboard"""
-        nonlocal narrator_commentary, last_generated_state  # Přístup k vnějším proměnným
+        nonlocal narrator_commentary, last_generated_state, events_cursor  # Přístup k vnějším proměnným
 
         layout = Layout()
         layout.split_column(
@@ -511,9 +552,8 @@ def watch(
         header_style = "red bold" if state['finished'] else "cyan bold"
         header_text = f"{emoji} KOLO {state['round_number']} | FÁZE: {phase_display}"
         if state['finished']:
-            print(state['winner'])
-            winner_emoji = "⚔️" if state['winner'] == "traitors" else "🛡️"
-            header_text = f"🏁 HRA SKONČILA | VÍTĚZ: {winner_emoji} {state['winner'].upper()}"
+            winner_emoji = "⚔️" if state.winner == config.WINNER_TRAITORS else "🛡️"
+            header_text = f"🏁 HRA SKONČILA | VÍTĚZ: {winner_emoji} {config.WINNER_NAMES.get(state.winner, state.winner)}"
 
         layout["header"].update(Panel(header_text, style=header_style))
 
@@ -643,10 +683,15 @@ def watch(
 
         else:
             # Poslední událost
-            recent_events = models.get_events()
+            if events_cursor is None:
+                new_events = models.get_recent_events(recent_events.maxlen)
+            else:
+                new_events = models.get_events_since(events_cursor)
+            recent_events.extend(new_events)
+            if new_events:
+                events_cursor = new_events[-1]['id']
             if recent_events:
-                last_events = recent_events[-10:]
-                stats_text += f"\n[bold]📜 Poslední události[/bold]\n[dim]{"\n".join(e['description'] for e in last_events)}[/dim]"
+                stats_text += f"\n[bold]📜 Poslední události[/bold]\n[dim]{"\n".join(e['description'] for e in recent_events)}[/dim]"
 
         layout["stats"].update(Panel(stats_text, title="📊 Info", border_style="green"))
 
@@ -696,15 +741,129 @@ def watch(
 
         return result.strip()
 
+    def render_frame() -> Layout:
+        """Jeden snímek dashboardu - všechna data z jednoho konzistentního snapshotu databáze"""
+        with models.read_snapshot():
+            return generate_dashboard()
+
     console.print("[cyan]🔄 Spouštím live dashboard...[/cyan]\n")
 
+    # Hlasy z emailů zapisuje vlákno na pozadí hned po doručení, dashboard je jen čte
+    stop_ingest = threading.Event()
+    if ingest and email_receiver.is_configured() and not models.is_read_only():
+        threading.Thread(
+            target=email_receiver.listen, args=(voting.ingest_email_votes, stop_ingest),
+            daemon=True, name="ingest",
+        ).start()
+
     try:
-        with Live(generate_dashboard(), refresh_per_second=1, console=console, screen=True) as live:
+        with Live(render_frame(), refresh_per_second=1, console=console, screen=True) as live:
             while True:
                 time.sleep(interval)
-                live.update(generate_dashboard())
+                live.update(render_frame())
     except KeyboardInterrupt:
         console.print("\n[green]✅ Dashboard ukončen[/green]")
+    finally:
+        stop_ingest.set()
+
+
+@app.command()
+def mailer(
+    interval: float = typer.Option(config.MAILER_INTERVAL, "--interval", "-i", help="Interval kontroly outboxu v sekundách"),
+    once: bool = typer.Option(False, "--once", help="Doručit splatné emaily a skončit"),
+):
+    """📬 Doručování emailů z outboxu (s opakováním při výpadku SMTP)"""
+    if not once:
+        console.print(f"[cyan]📬 Mailer běží (kontrola každých {interval} s), ukončení Ctrl+C[/cyan]")
+    try:
+        outbox_mailer.run(interval, once)
+    except KeyboardInterrupt:
+        console.print("\n[green]✅ Mailer ukončen[/green]")
+
+
+def _require_inbound():
+    """Příjem hlasů potřebuje IMAP a zapisovatelnou databázi"""
+    if not email_receiver.is_configured():
+        console.print("[red]❌ IMAP není nakonfigurováno (IMAP_SERVER, EMAIL_FROM, EMAIL_PASSWORD)[/red]")
+        raise typer.Exit(1)
+    if models.is_read_only():
+        console.print("[red]❌ Archiv je jen pro čtení, hlasy do něj přijímat nelze[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def ingest():
+    """📥 Jednorázové zpracování hlasů z nových emailů"""
+    _require_inbound()
+    recorded = voting.ingest_email_votes()
+    console.print(f"[green]✅ Zpracováno hlasů z emailů: {recorded}[/green]")
+
+
+@app.command()
+def listen():
+    """📡 Průběžný příjem hlasů emailem (IMAP IDLE, hlasy se zpracují hned po doručení)"""
+    _require_inbound()
+
+    console.print("[cyan]📡 Čekám na hlasy emailem, ukončení Ctrl+C[/cyan]")
+    try:
+        email_receiver.listen(voting.ingest_email_votes)
+    except KeyboardInterrupt:
+        console.print("\n[green]✅ Příjem hlasů ukončen[/green]")
+
+
+@app.command()
+def outbox(retry_dead: bool = typer.Option(False, "--retry-dead", help="Vrátit nedoručitelné emaily zpět do fronty")):
+    """📮 Stav outboxu odchozích emailů (všech her)"""
+    if retry_dead:
+        count = models.retry_dead_outbox()
+        console.print(f"[green]✅ Zpět do fronty vráceno emailů: {count}[/green]")
+
+    stats = models.get_outbox_stats()
+    console.print("\n[bold]📮 Outbox:[/bold]")
+    console.print(f"  ⏳ Čeká na doručení: {stats.get(models.OUTBOX_PENDING, 0)}")
+    console.print(f"  ✅ Doručeno: {stats.get(models.OUTBOX_SENT, 0)}")
+    console.print(f"  📝 Jen vypsáno (bez SMTP): {stats.get(models.OUTBOX_SKIPPED, 0)}")
+    console.print(f"  ❌ Dead-letter: {stats.get(models.OUTBOX_DEAD, 0)}")
+
+    dead = models.get_outbox_messages(models.OUTBOX_DEAD)
+    if dead:
+        table = Table(title="❌ Nedoručitelné emaily")
+        table.add_column("ID", style="cyan")
+        table.add_column("Hra", style="white")
+        table.add_column("Příjemce", style="magenta")
+        table.add_column("Pokusů", style="yellow")
+        table.add_column("Chyba", style="red")
+        for message in dead:
+            table.add_row(str(message.id), str(message.game_id), message.recipient, str(message.attempts), message.last_error or "")
+        console.print(table)
+        console.print("[yellow]💡 Po opravě použijte 'zradci outbox --retry-dead'[/yellow]")
+
+
+@app.command()
+def inbound(
+    rejected: bool = typer.Option(False, "--rejected", "-r", help="Jen odmítnuté emaily"),
+    limit: int = typer.Option(20, "--limit", "-n", help="Počet zobrazených emailů"),
+):
+    """📥 Deník zpracovaných příchozích emailů (všech her)"""
+    messages = models.get_inbound_messages(models.INBOUND_REJECTED if rejected else None, limit)
+    if not messages:
+        console.print("[yellow]Žádné zpracované emaily[/yellow]")
+        return
+
+    table = Table(title="📥 Příchozí emaily")
+    table.add_column("Čas", style="dim")
+    table.add_column("Hra", style="white")
+    table.add_column("Odesílatel", style="magenta")
+    table.add_column("Hlas", style="cyan")
+    table.add_column("Výsledek")
+    for message in messages:
+        ballot = f"{message.voter_id or '?'} → {message.target_id or '?'}"
+        if message.status == models.INBOUND_APPLIED:
+            result = "[green]✅ zapsán[/green]"
+        else:
+            result = f"[red]❌ {message.reason or 'odmítnut'}[/red]"
+        table.add_row(message.processed_at or "", str(message.game_id or "-"), message.sender or "", ballot, result)
+    console.print(table)
 
 
 @app.command()
@@ -717,7 +876,8 @@ def info():
     console.print(f"  Minimální počet hráčů: {config.MIN_PLAYERS}")
     console.print(f"  Maximální počet hráčů: {config.MAX_PLAYERS}")
     console.print(f"  Poměr zrádců: {config.TRAITOR_RATIO * 100}%")
-    console.print(f"  Databáze: {config.DATABASE_PATH}")
+    console.print(f"  Databáze: {models.get_storage()}")
+    console.print(f"  Hra: {models.current_game()}")
 
     console.print("\n[bold]📧 Email:[/bold]")
     if config.EMAIL_FROM and config.EMAIL_PASSWORD:
@@ -727,12 +887,16 @@ def info():
 
     console.print("\n[bold]📚 Příkazy:[/bold]")
     console.print("  setup          - Inicializace databáze")
+    console.print("  games          - Přehled her (--game ID vybere hru)")
     console.print("  add-players    - Interaktivní přidání hráčů")
     console.print("  list-players   - Seznam hráčů")
     console.print("  start          - Zahájení hry")
     console.print("  next           - Další fáze")
     console.print("  status         - Stav hry")
     console.print("  watch          - Live dashboard stavu hry")
+    console.print("  ingest         - Zpracování hlasů z nových emailů")
+    console.print("  listen         - Průběžný příjem hlasů emailem")
+    console.print("  inbound        - Deník zpracovaných příchozích emailů")
     console.print("  vote           - Zaznamenání hlasu")
     console.print("  simulate-vote  - Simulace hlasování")
     console.print("  votes          - Zobrazení hlasů")
@@ -1,152 +1,789 @@
 """
 Databázové modely a operace pro hru Zrádci
 """
+import os
+import re
 import sqlite3
+import threading
+import time
+from urllib.request import pathname2url
+from contextvars import ContextVar
 from typing import List, Optional, Tuple
 from contextlib import contextmanager
 import config
+from records import Player, VoteRecord, Event, GameState, OutboxMessage, InboundMessage
+
+
+# Jedno dlouho žijící připojení na vlákno (a proces) - viz _get_connection()
+_local = threading.local()
+
+# Hra, se kterou pracují všechny funkce modulu (jedna databáze může hostit více her)
+_current_game: ContextVar[int] = ContextVar("current_game", default=config.DEFAULT_GAME_ID)
+
+
+def current_game() -> int:
+    """ID aktuální hry"""
+    return _current_game.get()
+
+
+def set_current_game(game_id: int):
+    """Nastavení aktuální hry pro zbytek běhu (např. podle přepínače --game)"""
+    _current_game.set(game_id)
 
 
 @contextmanager
-def get_db():
-    """Context manager pro databázové připojení"""
-    conn = sqlite3.connect(config.DATABASE_PATH)
+def use_game(game_id: int):
+    """Dočasné přepnutí na jinou hru"""
+    token = _current_game.set(game_id)
+    try:
+        yield
+    finally:
+        _current_game.reset(token)
+
+
+# === ÚLOŽIŠTĚ ===
+
+def _open(database: str, uri: bool = False) -> sqlite3.Connection:
+    """Otevření připojení se společným nastavením pro všechna úložiště"""
+    conn = sqlite3.connect(
+        database,
+        uri=uri,
+        timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=config.DB_STATEMENT_CACHE,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT_MS)}")
+    # Záporná hodnota = velikost v KiB
+    conn.execute(f"PRAGMA cache_size = -{int(config.DB_CACHE_SIZE_KB)}")
+    return conn
+
+
+class SQLiteStorage:
+    """Úložiště v SQLite souboru (produkce)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return f"SQLite ({self.path})"
+
+    def connect(self, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            conn = _open(f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro", uri=True)
+            conn.execute("PRAGMA query_only = 1")
+            return conn
+        conn = _open(self.path)
+        # WAL: čtenáři (watch) neblokují zapisovatele (next, vote) a naopak
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+
+class MemoryStorage:
+    """
+    Úložiště čistě v paměti procesu - simulace a testy bez přístupu na disk.
+
+    Používá SQLite VFS "memdb", takže všechna vlákna procesu sdílí jednu
+    databázi se stejným schématem, triggery i zamykáním jako v produkci.
+    Databáze zaniká se zavřením posledního připojení (drží ji _anchor).
+    """
+
+    _counter = 0
+
+    def __init__(self, name: Optional[str] = None):
+        if name is None:
+            MemoryStorage._counter += 1
+            name = f"zradci-{os.getpid()}-{MemoryStorage._counter}"
+        self.uri = f"file:/{name}?vfs=memdb"
+        self.read_only = False
+        self._anchor = _open(self.uri, uri=True)
+
+    def __repr__(self):
+        return f"paměť ({self.uri})"
+
+    def connect(self, read_only: bool = False) -> sqlite3.Connection:
+        conn = _open(self.uri, uri=True)
+        if read_only or self.read_only:
+            conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    def close(self):
+        """Uvolnění databáze z paměti (po zavření všech ostatních připojení)"""
+        self._anchor.close()
+
+
+# Explicitně nastavené úložiště, jinak SQLite soubor podle config.DATABASE_PATH
+_storage = None
+_default_storage = None
+
+
+def get_storage():
+    """Aktuální úložiště"""
+    global _default_storage
+    if _storage is None and config.STORAGE_BACKEND == "memory":
+        set_storage(MemoryStorage())
+    if _storage is not None:
+        return _storage
+    if _default_storage is None or _default_storage.path != config.DATABASE_PATH:
+        _default_storage = SQLiteStorage(config.DATABASE_PATH)
+    return _default_storage
+
+
+def set_storage(storage):
+    """Přepnutí úložiště (None = výchozí SQLite soubor); připojení vláken se otevřou znovu"""
+    global _storage
+    _storage = storage
+
+
+@contextmanager
+def use_storage(storage):
+    """Dočasné přepnutí úložiště, např. `with use_storage(MemoryStorage()): ...`"""
+    previous = _storage
+    set_storage(storage)
     try:
-        yield conn
+        yield storage
+    finally:
+        close_db()
+        set_storage(previous)
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Vrátí připojení aktuálního vlákna, případně ho otevře (uvnitř read_snapshot() to čtecí)"""
+    snapshot_conn = getattr(_local, "snapshot_conn", None)
+    if snapshot_conn is not None:
+        return snapshot_conn
+
+    storage = get_storage()
+    conn = getattr(_local, "conn", None)
+    if conn is not None and (_local.pid != os.getpid() or _local.storage is not storage):
+        # Po forku nebo změně úložiště staré připojení nepoužíváme
+        if _local.pid == os.getpid():
+            conn.close()
+        conn = None
+
+    if conn is None:
+        conn = storage.connect()
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _local.storage = storage
+    return conn
+
+
+def _get_read_connection() -> sqlite3.Connection:
+    """Čtecí připojení aktuálního vlákna (mode=ro, query_only) - otevře se jednou a drží se"""
+    storage = get_storage()
+    conn = getattr(_local, "read_conn", None)
+    if conn is not None and (_local.read_pid != os.getpid() or _local.read_storage is not storage):
+        if _local.read_pid == os.getpid():
+            conn.close()
+        conn = None
+
+    if conn is None:
+        conn = storage.connect(read_only=True)
+        _local.read_conn = conn
+        _local.read_pid = os.getpid()
+        _local.read_storage = storage
+    return conn
+
+
+@contextmanager
+def read_snapshot():
+    """
+    Všechna čtení uvnitř bloku vidí jeden konzistentní stav databáze (WAL snapshot).
+
+    Čte se přes samostatné připojení jen pro čtení, takže snapshot neblokuje
+    zapisovatele ani jimi není blokován. Zápis uvnitř bloku skončí chybou.
+    """
+    if getattr(_local, "snapshot_conn", None) is not None:
+        yield
+        return
+
+    conn = _get_read_connection()
+    conn.execute("BEGIN")
+    # Snapshot vzniká prvním čtením, ne příkazem BEGIN
+    conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+    _local.snapshot_conn = conn
+    try:
+        yield
     finally:
+        _local.snapshot_conn = None
+        conn.rollback()
+
+
+def is_read_only() -> bool:
+    """Jen čtení - archiv nebo uvnitř read_snapshot()"""
+    return getattr(_local, "snapshot_conn", None) is not None or getattr(get_storage(), "read_only", False)
+
+
+@contextmanager
+def get_db():
+    """Context manager pro databázové připojení (sdílené v rámci vlákna)"""
+    conn = _get_connection()
+    try:
+        yield conn
+    except Exception:
+        # Nedokončená transakce nesmí zůstat viset na sdíleném připojení
+        # (uvnitř transaction() rozhoduje o rollbacku až ona)
+        if conn.in_transaction and not getattr(_local, "tx_depth", 0):
+            conn.rollback()
+            _invalidate_player_cache()
+        raise
+
+
+def _commit(conn: sqlite3.Connection):
+    """Commit - uvnitř transaction() se odkládá až na její konec"""
+    if not getattr(_local, "tx_depth", 0):
+        conn.commit()
+
+
+@contextmanager
+def transaction():
+    """
+    Unit of work - všechny zápisy uvnitř bloku se commitnou najednou (nebo vůbec).
+
+    Vnořené bloky se připojí k vnější transakci.
+
+    Yields:
+        GameSnapshot načtený jednou na začátku transakce
+    """
+    conn = _get_connection()
+    depth = getattr(_local, "tx_depth", 0)
+    if depth == 0:
+        # IMMEDIATE: zámek pro zápis hned, snapshot tak nemůže zastarat
+        conn.execute("BEGIN IMMEDIATE")
+    _local.tx_depth = depth + 1
+    try:
+        yield load_snapshot()
+    except BaseException:
+        _local.tx_depth = depth
+        if depth == 0:
+            conn.rollback()
+            _invalidate_player_cache()
+        raise
+    _local.tx_depth = depth
+    if depth == 0:
+        conn.commit()
+
+
+def close_db():
+    """Uzavření připojení aktuálního vlákna"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
         conn.close()
+    _local.conn = None
+
+    read_conn = getattr(_local, "read_conn", None)
+    if read_conn is not None and _local.read_pid == os.getpid():
+        read_conn.close()
+    _local.read_conn = None
+    _invalidate_player_cache()
+
+
+# === MIGRACE ===
+
+def _migration_base_schema(cur: sqlite3.Cursor):
+    """Základní tabulky (u starších databází už existují)"""
+    # Tabulka hráčů
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS players (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE,
+            role TEXT,
+            alive INTEGER DEFAULT 1,
+            eliminated_round INTEGER
+        )
+    """)
+
+    # Tabulka hlasů
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS votes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            voter_id INTEGER NOT NULL,
+            target_id INTEGER NOT NULL,
+            round_number INTEGER NOT NULL,
+            phase TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (voter_id) REFERENCES players (id),
+            FOREIGN KEY (target_id) REFERENCES players (id)
+        )
+    """)
+
+    # Tabulka stavu hry
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS game_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            round_number INTEGER DEFAULT 1,
+            phase TEXT DEFAULT 'inicializace',
+            started INTEGER DEFAULT 0,
+            finished INTEGER DEFAULT 0,
+            winner TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Tabulka zpráv/událostí
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            round_number INTEGER,
+            phase TEXT,
+            event_type TEXT,
+            description TEXT,
+            moderator_note TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _migration_indexes(cur: sqlite3.Cursor):
+    """Složené indexy pro nejčastější dotazy"""
+    # get_votes / count_votes: WHERE round_number AND phase (+ voter_id / target_id)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_votes_round_phase_voter ON votes (round_number, phase, voter_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_votes_round_phase_target ON votes (round_number, phase, target_id)")
+    # get_events: WHERE round_number ORDER BY id
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_events_round_id ON events (round_number, id)")
+    # get_alive_players / get_players_by_role
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_players_alive_role ON players (alive, role)")
+
+
+def _migration_unique_votes(cur: sqlite3.Cursor):
+    """Jeden hlas na hráče, kolo a fázi - podklad pro UPSERT v add_vote"""
+    # Starší databáze mohou obsahovat duplicity, ponecháme nejnovější hlas
+    cur.execute("""
+        DELETE FROM votes WHERE id NOT IN (
+            SELECT MAX(id) FROM votes GROUP BY round_number, phase, voter_id
+        )
+    """)
+    # Unikátní index nahrazuje obyčejný index ze 2. migrace
+    cur.execute("DROP INDEX IF EXISTS idx_votes_round_phase_voter")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_votes_round_phase_voter ON votes (round_number, phase, voter_id)")
 
 
-def init_db():
-    """Inicializace databáze"""
+def _migration_vote_tally(cur: sqlite3.Cursor):
+    """Průběžně udržovaný součet hlasů (udržují ho triggery nad votes)"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS vote_tally (
+            round_number INTEGER NOT NULL,
+            phase TEXT NOT NULL,
+            target_id INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (round_number, phase, target_id)
+        ) WITHOUT ROWID
+    """)
+
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_votes_tally_insert AFTER INSERT ON votes
+        BEGIN
+            INSERT INTO vote_tally (round_number, phase, target_id, count)
+            VALUES (NEW.round_number, NEW.phase, NEW.target_id, 1)
+            ON CONFLICT (round_number, phase, target_id) DO UPDATE SET count = count + 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_votes_tally_delete AFTER DELETE ON votes
+        BEGIN
+            UPDATE vote_tally SET count = count - 1
+            WHERE round_number = OLD.round_number AND phase = OLD.phase AND target_id = OLD.target_id;
+            DELETE FROM vote_tally
+            WHERE round_number = OLD.round_number AND phase = OLD.phase AND target_id = OLD.target_id AND count <= 0;
+        END
+    """)
+    # Změna hlasu (UPSERT v add_vote) = odečíst starý cíl, přičíst nový
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_votes_tally_update AFTER UPDATE OF target_id, round_number, phase ON votes
+        WHEN OLD.target_id != NEW.target_id OR OLD.round_number != NEW.round_number OR OLD.phase != NEW.phase
+        BEGIN
+            UPDATE vote_tally SET count = count - 1
+            WHERE round_number = OLD.round_number AND phase = OLD.phase AND target_id = OLD.target_id;
+            DELETE FROM vote_tally
+            WHERE round_number = OLD.round_number AND phase = OLD.phase AND target_id = OLD.target_id AND count <= 0;
+            INSERT INTO vote_tally (round_number, phase, target_id, count)
+            VALUES (NEW.round_number, NEW.phase, NEW.target_id, 1)
+            ON CONFLICT (round_number, phase, target_id) DO UPDATE SET count = count + 1;
+        END
+    """)
+
+    # Dopočítání z existujících hlasů
+    cur.execute("DELETE FROM vote_tally")
+    cur.execute("""
+        INSERT INTO vote_tally (round_number, phase, target_id, count)
+        SELECT round_number, phase, target_id, COUNT(*) FROM votes GROUP BY round_number, phase, target_id
+    """)
+
+
+def _migration_multi_game(cur: sqlite3.Cursor):
+    """Více her v jedné databázi - sloupec game_id a indexy podle hry"""
+    # Dosavadní data patří hře 1
+    # game_state: id je nově ID hry (původní CHECK (id = 1) je nutné odstranit přestavbou)
+    cur.execute("""
+        CREATE TABLE game_state_new (
+            id INTEGER PRIMARY KEY,
+            round_number INTEGER DEFAULT 1,
+            phase TEXT DEFAULT 'inicializace',
+            started INTEGER DEFAULT 0,
+            finished INTEGER DEFAULT 0,
+            winner TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("INSERT INTO game_state_new SELECT * FROM game_state")
+    cur.execute("DROP TABLE game_state")
+    cur.execute("ALTER TABLE game_state_new RENAME TO game_state")
+
+    # players: email je unikátní jen v rámci hry, ID hráčů zůstávají globální
+    cur.execute("""
+        CREATE TABLE players_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_id INTEGER NOT NULL DEFAULT 1,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            role TEXT,
+            alive INTEGER DEFAULT 1,
+            eliminated_round INTEGER,
+            UNIQUE (game_id, email)
+        )
+    """)
+    cur.execute("""
+        INSERT INTO players_new (id, game_id, name, email, role, alive, eliminated_round)
+        SELECT id, 1, name, email, role, alive, eliminated_round FROM players
+    """)
+    cur.execute("DROP TABLE players")
+    cur.execute("ALTER TABLE players_new RENAME TO players")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_players_game_alive_role ON players (game_id, alive, role)")
+
+    # votes
+    cur.execute("ALTER TABLE votes ADD COLUMN game_id INTEGER NOT NULL DEFAULT 1")
+    cur.execute("DROP INDEX IF EXISTS ux_votes_round_phase_voter")
+    cur.execute("DROP INDEX IF EXISTS idx_votes_round_phase_target")
+    cur.execute("CREATE UNIQUE INDEX ux_votes_game_round_phase_voter ON votes (game_id, round_number, phase, voter_id)")
+    cur.execute("CREATE INDEX idx_votes_game_round_phase_target ON votes (game_id, round_number, phase, target_id)")
+
+    # events
+    cur.execute("ALTER TABLE events ADD COLUMN game_id INTEGER NOT NULL DEFAULT 1")
+    cur.execute("DROP INDEX IF EXISTS idx_events_round_id")
+    cur.execute("CREATE INDEX idx_events_game_round_id ON events (game_id, round_number, id)")
+    cur.execute("CREATE INDEX idx_events_game_id ON events (game_id, id)")
+
+    # vote_tally: game_id v primárním klíči, triggery znovu s game_id
+    for trigger in ("trg_votes_tally_insert", "trg_votes_tally_delete", "trg_votes_tally_update"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cur.execute("DROP TABLE IF EXISTS vote_tally")
+    cur.execute("""
+        CREATE TABLE vote_tally (
+            game_id INTEGER NOT NULL,
+            round_number INTEGER NOT NULL,
+            phase TEXT NOT NULL,
+            target_id INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (game_id, round_number, phase, target_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_votes_tally_insert AFTER INSERT ON votes
+        BEGIN
+            INSERT INTO vote_tally (game_id, round_number, phase, target_id, count)
+            VALUES (NEW.game_id, NEW.round_number, NEW.phase, NEW.target_id, 1)
+            ON CONFLICT (game_id, round_number, phase, target_id) DO UPDATE SET count = count + 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_votes_tally_delete AFTER DELETE ON votes
+        BEGIN
+            UPDATE vote_tally SET count = count - 1
+            WHERE game_id = OLD.game_id AND round_number = OLD.round_number
+              AND phase = OLD.phase AND target_id = OLD.target_id;
+            DELETE FROM vote_tally
+            WHERE game_id = OLD.game_id AND round_number = OLD.round_number
+              AND phase = OLD.phase AND target_id = OLD.target_id AND count <= 0;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER trg_votes_tally_update AFTER UPDATE OF target_id, round_number, phase, game_id ON votes
+        WHEN OLD.target_id != NEW.target_id OR OLD.round_number != NEW.round_number
+          OR OLD.phase != NEW.phase OR OLD.game_id != NEW.game_id
+        BEGIN
+            UPDATE vote_tally SET count = count - 1
+            WHERE game_id = OLD.game_id AND round_number = OLD.round_number
+              AND phase = OLD.phase AND target_id = OLD.target_id;
+            DELETE FROM vote_tally
+            WHERE game_id = OLD.game_id AND round_number = OLD.round_number
+              AND phase = OLD.phase AND target_id = OLD.target_id AND count <= 0;
+            INSERT INTO vote_tally (game_id, round_number, phase, target_id, count)
+            VALUES (NEW.game_id, NEW.round_number, NEW.phase, NEW.target_id, 1)
+            ON CONFLICT (game_id, round_number, phase, target_id) DO UPDATE SET count = count + 1;
+        END
+    """)
+    cur.execute("""
+        INSERT INTO vote_tally (game_id, round_number, phase, target_id, count)
+        SELECT game_id, round_number, phase, target_id, COUNT(*) FROM votes
+        GROUP BY game_id, round_number, phase, target_id
+    """)
+
+
+# Seřazené migrace (verze, popis, funkce) - nové se přidávají pouze na konec
+def _migration_winner_constants(cur: sqlite3.Cursor):
+    """Sjednocení hodnot vítěze - engine dřív ukládal 'ZRÁDCI' a 'faithful'"""
+    cur.execute("UPDATE game_state SET winner = ? WHERE winner = 'ZRÁDCI'", (config.WINNER_TRAITORS,))
+
+
+def _migration_outbox(cur: sqlite3.Cursor):
+    """Odchozí emaily - zapisují se v transakci fázového přechodu, doručuje mailer"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_id INTEGER NOT NULL,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME
+        )
+    """)
+    # Výběr dávky k doručení: WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status_due ON outbox (status, next_attempt_at, id)")
+
+
+def _migration_email_validity(cur: sqlite3.Cursor):
+    """Normalizovaný email a jeho platnost uložené u hráče (ověření jednou, ne při každém odeslání)"""
+    from email_sender import normalize_email
+
+    cur.execute("ALTER TABLE players ADD COLUMN email_normalized TEXT")
+    cur.execute("ALTER TABLE players ADD COLUMN email_valid INTEGER NOT NULL DEFAULT 0")
+    cur.execute("SELECT id, email FROM players")
+    updates = []
+    for player_id, email in cur.fetchall():
+        normalized, valid = normalize_email(email)
+        updates.append((normalized, int(valid), player_id))
+    cur.executemany("UPDATE players SET email_normalized = ?, email_valid = ? WHERE id = ?", updates)
+
+
+def _migration_imap_sync(cur: sqlite3.Cursor):
+    """Kam až jsou stažené příchozí emaily (UIDVALIDITY a nejvyšší zpracované UID schránky)"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS imap_sync (
+            mailbox TEXT PRIMARY KEY,
+            uidvalidity INTEGER NOT NULL,
+            last_uid INTEGER NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _migration_inbound_messages(cur: sqlite3.Cursor):
+    """Deník příchozích emailů - každý email (podle Message-ID) se zpracuje právě jednou"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS inbound_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_key TEXT NOT NULL UNIQUE,
+            game_id INTEGER,
+            sender TEXT,
+            subject TEXT,
+            voter_id INTEGER,
+            target_id INTEGER,
+            status TEXT NOT NULL,
+            reason TEXT,
+            processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+MIGRATIONS = [
+    (1, "Základní tabulky", _migration_base_schema),
+    (2, "Indexy pro hlasy, události a hráče", _migration_indexes),
+    (3, "Unikátní hlas na hráče, kolo a fázi", _migration_unique_votes),
+    (4, "Průběžný součet hlasů (vote_tally)", _migration_vote_tally),
+    (5, "Více her v jedné databázi (game_id)", _migration_multi_game),
+    (6, "Jednotné hodnoty vítěze", _migration_winner_constants),
+    (7, "Fronta odchozích emailů (outbox)", _migration_outbox),
+    (8, "Ověřený a normalizovaný email hráče", _migration_email_validity),
+    (9, "Stav stahování příchozích emailů (imap_sync)", _migration_imap_sync),
+    (10, "Deník příchozích emailů (inbound_messages)", _migration_inbound_messages),
+]
+
+
+def get_schema_version() -> int:
+    """Aktuální verze schématu databáze (0 = neinicializovaná)"""
     with get_db() as conn:
         cur = conn.cursor()
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+        if not cur.fetchone():
+            return 0
+        cur.execute("SELECT MAX(version) FROM schema_version")
+        return cur.fetchone()[0] or 0
 
-        # Tabulka hráčů
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS players (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT NOT NULL UNIQUE,
-                role TEXT,
-                alive INTEGER DEFAULT 1,
-                eliminated_round INTEGER
-            )
-        """)
 
-        # Tabulka hlasů
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS votes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                voter_id INTEGER NOT NULL,
-                target_id INTEGER NOT NULL,
-                round_number INTEGER NOT NULL,
-                phase TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (voter_id) REFERENCES players (id),
-                FOREIGN KEY (target_id) REFERENCES players (id)
-            )
-        """)
-
-        # Tabulka stavu hry
+def init_db() -> List[int]:
+    """Inicializace databáze - spuštění chybějících migrací, vrací jejich verze"""
+    applied = []
+    current = get_schema_version()
+    with get_db() as conn:
+        cur = conn.cursor()
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS game_state (
-                id INTEGER PRIMARY KEY CHECK (id = 1),
-                round_number INTEGER DEFAULT 1,
-                phase TEXT DEFAULT 'inicializace',
-                started INTEGER DEFAULT 0,
-                finished INTEGER DEFAULT 0,
-                winner TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         """)
 
-        # Tabulka zpráv/událostí
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                round_number INTEGER,
-                phase TEXT,
-                event_type TEXT,
-                description TEXT,
-                moderator_note TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            # Každá migrace ve vlastní transakci, verze se ověřuje až pod zámkem
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+            if cur.fetchone():
+                conn.rollback()
+                continue
+            migrate(cur)
+            cur.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
             )
-        """)
+            conn.commit()
+            applied.append(version)
 
-        conn.commit()
+    return applied
 
 
 def reset_game():
-    """Resetování hry - smazání všech dat"""
+    """Resetování hry - smazání všech dat aktuální hry"""
+    game_id = current_game()
     with get_db() as conn:
         cur = conn.cursor()
-        cur.execute("DELETE FROM players")
-        cur.execute("DELETE FROM sqlite_sequence WHERE name='players'")
-        cur.execute("DELETE FROM votes")
-        cur.execute("DELETE FROM game_state")
-        cur.execute("DELETE FROM events")
-        conn.commit()
+        cur.execute("DELETE FROM players WHERE game_id = ?", (game_id,))
+        cur.execute("DELETE FROM votes WHERE game_id = ?", (game_id,))
+        cur.execute("DELETE FROM game_state WHERE id = ?", (game_id,))
+        cur.execute("DELETE FROM events WHERE game_id = ?", (game_id,))
+        cur.execute("DELETE FROM outbox WHERE game_id = ?", (game_id,))
+        # Číslování hráčů od 1 jen pokud v databázi nezbyla žádná jiná hra
+        cur.execute("SELECT 1 FROM players LIMIT 1")
+        if not cur.fetchone():
+            cur.execute("DELETE FROM sqlite_sequence WHERE name='players'")
+        _invalidate_player_cache()
+        _commit(conn)
+
+
+# === CACHE HRÁČŮ ===
+
+# Počítadla přes všechna vlákna procesu
+_player_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _player_cache() -> dict:
+    """
+    Cache hráčů aktuální hry, vlákna a připojení (podle ID i emailu), naplněná jedním dotazem.
+
+    Vlastní zápisy ji invalidují explicitně, zápisy jiných připojení
+    (jiný proces nebo vlákno) se poznají podle PRAGMA data_version.
+    """
+    game_id = current_game()
+    conn = _get_connection()
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    caches = getattr(_local, "player_cache", None)
+    if caches is None:
+        caches = _local.player_cache = {}
+    cache = caches.get((game_id, conn))
+
+    if cache is not None and cache["version"] == version:
+        _player_cache_stats["hits"] += 1
+        return cache
+
+    _player_cache_stats["misses"] += 1
+    cur = conn.cursor()
+    cur.row_factory = Player.row_factory
+    players = cur.execute("SELECT * FROM players WHERE game_id = ? ORDER BY id", (game_id,)).fetchall()
+    cache = {
+        "version": version,
+        "players": players,
+        "by_id": {p.id: p for p in players},
+        "by_email": {(p.email_normalized or p.email).lower(): p for p in players},
+    }
+    caches[(game_id, conn)] = cache
+    return cache
+
+
+def _invalidate_player_cache():
+    """Zahození cache hráčů (všech her) aktuálního vlákna"""
+    _local.player_cache = None
+
+
+def player_cache_stats() -> dict:
+    """Počet zásahů a výpadků cache hráčů"""
+    return dict(_player_cache_stats)
 
 
 # === HRÁČI ===
 
 def add_player(name: str, email: str) -> int:
-    """Přidání hráče"""
+    """Přidání hráče - email se ověří a normalizuje jednou tady, odesílání už platnosti věří"""
+    from email_sender import normalize_email
+
+    normalized, valid = normalize_email(email)
     with get_db() as conn:
         cur = conn.cursor()
-        cur.execute("INSERT INTO players (name, email) VALUES (?, ?)", (name, email))
-        conn.commit()
+        cur.execute(
+            "INSERT INTO players (game_id, name, email, email_normalized, email_valid) VALUES (?, ?, ?, ?, ?)",
+            (current_game(), name, email, normalized, int(valid))
+        )
+        _invalidate_player_cache()
+        _commit(conn)
         return cur.lastrowid
 
 
-def get_player(player_id: int) -> Optional[dict]:
+def get_player(player_id: int) -> Optional[Player]:
     """Získání hráče podle ID"""
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM players WHERE id = ?", (player_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+    player = _player_cache()["by_id"].get(player_id)
+    return player.copy() if player else None
 
 
-def get_player_by_email(email: str) -> Optional[dict]:
-    """Získání hráče podle emailové adresy"""
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM players WHERE email = ?", (email,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+def _email_key(email: str) -> str:
+    """Klíč pro vyhledání hráče podle adresy odesílatele - normalizovaná adresa bez ohledu na velikost písmen"""
+    from email_sender import normalize_email
 
+    # Bez DNS - ověření domény proběhlo při registraci, tady jde jen o tvar adresy
+    return normalize_email(email, check_deliverability=False)[0].lower()
 
-def get_all_players() -> List[dict]:
+
+def get_player_by_email(email: str) -> Optional[Player]:
+    """Získání hráče podle emailové adresy (porovnává se normalizovaná adresa)"""
+    player = _player_cache()["by_email"].get(_email_key(email))
+    return player.copy() if player else None
+
+
+def get_all_players() -> List[Player]:
     """Získání všech hráčů"""
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM players ORDER BY id")
-        return [dict(row) for row in cur.fetchall()]
+    return [p.copy() for p in _player_cache()["players"]]
 
 
-def get_alive_players() -> List[dict]:
+def get_alive_players() -> List[Player]:
     """Získání živých hráčů"""
     with get_db() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM players WHERE alive = 1 ORDER BY id")
-        return [dict(row) for row in cur.fetchall()]
+        cur.row_factory = Player.row_factory
+        cur.execute("SELECT * FROM players WHERE game_id = ? AND alive = 1 ORDER BY id", (current_game(),))
+        return cur.fetchall()
 
 
-def get_players_by_role(role: str, alive_only: bool = True) -> List[dict]:
+def get_players_by_role(role: str, alive_only: bool = True) -> List[Player]:
     """Získání hráčů podle role"""
     with get_db() as conn:
         cur = conn.cursor()
-        query = "SELECT * FROM players WHERE role = ?"
-        params = [role]
+        cur.row_factory = Player.row_factory
+        query = "SELECT * FROM players WHERE game_id = ? AND role = ?"
+        params = [current_game(), role]
         if alive_only:
             query += " AND alive = 1"
         query += " ORDER BY id"
         cur.execute(query, params)
-        return [dict(row) for row in cur.fetchall()]
+        return cur.fetchall()
 
 
 def update_player_role(player_id: int, role: str):
@@ -154,7 +791,20 @@ def update_player_role(player_id: int, role: str):
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute("UPDATE players SET role = ? WHERE id = ?", (role, player_id))
-        conn.commit()
+        _invalidate_player_cache()
+        _commit(conn)
+
+
+def update_player_roles(assignments: List[Tuple[int, str]]):
+    """Hromadné nastavení rolí [(player_id, role), ...] v jedné transakci"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "UPDATE players SET role = ? WHERE id = ?",
+            [(role, player_id) for player_id, role in assignments]
+        )
+        _invalidate_player_cache()
+        _commit(conn)
 
 
 def eliminate_player(player_id: int, round_number: int):
@@ -165,7 +815,8 @@ def eliminate_player(player_id: int, round_number: int):
             "UPDATE players SET alive = 0, eliminated_round = ? WHERE id = ?",
             (round_number, player_id)
         )
-        conn.commit()
+        _invalidate_player_cache()
+        _commit(conn)
 
 
 def get_latest_moderator_commentary() -> Optional[str]:
@@ -173,7 +824,12 @@ def get_latest_moderator_commentary() -> Optional[str]:
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute(
-            "SELECT moderator_note FROM events WHERE moderator_note IS NOT NULL AND moderator_note != '' ORDER BY timestamp DESC LIMIT 1"
+            """
+            SELECT moderator_note FROM events
+            WHERE game_id = ? AND moderator_note IS NOT NULL AND moderator_note != ''
+            ORDER BY id DESC LIMIT 1
+            """,
+            (current_game(),)
         )
         row = cur.fetchone()
         return row['moderator_note'] if row else None
@@ -185,19 +841,19 @@ def init_game_state():
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute(
-            "INSERT OR REPLACE INTO game_state (id, round_number, phase, started) VALUES (1, 1, ?, 1)",
-            (config.PHASE_INIT,)
+            "INSERT OR REPLACE INTO game_state (id, round_number, phase, started) VALUES (?, 1, ?, 1)",
+            (current_game(), config.PHASE_INIT)
         )
-        conn.commit()
+        _commit(conn)
 
 
-def get_game_state() -> Optional[dict]:
+def get_game_state() -> Optional[GameState]:
     """Získání aktuálního stavu hry"""
     with get_db() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM game_state WHERE id = 1")
-        row = cur.fetchone()
-        return dict(row) if row else None
+        cur.row_factory = GameState.row_factory
+        cur.execute("SELECT * FROM game_state WHERE id = ?", (current_game(),))
+        return cur.fetchone()
 
 
 def update_game_phase(phase: str):
@@ -205,10 +861,10 @@ def update_game_phase(phase: str):
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute(
-            "UPDATE game_state SET phase = ?, updated_at = CURRENT_TIMESTAMP WHERE id = 1",
-            (phase,)
+            "UPDATE game_state SET phase = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (phase, current_game())
         )
-        conn.commit()
+        _commit(conn)
 
 
 def increment_round():
@@ -216,9 +872,10 @@ def increment_round():
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute(
-            "UPDATE game_state SET round_number = round_number + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1"
+            "UPDATE game_state SET round_number = round_number + 1, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (current_game(),)
         )
-        conn.commit()
+        _commit(conn)
 
 
 def end_game(winner: str):
@@ -226,93 +883,561 @@ def end_game(winner: str):
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute(
-            "UPDATE game_state SET finished = 1, winner = ?, phase = ?, updated_at = CURRENT_TIMESTAMP WHERE id = 1",
-            (winner, config.PHASE_GAME_OVER)
+            "UPDATE game_state SET finished = 1, winner = ?, phase = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (winner, config.PHASE_GAME_OVER, current_game())
         )
-        conn.commit()
+        _commit(conn)
 
 
-# === HLASOVÁNÍ ===
+def get_games() -> List[GameState]:
+    """Stav všech her v databázi"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = GameState.row_factory
+        cur.execute("SELECT * FROM game_state ORDER BY id")
+        return cur.fetchall()
 
-def add_vote(voter_id: int, target_id: int, round_number: int, phase: str):
-    """Přidání hlasu"""
+
+def find_active_games_by_email(email: str) -> List[int]:
+    """ID rozehraných her, ve kterých hraje hráč s danou emailovou adresou (porovnává se normalizovaná adresa)"""
     with get_db() as conn:
         cur = conn.cursor()
-        # Nejdřív smazat předchozí hlas tohoto hráče v tomto kole a fázi
         cur.execute(
-            "DELETE FROM votes WHERE voter_id = ? AND round_number = ? AND phase = ?",
-            (voter_id, round_number, phase)
-        )
-        # Přidat nový hlas
-        cur.execute(
-            "INSERT INTO votes (voter_id, target_id, round_number, phase) VALUES (?, ?, ?, ?)",
-            (voter_id, target_id, round_number, phase)
+            """
+            SELECT p.game_id FROM players p
+            JOIN game_state g ON g.id = p.game_id
+            WHERE lower(coalesce(p.email_normalized, p.email)) = ? AND g.started = 1 AND g.finished = 0
+            ORDER BY p.game_id
+            """,
+            (_email_key(email),)
         )
-        conn.commit()
+        return [row['game_id'] for row in cur.fetchall()]
+
+
+class GameSnapshot:
+    """Stav hry a hráči načtení jednou - zápisy přes snapshot se promítnou i do něj"""
+
+    def __init__(self, state: Optional[GameState], players: List[Player]):
+        self.state = state
+        self.players = players
+        self._by_id = {p.id: p for p in players}
 
+    def reload(self):
+        """Znovunačtení stavu a hráčů z databáze"""
+        self.__init__(get_game_state(), get_all_players())
 
-def get_votes(round_number: int, phase: str) -> List[dict]:
-    """Získání hlasů pro dané kolo a fázi"""
-    from email_receiver import count_email_votes
-    from voting import vote as validate_and_vote
-    import time
+    def player(self, player_id: int) -> Optional[Player]:
+        return self._by_id.get(player_id)
 
-    # Zpracování emailových hlasů s plnou validací
-    email_votes = count_email_votes()
-    for v in email_votes:
-        if v.from_player_id and v.for_player_id:
-            # Volání vote() z voting.py, které provede všechny validace a přidá hlas
-            validate_and_vote(voter_id=v.from_player_id, target_id=v.for_player_id)
-    time.sleep(0.1)
+    def alive_players(self) -> List[Player]:
+        return [p for p in self.players if p.alive]
+
+    def players_by_role(self, role: str, alive_only: bool = True) -> List[Player]:
+        return [p for p in self.players if p.role == role and (p.alive or not alive_only)]
+
+    def set_roles(self, assignments: List[Tuple[int, str]]):
+        update_player_roles(assignments)
+        for player_id, role in assignments:
+            self._by_id[player_id].role = role
+
+    def eliminate(self, player_id: int, round_number: int):
+        eliminate_player(player_id, round_number)
+        player = self._by_id[player_id]
+        player.alive = 0
+        player.eliminated_round = round_number
+
+    def set_phase(self, phase: str):
+        update_game_phase(phase)
+        self.state.phase = phase
+
+    def next_round(self):
+        increment_round()
+        self.state.round_number += 1
+
+    def end_game(self, winner: str):
+        end_game(winner)
+        self.state.finished = 1
+        self.state.winner = winner
+        self.state.phase = config.PHASE_GAME_OVER
+
+
+def load_snapshot() -> GameSnapshot:
+    """Načtení stavu hry a všech hráčů"""
+    return GameSnapshot(get_game_state(), get_all_players())
+
+
+# === HLASOVÁNÍ ===
 
+# Nový hlas, nebo změna cíle u existujícího hlasu - jediný atomický příkaz
+_UPSERT_VOTE = """
+    INSERT INTO votes (voter_id, target_id, round_number, phase, game_id) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (game_id, round_number, phase, voter_id)
+    DO UPDATE SET target_id = excluded.target_id, timestamp = CURRENT_TIMESTAMP
+"""
+
+
+def add_vote(voter_id: int, target_id: int, round_number: int, phase: str):
+    """Přidání hlasu (případně přepsání předchozího hlasu hráče v téže fázi)"""
     with get_db() as conn:
         cur = conn.cursor()
+        cur.execute(_UPSERT_VOTE, (voter_id, target_id, round_number, phase, current_game()))
+        _commit(conn)
+
+
+def add_votes_bulk(votes: List[Tuple[int, int, int, str]]) -> int:
+    """Hromadné přidání již ověřených hlasů [(voter_id, target_id, round_number, phase), ...] v jedné transakci"""
+    if not votes:
+        return 0
+    with get_db() as conn:
+        cur = conn.cursor()
+        game_id = current_game()
+        cur.executemany(_UPSERT_VOTE, [(*vote, game_id) for vote in votes])
+        _commit(conn)
+    return len(votes)
+
+
+def get_votes(round_number: int, phase: str) -> List[VoteRecord]:
+    """Získání hlasů pro dané kolo a fázi (jen dotaz - emailové hlasy zapisuje 'zradci ingest'/'listen')"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = VoteRecord.row_factory
         cur.execute(
-            "SELECT * FROM votes WHERE round_number = ? AND phase = ? ORDER BY timestamp",
-            (round_number, phase)
+            "SELECT * FROM votes WHERE game_id = ? AND round_number = ? AND phase = ? ORDER BY timestamp",
+            (current_game(), round_number, phase)
         )
-        return [dict(row) for row in cur.fetchall()]
+        return cur.fetchall()
 
 
 def count_votes(round_number: int, phase: str) -> List[Tuple[int, int]]:
-    """Spočítání hlasů - vrací [(target_id, count), ...]"""
+    """Spočítání hlasů - vrací [(target_id, count), ...] seřazené od nejvíce hlasů"""
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT target_id, COUNT(*) as count 
-            FROM votes 
-            WHERE round_number = ? AND phase = ? 
-            GROUP BY target_id 
-            ORDER BY count DESC
+            SELECT target_id, count
+            FROM vote_tally
+            WHERE game_id = ? AND round_number = ? AND phase = ?
+            ORDER BY count DESC, target_id
             """,
-            (round_number, phase)
+            (current_game(), round_number, phase)
         )
         return [(row['target_id'], row['count']) for row in cur.fetchall()]
 
 
+def get_vote_leaders(round_number: int, phase: str) -> Tuple[int, List[int]]:
+    """Nejvyšší počet hlasů a ID všech hráčů, kteří ho mají (více ID = remíza)"""
+    votes = count_votes(round_number, phase)
+    if not votes:
+        return 0, []
+    max_votes = votes[0][1]
+    return max_votes, [target_id for target_id, count in votes if count == max_votes]
+
+
 # === UDÁLOSTI ===
 
-def add_event(round_number: int, phase: str, event_type: str, description: str, moderator_note: str = ""):
-    """Přidání události do logu"""
+def add_event(round_number: int, phase: str, event_type: str, description: str, moderator_note: Optional[str] = "") -> int:
+    """Přidání události do logu - vrací ID události (moderator_note None = komentář se teprve doplní)"""
     with get_db() as conn:
         cur = conn.cursor()
         cur.execute(
-            "INSERT INTO events (round_number, phase, event_type, description, moderator_note) VALUES (?, ?, ?, ?, ?)",
-            (round_number, phase, event_type, description, moderator_note)
+            """
+            INSERT INTO events (game_id, round_number, phase, event_type, description, moderator_note)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (current_game(), round_number, phase, event_type, description, moderator_note)
         )
-        conn.commit()
+        _commit(conn)
+        return cur.lastrowid
+
+
+def set_event_notes(notes: List[Tuple[str, int]]):
+    """Doplnění komentářů moderátora k už zapsaným událostem [(moderator_note, event_id), ...]"""
+    if not notes:
+        return
+    with get_db() as conn:
+        # Jen dosud chybějící komentáře - stejnou událost mohl doplnit už jiný proces
+        conn.executemany("UPDATE events SET moderator_note = ? WHERE id = ? AND moderator_note IS NULL", notes)
+        _commit(conn)
 
 
-def get_events(round_number: Optional[int] = None) -> List[dict]:
+def get_events_without_notes(limit: int) -> List[Tuple[int, int]]:
+    """Události (všech her), ke kterým se ještě nedoplnil komentář moderátora [(game_id, event_id), ...]"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT game_id, id FROM events WHERE moderator_note IS NULL ORDER BY id LIMIT ?", (limit,))
+        return [(row['game_id'], row['id']) for row in cur.fetchall()]
+
+
+def get_events(round_number: Optional[int] = None) -> List[Event]:
     """Získání událostí"""
     with get_db() as conn:
         cur = conn.cursor()
+        cur.row_factory = Event.row_factory
         if round_number:
-            cur.execute("SELECT * FROM events WHERE round_number = ? ORDER BY timestamp", (round_number,))
+            cur.execute(
+                "SELECT * FROM events WHERE game_id = ? AND round_number = ? ORDER BY id",
+                (current_game(), round_number)
+            )
+        else:
+            cur.execute("SELECT * FROM events WHERE game_id = ? ORDER BY id", (current_game(),))
+        return cur.fetchall()
+
+def get_events_since(event_id: int = 0, limit: Optional[int] = None) -> List[Event]:
+    """Události aktuální hry s ID větším než event_id (kurzor), od nejstarší"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = Event.row_factory
+        cur.execute(
+            "SELECT * FROM events WHERE game_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (current_game(), event_id, -1 if limit is None else limit)
+        )
+        return cur.fetchall()
+
+
+def get_recent_events(limit: int = 10) -> List[Event]:
+    """Posledních N událostí aktuální hry, od nejstarší"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = Event.row_factory
+        cur.execute(
+            """
+            SELECT * FROM (
+                SELECT * FROM events WHERE game_id = ? ORDER BY id DESC LIMIT ?
+            ) ORDER BY id
+            """,
+            (current_game(), limit)
+        )
+        return cur.fetchall()
+
+# === OUTBOX ===
+
+OUTBOX_PENDING = "pending"  # Čeká na doručení (případně na další pokus)
+OUTBOX_SENT = "sent"  # Doručeno
+OUTBOX_DEAD = "dead"  # Trvalá chyba nebo vyčerpané pokusy
+OUTBOX_SKIPPED = "skipped"  # SMTP není nastavené, zpráva se jen vypsala
+
+
+def enqueue_messages(messages: List[Tuple[str, str]], subject: str) -> int:
+    """Zařazení emailů [(email, text), ...] aktuální hry do outboxu - vrací počet"""
+    if not messages:
+        return 0
+    game_id = current_game()
+    with get_db() as conn:
+        conn.executemany(
+            "INSERT INTO outbox (game_id, recipient, subject, body) VALUES (?, ?, ?, ?)",
+            [(game_id, email, subject, text) for email, text in messages]
+        )
+        _commit(conn)
+    return len(messages)
+
+
+def claim_outbox_batch(limit: int, lease_seconds: float) -> List[OutboxMessage]:
+    """
+    Výběr dávky emailů k doručení (všech her), nejstarší první.
+
+    Vybraným zprávám se posune next_attempt_at o lease_seconds - souběžný mailer
+    je nevezme znovu a po pádu mailera se po uplynutí lhůty doručí znovu.
+    """
+    now = time.time()
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = OutboxMessage.row_factory
+        conn.execute("BEGIN IMMEDIATE")
+        cur.execute(
+            "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (OUTBOX_PENDING, now, limit)
+        )
+        batch = cur.fetchall()
+        cur.executemany(
+            "UPDATE outbox SET next_attempt_at = ? WHERE id = ?",
+            [(now + lease_seconds, message.id) for message in batch]
+        )
+        conn.commit()
+    return batch
+
+
+def mark_outbox_done(message_ids: List[int], status: str = OUTBOX_SENT):
+    """Označení emailů jako doručených (nebo přeskočených)"""
+    with get_db() as conn:
+        conn.executemany(
+            "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = NULL, sent_at = CURRENT_TIMESTAMP WHERE id = ?",
+            [(status, message_id) for message_id in message_ids]
+        )
+        _commit(conn)
+
+
+def mark_outbox_failed(failures: List[Tuple[int, str, Optional[float]]]):
+    """Zaznamenání neúspěšných pokusů [(id, chyba, další pokus nebo None = dead), ...]"""
+    with get_db() as conn:
+        conn.executemany(
+            """
+            UPDATE outbox
+            SET attempts = attempts + 1, last_error = ?,
+                status = CASE WHEN ? IS NULL THEN ? ELSE status END,
+                next_attempt_at = COALESCE(?, next_attempt_at)
+            WHERE id = ?
+            """,
+            [(error, retry_at, OUTBOX_DEAD, retry_at, message_id) for message_id, error, retry_at in failures]
+        )
+        _commit(conn)
+
+
+def get_outbox_stats() -> dict:
+    """Počet emailů podle stavu {status: count} (všech her)"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT status, COUNT(*) AS count FROM outbox GROUP BY status")
+        return {row['status']: row['count'] for row in cur.fetchall()}
+
+
+def get_outbox_messages(status: str, limit: int = 20) -> List[OutboxMessage]:
+    """Poslední emaily v daném stavu (všech her), od nejnovějšího"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = OutboxMessage.row_factory
+        cur.execute("SELECT * FROM outbox WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit))
+        return cur.fetchall()
+
+
+def count_pending_outbox() -> int:
+    """Počet nedoručených emailů aktuální hry"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT COUNT(*) FROM outbox WHERE game_id = ? AND status = ?",
+            (current_game(), OUTBOX_PENDING)
+        )
+        return cur.fetchone()[0]
+
+
+def retry_dead_outbox() -> int:
+    """Vrácení všech emailů z dead-letter zpět do fronty - vrací počet"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = 0 WHERE status = ?",
+            (OUTBOX_PENDING, OUTBOX_DEAD)
+        )
+        _commit(conn)
+        return cur.rowcount
+
+
+# === PŘÍJEM EMAILŮ ===
+
+def get_imap_sync(mailbox: str) -> Optional[Tuple[int, int]]:
+    """(UIDVALIDITY, poslední zpracované UID) schránky, None = ještě se nestahovala"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT uidvalidity, last_uid FROM imap_sync WHERE mailbox = ?", (mailbox,))
+        row = cur.fetchone()
+        return (row['uidvalidity'], row['last_uid']) if row else None
+
+
+def set_imap_sync(mailbox: str, uidvalidity: int, last_uid: int):
+    """Uložení, kam až jsou emaily schránky zpracované (společné pro všechny hry)"""
+    with get_db() as conn:
+        conn.execute(
+            """
+            INSERT INTO imap_sync (mailbox, uidvalidity, last_uid) VALUES (?, ?, ?)
+            ON CONFLICT (mailbox) DO UPDATE SET
+                uidvalidity = excluded.uidvalidity, last_uid = excluded.last_uid, updated_at = CURRENT_TIMESTAMP
+            """,
+            (mailbox, uidvalidity, last_uid)
+        )
+        _commit(conn)
+
+
+INBOUND_APPLIED = "applied"  # Hlas zapsán
+INBOUND_REJECTED = "rejected"  # Email nebyl platný hlas (důvod v reason)
+
+
+def get_processed_inbound(keys: List[str]) -> set:
+    """Které z klíčů emailů (Message-ID) už jsou v deníku příchozích"""
+    processed = set()
+    with get_db() as conn:
+        cur = conn.cursor()
+        # Po částech kvůli limitu parametrů SQLite
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            cur.execute(
+                f"SELECT message_key FROM inbound_messages WHERE message_key IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            processed.update(row['message_key'] for row in cur.fetchall())
+    return processed
+
+
+def record_inbound(entries: List[Tuple]):
+    """
+    Zápis zpracovaných emailů do deníku příchozích
+    [(message_key, game_id, sender, subject, voter_id, target_id, status, reason), ...]
+
+    Uvnitř transaction() se commitne společně s hlasy. Už zapsaný klíč je chyba (UNIQUE) -
+    volající ho má vyloučit přes get_processed_inbound ve stejné transakci.
+    """
+    if not entries:
+        return
+    with get_db() as conn:
+        conn.executemany(
+            """
+            INSERT INTO inbound_messages
+                (message_key, game_id, sender, subject, voter_id, target_id, status, reason)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            entries
+        )
+        _commit(conn)
+
+
+def get_inbound_messages(status: Optional[str] = None, limit: int = 20) -> List[InboundMessage]:
+    """Poslední zpracované příchozí emaily (všech her), od nejnovějšího"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = InboundMessage.row_factory
+        if status:
+            cur.execute("SELECT * FROM inbound_messages WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit))
         else:
-            cur.execute("SELECT * FROM events ORDER BY timestamp")
-        return [dict(row) for row in cur.fetchall()]
+            cur.execute("SELECT * FROM inbound_messages ORDER BY id DESC LIMIT ?", (limit,))
+        return cur.fetchall()
+
+
+# === ARCHIV ===
+
+# Tabulky s daty jedné hry a sloupec s ID hry
+GAME_TABLES = {"game_state": "id", "players": "game_id", "votes": "game_id", "events": "game_id"}
+
+
+def _dump_tables(conn: sqlite3.Connection, game_id: int) -> dict:
+    tables = {}
+    cur = conn.cursor()
+    for table, game_column in GAME_TABLES.items():
+        cur.execute(f"SELECT * FROM {table} WHERE {game_column} = ? ORDER BY id", (game_id,))
+        tables[table] = {
+            "columns": [d[0] for d in cur.description],
+            "rows": [list(row) for row in cur.fetchall()],
+        }
+    return tables
+
+
+def dump_game() -> dict:
+    """Všechna data aktuální hry {tabulka: {"columns": [...], "rows": [[...], ...]}}"""
+    with get_db() as conn:
+        return _dump_tables(conn, current_game())
+
+
+def load_game(tables: dict):
+    """Vložení dat ve formátu dump_game() - sloupce, které aktuální schéma nezná, se vynechají"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        for table in GAME_TABLES:
+            data = tables.get(table)
+            if not data or not data["rows"]:
+                continue
+            cur.execute(f"SELECT * FROM {table} LIMIT 0")
+            known = {d[0] for d in cur.description}
+            indexes = [i for i, column in enumerate(data["columns"]) if column in known]
+            columns = ", ".join(data["columns"][i] for i in indexes)
+            placeholders = ", ".join("?" for _ in indexes)
+            cur.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                [[row[i] for i in indexes] for row in data["rows"]]
+            )
+        _invalidate_player_cache()
+        _commit(conn)
+
+# === CHECKPOINTY ===
+
+def _checkpoint_path(name: str) -> str:
+    """Cesta souboru checkpointu podle jména"""
+    if not re.fullmatch(r"[\w.-]+", name):
+        raise ValueError(f"Neplatné jméno checkpointu: {name!r}")
+    return os.path.join(config.CHECKPOINT_DIR, f"{name}.db")
+
+
+def list_checkpoints() -> List[dict]:
+    """Seznam checkpointů od nejnovějšího [{name, path, created, size}, ...]"""
+    if not os.path.isdir(config.CHECKPOINT_DIR):
+        return []
+    checkpoints = []
+    for filename in os.listdir(config.CHECKPOINT_DIR):
+        if not filename.endswith(".db"):
+            continue
+        path = os.path.join(config.CHECKPOINT_DIR, filename)
+        stat = os.stat(path)
+        checkpoints.append({"name": filename[:-3], "path": path, "created": stat.st_mtime, "size": stat.st_size})
+    return sorted(checkpoints, key=lambda c: c["created"], reverse=True)
+
+
+def create_checkpoint(name: Optional[str] = None) -> dict:
+    """
+    Konzistentní kopie celé databáze (všech her) přes SQLite online backup API.
+
+    Kopíruje se po CHECKPOINT_PAGES stránkách z jednoho čtecího snapshotu,
+    takže zápisy ostatních procesů (WAL) běží dál a záloha se nerestartuje.
+    Starší checkpointy nad CHECKPOINT_KEEP se smažou.
+    """
+    if getattr(_local, "tx_depth", 0):
+        raise RuntimeError("Checkpoint nelze vytvořit uvnitř transakce")
+
+    name = name or time.strftime("%Y%m%d-%H%M%S")
+    path = _checkpoint_path(name)
+    os.makedirs(config.CHECKPOINT_DIR, exist_ok=True)
+
+    conn = _get_connection()
+    tmp_path = path + ".tmp"
+    target = sqlite3.connect(tmp_path)
+    try:
+        # Čtecí transakce drží jeden snapshot po celou dobu kopírování
+        conn.execute("BEGIN")
+        conn.execute("SELECT 1 FROM schema_version LIMIT 1").fetchall()
+        conn.backup(target, pages=config.CHECKPOINT_PAGES)
+        # Kopie přebírá WAL režim zdroje - checkpoint je jeden soubor bez -wal/-shm
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.rollback()
+        target.close()
+    os.replace(tmp_path, path)
+
+    for old in list_checkpoints()[config.CHECKPOINT_KEEP:]:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(old["path"] + suffix):
+                os.remove(old["path"] + suffix)
+
+    return {"name": name, "path": path, "size": os.path.getsize(path)}
+
+
+def restore_checkpoint(name: str):
+    """
+    Obnovení aktuální hry z checkpointu - atomicky, v jedné transakci.
+
+    Vrací se jen řádky hry (GAME_TABLES), ostatní hry v databázi zůstanou, stejně jako
+    poštovní tabulky (outbox, imap_sync, inbound_messages) - odeslané emaily se nepošlou
+    znovu a zpracované příchozí se nezapočítají podruhé.
+    """
+    if getattr(_local, "tx_depth", 0):
+        raise RuntimeError("Checkpoint nelze obnovit uvnitř transakce")
+
+    path = _checkpoint_path(name)
+    if not os.path.exists(path):
+        raise ValueError(f"Checkpoint {name} neexistuje")
+
+    game_id = current_game()
+    # immutable: checkpoint se už nemění, SQLite k němu nevytváří -wal/-shm ani zámky
+    source = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro&immutable=1", uri=True)
+    try:
+        tables = _dump_tables(source, game_id)
+    finally:
+        source.close()
+    if not tables["game_state"]["rows"] and not tables["players"]["rows"]:
+        raise ValueError(f"Checkpoint {name} neobsahuje hru {game_id}")
+
+    with transaction():
+        with get_db() as conn:
+            for table, game_column in GAME_TABLES.items():
+                conn.execute(f"DELETE FROM {table} WHERE {game_column} = ?", (game_id,))
+        load_game(tables)
+    _invalidate_player_cache()
+
 
 if __name__ == "__main__":
     r=get_votes(1, ".")
\ No newline at end of file
@@ -22,7 +22,7 @@ def generate_narrator_commentary() -> str:
             return ""
 
         players = models.get_all_players()
-        events = models.get_events()
+        events = models.get_recent_events(5)
 
         # Připravit kontext pro LLM (BEZ rolí!)
         context = _prepare_context(state, players, events)
@@ -101,7 +101,7 @@ def _prepare_context(state: dict, players: list, events: list, events_limit: int
     dead_names = ", ".join([f"{p['name']} ({p['role']})" for p in dead_players]) if dead_players else "zatím nikdo"
 
     # Nedávné události (omezeno na posledních N)
-    events_texts: list[str] = [f"{event['phase']} - {event['description']}, moderátor: {event['moderator_note']}" 
+    events_texts: list[str] = [f"{event['phase']} - {event['description']}, moderátor: {event['moderator_note'] or ''}" 
                                for event in events[-events_limit:]]
     events_text = "\n".join(events_texts) if events else "Žádné významné události"
 
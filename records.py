@@ -0,0 +1,107 @@
+"""
+Záznamy z databáze - kompaktní objekty se __slots__ místo slovníků
+
+Záznamy vytváří přímo row factory kurzoru (Player.row_factory). Kvůli postupnému
+přechodu podporují i rozhraní slovníku (player['name'], .get(), dict(player)),
+neznámý klíč ale končí KeyError - překlep se projeví hned, ne až jako None.
+"""
+from typing import Any, Iterator, Tuple
+
+
+class Record:
+    """Základ záznamu: pole ve __slots__ a kompatibilní rozhraní slovníku"""
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.pop(field, None))
+        if values:
+            raise TypeError(f"{type(self).__name__} nemá pole: {', '.join(values)}")
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """Row factory pro sqlite3 - `cur.row_factory = Player.row_factory`"""
+        record = cls.__new__(cls)
+        for column, value in zip(cursor.description, row):
+            setattr(record, column[0], value)
+        return record
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}={getattr(self, key)!r}" for key in self.keys())
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, key, None) == getattr(other, key, None) for key in self.__slots__)
+
+    # --- Rozhraní slovníku ---
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ and hasattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Tuple[str, ...]:
+        return tuple(key for key in self.__slots__ if hasattr(self, key))
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def copy(self):
+        record = type(self).__new__(type(self))
+        for key in self.keys():
+            setattr(record, key, getattr(self, key))
+        return record
+
+
+class Player(Record):
+    """Hráč (tabulka players)"""
+    __slots__ = ("id", "game_id", "name", "email", "role", "alive", "eliminated_round", "email_normalized", "email_valid")
+
+
+class VoteRecord(Record):
+    """Hlas (tabulka votes)"""
+    __slots__ = ("id", "game_id", "voter_id", "target_id", "round_number", "phase", "timestamp")
+
+
+class Event(Record):
+    """Událost (tabulka events)"""
+    __slots__ = ("id", "game_id", "round_number", "phase", "event_type", "description", "moderator_note", "timestamp")
+
+
+class GameState(Record):
+    """Stav hry (tabulka game_state, id = ID hry)"""
+    __slots__ = ("id", "round_number", "phase", "started", "finished", "winner", "created_at", "updated_at")
+
+
+class OutboxMessage(Record):
+    """Odchozí email (tabulka outbox)"""
+    __slots__ = ("id", "game_id", "recipient", "subject", "body", "status", "attempts",
+                 "next_attempt_at", "last_error", "created_at", "sent_at")
+
+
+class InboundMessage(Record):
+    """Zpracovaný příchozí email (tabulka inbound_messages)"""
+    __slots__ = ("id", "message_key", "game_id", "sender", "subject", "voter_id", "target_id",
+                 "status", "reason", "processed_at")
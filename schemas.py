@@ -6,6 +6,8 @@ import re
 class Vote(BaseModel):
     from_email: str
     text: str
+    subject: str = ""
+    message_key: Optional[str] = None  # Message-ID (klíč v deníku příchozích emailů)
 
     @property
     def for_player_id(self) -> Optional[int]:
@@ -26,21 +28,45 @@ class Vote(BaseModel):
             print(f"⚠️  Nepodařilo se parsovat hlas z: '{self.text[:50]}...': {e}")
             return None
 
+    @property
+    def email_address(self) -> str:
+        """Samotná emailová adresa odesílatele"""
+        # Podporuje různé formáty:
+        # "email@domain.com"
+        # "Name <email@domain.com>"
+        # "\"Name\" <email@domain.com>"
+        if "<" in self.from_email and ">" in self.from_email:
+            return self.from_email.split("<", 1)[1].split(">", 1)[0].strip()
+        return self.from_email.strip()
+
+    @property
+    def game_id(self) -> Optional[int]:
+        """Hra, do které hlas patří - podle tagu '#N' v předmětu, jinak podle odesílatele"""
+        from models import find_active_games_by_email
+        import config
+
+        match = re.search(r'#(\d+)', self.subject)
+        if match:
+            return int(match.group(1))
+
+        games = find_active_games_by_email(self.email_address)
+        if len(games) == 1:
+            return games[0]
+        # Předmět bez tagu odpovídá emailům výchozí hry
+        if config.DEFAULT_GAME_ID in games:
+            return config.DEFAULT_GAME_ID
+        if games:
+            print(f"⚠️  Hráč '{self.email_address}' hraje více her {games}, předmět neobsahuje '#ID hry'")
+        return None
+
     @property
     def from_player_id(self) -> Optional[int]:
-        """Extrakce ID hráče z emailové adresy - s error handlingem"""
+        """Extrakce ID hráče (v aktuální hře) z emailové adresy - s error handlingem"""
         from models import get_player_by_email
 
         try:
-            # Podporuje různé formáty:
-            # "email@domain.com"
-            # "Name <email@domain.com>"
-            # "\"Name\" <email@domain.com>"
-            if "<" in self.from_email and ">" in self.from_email:
-                email_only = self.from_email.split("<", 1)[1].split(">", 1)[0].strip()
-            else:
-                email_only = self.from_email.strip()
-            
+            email_only = self.email_address
+
             player = get_player_by_email(email_only)
             if not player:
                 print(f"⚠️  Hráč s emailem '{email_only}' nebyl nalezen v databázi")
@@ -0,0 +1,64 @@
+import contextlib
+import io
+
+import pytest
+
+import config
+import devmail
+import email_sender
+import models
+import narrator
+
+GAME_ADDRESS = "hra@zradci.test"
+
+
+@pytest.fixture
+def db():
+    """Prázdná databáze v paměti (bez migrací)"""
+    with models.use_storage(models.MemoryStorage()):
+        yield
+
+
+@pytest.fixture
+def players(db):
+    """Databáze s 8 přihlášenými hráči (hra ještě nezačala) - vrací ID hráčů"""
+    models.init_db()
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [models.add_player(f"Hráč {i}", f"hrac{i}@example.com") for i in range(8)]
+
+
+@pytest.fixture
+def game(players):
+    """Rozehraná hra s 8 hráči ve fázi denního hlasování - vrací ID hráčů"""
+    ids = players
+    models.init_game_state()
+    models.update_game_phase(config.PHASE_DAY_VOTE)
+    return ids
+
+
+@pytest.fixture
+def commentary(monkeypatch):
+    """Místo LLM pevný komentář - vrací seznam volání"""
+    calls = []
+
+    def generate():
+        calls.append(models.current_game())
+        return "Komentář moderátora"
+
+    monkeypatch.setattr(narrator, "generate_narrator_commentary", generate)
+    return calls
+
+
+@pytest.fixture
+def mail_server(monkeypatch):
+    """devmail server na náhodných portech, config po testu vrátí monkeypatch"""
+    for name in (
+        "SMTP_SERVER", "SMTP_PORT", "SMTP_USE_SSL", "SMTP_USE_TLS",
+        "IMAP_SERVER", "IMAP_PORT", "IMAP_USE_SSL", "EMAIL_FROM", "EMAIL_PASSWORD",
+    ):
+        monkeypatch.setattr(config, name, getattr(config, name))
+    with devmail.DevMailServer() as server:
+        server.configure(GAME_ADDRESS)
+        yield server
+        # Pool by jinak další test poslal poštu starému serveru
+        email_sender.close_connection()
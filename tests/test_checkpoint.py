@@ -0,0 +1,60 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+import config
+import models
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHECKPOINT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_restore_returns_only_current_game(game, checkpoint_dir):
+    """Obnovení vrátí aktuální hru, jiné hry a outbox zůstanou v novějším stavu"""
+    phase = config.PHASE_DAY_VOTE
+    with models.use_game(2), contextlib.redirect_stdout(io.StringIO()):
+        other = [models.add_player(f"Hráčka {i}", f"hracka{i}@example.com") for i in range(8)]
+        models.init_game_state()
+        models.update_game_phase(phase)
+    models.add_vote(game[0], game[1], 1, phase)
+    checkpoint = models.create_checkpoint("pred-hlasovanim")["name"]
+
+    models.add_vote(game[0], game[2], 1, phase)
+    models.add_vote(game[3], game[2], 1, phase)
+    models.eliminate_player(game[5], 1)
+    with models.use_game(2):
+        models.add_vote(other[0], other[1], 1, phase)
+    models.enqueue_messages([("hrac0@example.com", "Hlas přijat")], "Hra Zrádci")
+
+    models.restore_checkpoint(checkpoint)
+
+    assert models.count_votes(1, phase) == [(game[1], 1)]
+    assert all(p['alive'] for p in models.get_all_players())
+    with models.use_game(2):
+        assert models.count_votes(1, phase) == [(other[1], 1)]
+    assert models.get_outbox_stats() == {models.OUTBOX_PENDING: 1}
+
+
+def test_restore_missing_game_is_refused(game, checkpoint_dir):
+    """Checkpoint bez aktuální hry databázi nezmění"""
+    checkpoint = models.create_checkpoint("bez-hry-3")["name"]
+    with models.use_game(3):
+        with pytest.raises(ValueError):
+            models.restore_checkpoint(checkpoint)
+    assert len(models.get_all_players()) == 8
+
+
+def test_checkpoint_retention(game, checkpoint_dir, monkeypatch):
+    """Ponechá se CHECKPOINT_KEEP nejnovějších checkpointů, bez souborů -wal/-shm"""
+    monkeypatch.setattr(config, "CHECKPOINT_KEEP", 2)
+    for i in range(4):
+        models.create_checkpoint(f"c{i}")
+        os.utime(checkpoint_dir / f"c{i}.db", (i, i))
+
+    models.create_checkpoint("c4")
+    assert sorted(os.listdir(checkpoint_dir)) == ["c3.db", "c4.db"]
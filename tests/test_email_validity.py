@@ -0,0 +1,40 @@
+import contextlib
+import io
+
+import config
+import models
+import voting
+
+
+def _message(sender: str, text: str) -> dict:
+    return {"from": sender, "subject": "Re: Hra Zrádci", "text": text, "key": None}
+
+
+def test_email_is_normalized_at_registration(db):
+    """Adresa se ověří a normalizuje jednou při přidání hráče"""
+    models.init_db()
+    with contextlib.redirect_stdout(io.StringIO()):
+        valid = models.add_player("Jan", "Jan.Novak@Example.COM")
+        invalid = models.add_player("Petr", "petr@@example")
+
+    jan, petr = models.get_player(valid), models.get_player(invalid)
+    assert (jan['email_normalized'], jan['email_valid']) == ("Jan.Novak@example.com", 1)
+    assert (petr['email_normalized'], petr['email_valid']) == ("petr@@example", 0)
+
+
+def test_sender_matched_by_normalized_address(game):
+    """Odpověď z jinak zapsané adresy hráče (velikost písmen, jméno v hlavičce) se přiřadí správnému hráči"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        jan = models.add_player("Jan Novák", "Jan.Novak@Example.COM")
+
+    assert models.find_active_games_by_email("jan.novak@example.com") == [config.DEFAULT_GAME_ID]
+    assert models.get_player_by_email("JAN.NOVAK@EXAMPLE.COM")['id'] == jan
+
+    recorded = voting.ingest_email_votes([
+        _message("Jan Novák <jan.novak@example.com>", str(game[1])),
+        _message("HRAC0@Example.com", str(game[2])),
+    ])
+    assert recorded == 2
+    assert sorted((v['voter_id'], v['target_id']) for v in models.get_votes(1, config.PHASE_DAY_VOTE)) == [
+        (game[0], game[2]), (jan, game[1]),
+    ]
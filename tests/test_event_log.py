@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+import config
+import event_log
+import game_engine
+import models
+import narrator
+
+
+@pytest.fixture
+def write_behind(monkeypatch):
+    monkeypatch.setattr(config, "EVENT_WRITE_BEHIND", True)
+    yield
+    assert event_log.flush_events(5)
+
+
+def _notes() -> dict:
+    return {e['event_type']: e['moderator_note'] for e in models.get_events()}
+
+
+def test_commentary_filled_in_background(players, commentary, write_behind):
+    """Přechod zapíše událost hned, komentář doplní zapisovač na pozadí"""
+    game_engine.start_game()
+    game_engine.next_phase()
+
+    assert event_log.flush_events(5)
+    assert _notes()["night_chat"] == "Komentář moderátora"
+    assert event_log.pending_events() == 0
+
+
+def test_flush_is_bounded(players, write_behind, monkeypatch):
+    """Čekání na pomalé LLM má horní mez - nedokončený komentář zůstane NULL"""
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "Pozdní komentář"
+
+    monkeypatch.setattr(narrator, "generate_narrator_commentary", slow)
+    game_engine.start_game()
+    game_engine.next_phase()
+
+    assert not event_log.flush_events(0.05)
+    assert event_log.pending_events() == 1
+    assert _notes()["night_chat"] is None
+
+    release.set()
+    assert event_log.flush_events(5)
+    assert _notes()["night_chat"] == "Pozdní komentář"
+
+
+def test_missing_commentary_is_backfilled(players, commentary, write_behind, monkeypatch):
+    """Komentář, který proces nestihl (skončil před zápisem), doplní backfill - každý jen jednou"""
+    with monkeypatch.context() as m:
+        m.setattr(event_log, "queue_commentary", lambda event_ids: None)
+        game_engine.start_game()
+        game_engine.next_phase()
+        game_engine.next_phase()
+    assert [note for note in _notes().values() if note is None] == [None, None]
+
+    assert event_log.backfill_commentary() == 2
+    assert event_log.flush_events(5)
+    assert None not in _notes().values()
+    assert len(commentary) == 2
+    assert event_log.backfill_commentary() == 0
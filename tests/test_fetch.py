@@ -0,0 +1,57 @@
+from email.utils import make_msgid
+
+import config
+import email_receiver
+import models
+
+
+def _mail(sender: str, body: str) -> bytes:
+    return f"From: {sender}\r\nSubject: Re: Hra Zrádci\r\nMessage-ID: {make_msgid()}\r\n\r\n{body}\r\n".encode()
+
+
+def _bodies(messages: list) -> list:
+    return [m['text'].strip() for m in messages]
+
+
+def test_fetch_continues_from_last_uid(game, mail_server):
+    """Stahuje se od posledního zpracovaného UID - ne podle příznaku \\Seen"""
+    inbox = mail_server.inbox(config.EMAIL_FROM)
+    for body in ("1", "2", "3"):
+        inbox.append(_mail("hrac0@example.com", body))
+
+    assert _bodies(email_receiver.fetch_unread_messages()) == ["1", "2", "3"]
+    assert models.get_imap_sync(email_receiver._sync_key()) == (inbox.uidvalidity, 3)
+
+    # Zpráva znovu označená jako nepřečtená se nestáhne, nová přečtená (např. ve webmailu) ano
+    inbox.messages[0].flags.discard("\\Seen")
+    inbox.append(_mail("hrac1@example.com", "4"))
+    inbox.messages[-1].flags.add("\\Seen")
+    assert _bodies(email_receiver.fetch_unread_messages()) == ["4"]
+    assert email_receiver.fetch_unread_messages() == []
+
+
+def test_uidvalidity_change_restarts_from_unseen(game, mail_server):
+    """Přečíslovaná schránka (nová UIDVALIDITY) - uložené UID neplatí, stahují se nepřečtené"""
+    inbox = mail_server.inbox(config.EMAIL_FROM)
+    for body in ("1", "2"):
+        inbox.append(_mail("hrac0@example.com", body))
+    email_receiver.fetch_unread_messages()
+
+    inbox.uidvalidity += 1
+    inbox.messages[1].flags.discard("\\Seen")
+    assert _bodies(email_receiver.fetch_unread_messages()) == ["2"]
+    assert models.get_imap_sync(email_receiver._sync_key()) == (inbox.uidvalidity, 2)
+
+
+def test_fetch_in_batches_with_partial_body(game, mail_server, monkeypatch):
+    """Zprávy se stahují po IMAP_FETCH_BATCH, z těla jen prvních IMAP_BODY_LIMIT bajtů"""
+    monkeypatch.setattr(config, "IMAP_FETCH_BATCH", 2)
+    monkeypatch.setattr(config, "IMAP_BODY_LIMIT", 64)
+    inbox = mail_server.inbox(config.EMAIL_FROM)
+    for i in range(5):
+        inbox.append(_mail(f"hrac{i}@example.com", f"{i + 1}\r\n" + "citace " * 100))
+
+    messages = email_receiver.fetch_unread_messages()
+    assert [m['text'].splitlines()[0] for m in messages] == ["1", "2", "3", "4", "5"]
+    assert all(len(m['text'].encode()) <= 64 for m in messages)
+    assert all("\\Seen" in m.flags for m in inbox.messages)
@@ -0,0 +1,71 @@
+import threading
+from email.message import EmailMessage
+from email.utils import make_msgid
+
+import config
+import models
+import voting
+
+
+def _vote_email(voter: str, target_id: int) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = voter
+    msg["To"] = config.EMAIL_FROM
+    msg["Subject"] = "Re: Hra Zrádci"
+    msg["Message-ID"] = make_msgid()
+    msg.set_content(str(target_id))
+    return msg.as_bytes()
+
+
+def test_duplicate_message_id_is_skipped(game, mail_server):
+    """Znovu doručený email (stejné Message-ID, nové UID) se nezapočítá podruhé"""
+    inbox = mail_server.inbox(config.EMAIL_FROM)
+    raw = _vote_email("hrac0@example.com", game[1])
+    inbox.append(raw)
+    inbox.append(raw)
+    assert voting.ingest_email_votes() == 1
+
+    inbox.append(raw)
+    assert voting.ingest_email_votes() == 0
+
+    assert len(models.get_inbound_messages(limit=10)) == 1
+    assert len(models.get_votes(1, models.get_game_state()['phase'])) == 1
+    assert all("\\Seen" in message.flags for message in inbox.messages)
+
+
+def test_concurrent_ingest_counts_message_once(game, monkeypatch):
+    """Dva souběžné příjmy stejného emailu (např. 'watch' a 'ingest') - započítá se jen jeden"""
+    message = {"from": "hrac0@example.com", "subject": "Re: Hra Zrádci", "text": str(game[1]), "key": "<1@test>"}
+    barrier = threading.Barrier(2)
+    get_processed_inbound = models.get_processed_inbound
+
+    def racing(keys):
+        # Obě vlákna se po kontrole deníku počkají - bez zámku by obě viděla email jako nezpracovaný
+        processed = get_processed_inbound(keys)
+        try:
+            barrier.wait(0.5)
+        except threading.BrokenBarrierError:
+            pass
+        return processed
+
+    monkeypatch.setattr(models, "get_processed_inbound", racing)
+    results, errors = [], []
+
+    def ingest():
+        try:
+            results.append(voting.ingest_email_votes([dict(message)]))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            models.close_db()
+
+    threads = [threading.Thread(target=ingest) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == []
+    assert sorted(results) == [0, 1]
+    assert len(models.get_inbound_messages(limit=10)) == 1
+    assert len(models.get_votes(1, config.PHASE_DAY_VOTE)) == 1
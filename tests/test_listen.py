@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+import config
+import devmail
+import email_receiver
+
+
+def _wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def listener(game, mail_server, monkeypatch):
+    """Spuštění email_receiver.listen ve vlákně - vrací seznam přijatých dávek"""
+    monkeypatch.setattr(config, "IMAP_IDLE_TIMEOUT", 30)
+    batches, stop = [], threading.Event()
+    handler = {"process": batches.append}
+    thread = threading.Thread(target=email_receiver.listen, args=(lambda msgs: handler["process"](msgs), stop))
+    thread.start()
+    yield batches, handler
+    stop.set()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def _mail(sender: str, body: str) -> bytes:
+    return f"From: {sender}\r\nSubject: Re: Hra Zrádci\r\nMessage-ID: <{body}@test>\r\n\r\n{body}\r\n".encode()
+
+
+def test_idle_delivers_new_mail_without_polling(mail_server, listener):
+    """Nová zpráva přijde hned po ohlášení serverem, ne až po IMAP_IDLE_TIMEOUT"""
+    batches, _ = listener
+    inbox = mail_server.inbox(config.EMAIL_FROM)
+    time.sleep(0.2)  # Naslouchání už čeká v IDLE
+
+    started = time.monotonic()
+    inbox.append(_mail("hrac0@example.com", "3"))
+    assert _wait_for(lambda: sum(len(b) for b in batches) == 1, timeout=3)
+    assert time.monotonic() - started < 1
+    assert _wait_for(lambda: all("\\Seen" in m.flags for m in inbox.messages))
+
+
+def test_listener_survives_failed_processing(mail_server, listener, monkeypatch):
+    """Chyba zpracování neukončí naslouchání - zpráva zůstane nepřečtená a zpracuje se znovu"""
+    monkeypatch.setattr(config, "IMAP_RECONNECT_MAX", 0.1)
+    batches, handler = listener
+    inbox = mail_server.inbox(config.EMAIL_FROM)
+    failures = []
+
+    def flaky(msgs):
+        if not failures:
+            failures.append(msgs)
+            raise RuntimeError("databáze je zamčená")
+        batches.append(msgs)
+
+    handler["process"] = flaky
+    inbox.append(_mail("hrac0@example.com", "4"))
+
+    assert _wait_for(lambda: len(batches) == 1)
+    assert len(failures) == 1
+    assert [m['key'] for m in batches[0]] == ["<4@test>"]
+    assert _wait_for(lambda: all("\\Seen" in m.flags for m in inbox.messages))
+
+
+@pytest.mark.parametrize("early", [
+    b"* 1 EXISTS\r\n+ idling\r\n",
+    b"* OK Still here\r\n+ idling\r\n* 1 EXISTS\r\n",
+])
+def test_idle_notification_around_continuation(mail_server, monkeypatch, early):
+    """Ohláška před '+' i ohláška ve stejném paketu jako '+' (v bufferu imaplib) se pozná hned"""
+    def idle(self, tag):
+        self.wfile.write(early)
+        self.wfile.flush()
+        self.read_line()  # DONE
+        self.send_line(f"{tag} OK IDLE hotovo")
+        return True
+
+    monkeypatch.setattr(devmail.IMAPHandler, "_idle", idle)
+    with email_receiver.connect() as imap:
+        imap.login(config.EMAIL_FROM, config.EMAIL_PASSWORD)
+        email_receiver._select_inbox(imap)
+        started = time.monotonic()
+        assert email_receiver._idle(imap, 10, threading.Event())
+        assert time.monotonic() - started < 1
+        imap.noop()
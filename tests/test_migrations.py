@@ -0,0 +1,41 @@
+import config
+import models
+
+
+def test_upgrade_baseline_database(db):
+    """Databáze z doby před migracemi (bez schema_version) se doplní na aktuální schéma i s daty"""
+    with models.get_db() as conn:
+        cur = conn.cursor()
+        models._migration_base_schema(cur)
+        cur.executemany("INSERT INTO players (name, email) VALUES (?, ?)", [
+            ("Alice", "alice@example.com"),
+            ("Bob", "bob@example.com"),
+            ("Cyril", "cyril@example.com"),
+        ])
+        cur.execute("INSERT INTO game_state (id, phase, started) VALUES (1, ?, 1)", (config.PHASE_DAY_VOTE,))
+        # Starší verze ukládala při změně hlasu nový řádek
+        cur.executemany(
+            "INSERT INTO votes (voter_id, target_id, round_number, phase) VALUES (?, ?, 1, ?)",
+            [(1, 2, config.PHASE_DAY_VOTE), (1, 3, config.PHASE_DAY_VOTE)]
+        )
+        conn.commit()
+
+    assert models.get_schema_version() == 0
+    assert models.init_db() == [version for version, _, _ in models.MIGRATIONS]
+    assert models.get_schema_version() == models.MIGRATIONS[-1][0]
+    assert models.init_db() == []
+
+    assert [p['name'] for p in models.get_all_players()] == ["Alice", "Bob", "Cyril"]
+    assert models.get_game_state()['phase'] == config.PHASE_DAY_VOTE
+    assert models.count_votes(1, config.PHASE_DAY_VOTE) == [(3, 1)]
+
+
+def test_vote_queries_use_indexes(game):
+    """Dotazy na hlasy jedné fáze jdou přes složený index, ne přes celou tabulku"""
+    with models.get_db() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM votes WHERE game_id = ? AND round_number = ? AND phase = ?",
+            (models.current_game(), 1, config.PHASE_DAY_VOTE)
+        ).fetchall()
+    assert plan and all(row[3].startswith("SEARCH votes USING") for row in plan)
+    assert models.get_schema_version() == models.MIGRATIONS[-1][0]
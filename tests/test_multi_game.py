@@ -0,0 +1,71 @@
+import contextlib
+import io
+
+import pytest
+
+import config
+import models
+import voting
+
+
+@pytest.fixture
+def second_game(game):
+    """Hra 2 ve fázi denního hlasování - hrac0 hraje obě hry, ostatní jen hru 2"""
+    with models.use_game(2), contextlib.redirect_stdout(io.StringIO()):
+        ids = [models.add_player("Hráč 0", "hrac0@example.com")]
+        ids += [models.add_player(f"Hráčka {i}", f"hracka{i}@example.com") for i in range(1, 8)]
+        models.init_game_state()
+        models.update_game_phase(config.PHASE_DAY_VOTE)
+    return ids
+
+
+def _message(sender: str, text: str, subject: str = "Re: Hra Zrádci") -> dict:
+    return {"from": sender, "subject": subject, "text": text, "key": None}
+
+
+def _votes(game_id: int) -> list:
+    with models.use_game(game_id):
+        return [(v['voter_id'], v['target_id']) for v in models.get_votes(1, config.PHASE_DAY_VOTE)]
+
+
+def test_games_are_isolated(game, second_game):
+    """Hráči, hlasy i stav jedné hry nejsou vidět z druhé"""
+    with models.use_game(2):
+        assert [p['id'] for p in models.get_all_players()] == second_game
+        assert models.get_player(game[1]) is None
+        models.update_game_phase(config.PHASE_DAY_DISCUSSION)
+    assert models.get_game_state()['phase'] == config.PHASE_DAY_VOTE
+
+
+def test_email_votes_are_routed_to_their_game(game, second_game):
+    """Hlas jde do hry podle tagu '#ID' v předmětu, jinak do jediné hry odesílatele"""
+    recorded = voting.ingest_email_votes([
+        _message("hracka1@example.com", str(second_game[2])),
+        _message("hrac0@example.com", str(second_game[3]), "Re: Hra Zrádci #2"),
+        _message("hrac0@example.com", str(game[3])),
+        _message("hrac1@example.com", str(game[2])),
+    ])
+
+    assert recorded == 4
+    assert sorted(_votes(1)) == [(game[0], game[3]), (game[1], game[2])]
+    assert sorted(_votes(2)) == [(second_game[0], second_game[3]), (second_game[1], second_game[2])]
+
+
+def test_vote_for_player_of_other_game_is_rejected(game, second_game):
+    """Číslo hráče z jiné hry neplatí - hlas se nezapíše do žádné hry"""
+    assert voting.ingest_email_votes([_message("hracka1@example.com", str(game[2]))]) == 0
+    assert _votes(1) == [] and _votes(2) == []
+
+
+def test_ambiguous_sender_without_tag_is_rejected(game, second_game):
+    """Hráč více her mimo výchozí hru musí uvést '#ID' - jinak se hlas nezapočítá"""
+    with models.use_game(3), contextlib.redirect_stdout(io.StringIO()):
+        third = [models.add_player("Hráčka 1", "hracka1@example.com")]
+        third += [models.add_player(f"Host {i}", f"host{i}@example.com") for i in range(7)]
+        models.init_game_state()
+        models.update_game_phase(config.PHASE_DAY_VOTE)
+
+    assert voting.ingest_email_votes([_message("hracka1@example.com", str(second_game[2]))]) == 0
+    assert _votes(2) == []
+    with models.use_game(3):
+        assert models.get_votes(1, config.PHASE_DAY_VOTE) == []
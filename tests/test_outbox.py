@@ -0,0 +1,76 @@
+import socket
+import time
+
+import pytest
+
+import config
+import game_engine
+import mailer
+import models
+
+
+@pytest.mark.parametrize("reply, status", [
+    ("451 4.7.1 Greylisted, try again later", models.OUTBOX_PENDING),
+    ("550 5.1.1 No such user", models.OUTBOX_DEAD),
+])
+def test_refused_recipient(game, mail_server, reply, status):
+    """Dočasně odmítnutý příjemce (4xx) zůstane ve frontě, trvale odmítnutý (5xx) skončí v dead-letter"""
+    mail_server.refuse["hrac1@example.com"] = reply
+    models.enqueue_messages([(f"hrac{i}@example.com", "🌙 Padla noc.") for i in range(3)], "Hra Zrádci")
+
+    result = mailer.deliver_pending()
+
+    assert result["sent"] == 2
+    assert len(mail_server.inbox("hrac0@example.com").messages) == 1
+    refused = models.get_outbox_messages(status)
+    assert [(m.recipient, m.attempts) for m in refused] == [("hrac1@example.com", 1)]
+    assert reply[:3] in refused[0].last_error
+    assert mail_server.inbox("hrac1@example.com").messages == []
+
+
+def test_greylisted_recipient_is_delivered_on_retry(game, mail_server):
+    """Po dočasném odmítnutí se email doručí dalším pokusem"""
+    mail_server.refuse["hrac1@example.com"] = "451 4.7.1 Greylisted, try again later"
+    models.enqueue_messages([("hrac1@example.com", "🌙 Padla noc.")], "Hra Zrádci")
+    assert mailer.deliver_pending()["retry"] == 1
+
+    del mail_server.refuse["hrac1@example.com"]
+    with models.get_db() as conn:
+        conn.execute("UPDATE outbox SET next_attempt_at = 0")
+        conn.commit()
+    assert mailer.deliver_pending()["sent"] == 1
+
+    [message] = models.get_outbox_messages(models.OUTBOX_SENT)
+    assert message.attempts == 2
+    assert len(mail_server.inbox("hrac1@example.com").messages) == 1
+
+
+def test_transition_does_not_wait_for_smtp(players, commentary, mail_server):
+    """Výchozí MAIL_DELIVERY=worker: přechod emaily jen zapíše, doručí je až mailer"""
+    assert config.MAIL_DELIVERY == "worker"
+    game_engine.start_game()
+
+    assert mail_server.smtp_transactions == 0
+    assert models.get_outbox_stats() == {models.OUTBOX_PENDING: 16}
+
+    assert mailer.deliver_pending()["sent"] == 16
+    assert mail_server.smtp_transactions > 0
+
+
+def test_unresponsive_smtp_times_out(game, mail_server, monkeypatch):
+    """Server, který přijme spojení a mlčí, neudrží doručování déle než SMTP_TIMEOUT"""
+    silent = socket.create_server(("127.0.0.1", 0))
+    monkeypatch.setattr(config, "SMTP_PORT", silent.getsockname()[1])
+    monkeypatch.setattr(config, "SMTP_TIMEOUT", 0.2)
+    models.enqueue_messages([("hrac0@example.com", "🌙 Padla noc.")], "Hra Zrádci")
+
+    started = time.monotonic()
+    try:
+        result = mailer.deliver_pending()
+    finally:
+        silent.close()
+
+    assert time.monotonic() - started < 2
+    assert result["retry"] == 1
+    [message] = models.get_outbox_messages(models.OUTBOX_PENDING)
+    assert message.attempts == 1
@@ -0,0 +1,69 @@
+import contextlib
+import io
+import sqlite3
+import threading
+
+import pytest
+
+import config
+import models
+
+
+@pytest.fixture
+def sqlite_game(tmp_path):
+    """Hra v SQLite souboru (WAL) - snapshot potřebuje skutečné souběžné čtení a zápis"""
+    with models.use_storage(models.SQLiteStorage(str(tmp_path / "storage.db"))):
+        models.init_db()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ids = [models.add_player(f"Hráč {i}", f"hrac{i}@example.com") for i in range(8)]
+        models.init_game_state()
+        models.update_game_phase(config.PHASE_DAY_VOTE)
+        yield ids
+        models.close_db()
+
+
+def _in_thread(target):
+    """Zápis z jiného vlákna (vlastní připojení), jako 'zradci vote' vedle 'watch'"""
+    errors = []
+
+    def run():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            models.close_db()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive() and errors == []
+
+
+def test_snapshot_is_consistent_and_does_not_block_writers(sqlite_game):
+    """Čtení uvnitř read_snapshot() vidí stav ze začátku bloku, souběžný zápis neblokuje"""
+    phase = config.PHASE_DAY_VOTE
+    with models.read_snapshot():
+        assert models.get_game_state()['phase'] == phase
+
+        def write():
+            models.add_vote(sqlite_game[0], sqlite_game[1], 1, phase)
+            models.update_game_phase(config.PHASE_DAY_RESULT)
+
+        _in_thread(write)
+
+        assert models.get_game_state()['phase'] == phase
+        assert models.count_votes(1, phase) == []
+
+    assert models.get_game_state()['phase'] == config.PHASE_DAY_RESULT
+    assert models.count_votes(1, phase) == [(sqlite_game[1], 1)]
+
+
+def test_snapshot_is_read_only(sqlite_game):
+    """Zápis uvnitř snapshotu skončí chybou a nic nezmění"""
+    with models.read_snapshot():
+        assert models.is_read_only()
+        with pytest.raises(sqlite3.OperationalError):
+            models.update_game_phase(config.PHASE_DAY_RESULT)
+    assert not models.is_read_only()
+    assert models.get_game_state()['phase'] == config.PHASE_DAY_VOTE
@@ -0,0 +1,54 @@
+import pytest
+
+import config
+import game_engine
+import models
+
+
+def _fail(*args, **kwargs):
+    raise RuntimeError("pád uprostřed přechodu")
+
+
+def test_failed_start_leaves_no_trace(players, commentary, monkeypatch):
+    """Chyba na konci přechodu vrátí i zápisy, které jí předcházely (stav, role, události)"""
+    monkeypatch.setattr(models, "enqueue_messages", _fail)
+    with pytest.raises(RuntimeError):
+        game_engine.start_game()
+
+    assert models.get_game_state() is None
+    assert all(p['role'] is None for p in models.get_all_players())
+    assert models.get_events() == []
+    assert commentary == []
+
+
+def test_failed_next_phase_rolls_back(players, commentary, monkeypatch):
+    """Neúspěšný přechod nechá hru ve fázi před přechodem, bez událostí a emailů"""
+    game_engine.start_game()
+    events = len(models.get_events())
+    outbox = models.get_outbox_stats()
+
+    with monkeypatch.context() as m:
+        m.setattr(models, "enqueue_messages", _fail)
+        with pytest.raises(RuntimeError):
+            game_engine.next_phase()
+
+    state = models.get_game_state()
+    assert (state['phase'], state['round_number']) == (config.PHASE_INIT, 1)
+    assert len(models.get_events()) == events
+    assert models.get_outbox_stats() == outbox
+
+    game_engine.next_phase()
+    assert models.get_game_state()['phase'] == config.PHASE_NIGHT_TRAITOR_CHAT
+
+
+def test_commentary_only_for_moderated_events(players, commentary):
+    """Komentář moderátora dostanou jen události s moderator=True (ne přidělení rolí a start)"""
+    game_engine.start_game()
+    assert commentary == []
+    assert {e['event_type']: e['moderator_note'] for e in models.get_events()} == {
+        "roles_assigned": "", "game_started": "",
+    }
+
+    game_engine.next_phase()
+    assert len(commentary) == 1
+    assert models.get_events()[-1]['moderator_note'] == "Komentář moderátora"
@@ -0,0 +1,36 @@
+import config
+import models
+import voting
+
+
+def test_changed_vote_updates_tally(game):
+    """Změna hlasu přepíše předchozí hlas a vote_tally odpovídá tabulce votes"""
+    voting.vote(game[0], game[1])
+    voting.vote(game[2], game[1])
+    voting.vote(game[0], game[3])
+    voting.vote(game[3], game[2])
+    voting.vote(game[3], game[1])
+
+    with models.get_db() as conn:
+        expected = conn.execute(
+            """
+            SELECT target_id, COUNT(*) FROM votes
+            WHERE game_id = ? AND round_number = 1 AND phase = ?
+            GROUP BY target_id ORDER BY COUNT(*) DESC, target_id
+            """,
+            (models.current_game(), config.PHASE_DAY_VOTE)
+        ).fetchall()
+    assert models.count_votes(1, config.PHASE_DAY_VOTE) == [tuple(row) for row in expected]
+    assert models.count_votes(1, config.PHASE_DAY_VOTE) == [(game[1], 2), (game[3], 1)]
+    assert len(models.get_votes(1, config.PHASE_DAY_VOTE)) == 3
+
+
+def test_bulk_votes_and_reset_keep_tally(game):
+    """Hromadný zápis (i s přepsáním hlasu) a smazání hry udržují vote_tally"""
+    phase = config.PHASE_DAY_VOTE
+    models.add_votes_bulk([(game[0], game[1], 1, phase), (game[1], game[2], 1, phase), (game[0], game[2], 1, phase)])
+    assert models.count_votes(1, phase) == [(game[2], 2)]
+
+    models.reset_game()
+    with models.get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM vote_tally").fetchone()[0] == 0
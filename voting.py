@@ -1,34 +1,33 @@
+import re
+from typing import List, Optional, Tuple
 import models
 import config
+from schemas import Vote
 
 
-def vote(voter_id: int, target_id: int):
-    """🗳️  Zadání hlasu"""
-    state = models.get_game_state()
+def validate_vote(voter_id: int, target_id: int, state: Optional[dict] = None) -> Optional[str]:
+    """Ověření hlasu podle pravidel aktuální fáze - vrací chybovou hlášku, nebo None pokud je hlas platný"""
+    if state is None:
+        state = models.get_game_state()
 
     if not state or not state['started']:
-        print("[red]❌ Hra ještě nezačala![/red]")
-        return
+        return "[red]❌ Hra ještě nezačala![/red]"
 
     if state['finished']:
-        print("[red]❌ Hra již skončila![/red]")
-        return
+        return "[red]❌ Hra již skončila![/red]"
 
     # Ověření hráčů
     voter = models.get_player(voter_id)
     target = models.get_player(target_id)
 
     if not voter or not target:
-        print("[red]❌ Neplatné ID hráče![/red]")
-        return
+        return "[red]❌ Neplatné ID hráče![/red]"
 
     if not voter['alive']:
-        print(f"[red]❌ {voter['name']} je eliminován a nemůže hlasovat![/red]")
-        return
+        return f"[red]❌ {voter['name']} je eliminován a nemůže hlasovat![/red]"
 
     if not target['alive']:
-        print(f"[red]❌ {target['name']} je eliminován a nelze na něj hlasovat![/red]")
-        return
+        return f"[red]❌ {target['name']} je eliminován a nelze na něj hlasovat![/red]"
 
     # Kontrola typu hlasování podle fáze
     phase = state['phase']
@@ -37,35 +36,27 @@ def vote(voter_id: int, target_id: int):
     if phase == config.PHASE_NIGHT_VOTE:
         # Pouze zrádci mohou hlasovat v noci
         if voter['role'] != config.ROLE_TRAITOR:
-            print(f"[red]❌ {voter['name']} není zrádce a nemůže hlasovat v noci![/red]")
-            return
+            return f"[red]❌ {voter['name']} není zrádce a nemůže hlasovat v noci![/red]"
         # Nemohou hlasovat pro jiného zrádce
         if target['role'] == config.ROLE_TRAITOR:
-            print(f"[red]❌ Nelze hlasovat pro spoluzrádce![/red]")
-            return
+            return "[red]❌ Nelze hlasovat pro spoluzrádce![/red]"
 
     elif phase == config.PHASE_NIGHT_REVOTE:
         # V opakovaném nočním hlasování mohou hlasovat pouze zrádci
         if voter['role'] != config.ROLE_TRAITOR:
-            print(f"[red]❌ {voter['name']} není zrádce a nemůže hlasovat v noci![/red]")
-            return
+            return f"[red]❌ {voter['name']} není zrádce a nemůže hlasovat v noci![/red]"
 
         # Musí hlasovat pouze pro kandidáty z remíze
-        previous_votes = models.count_votes(round_num, config.PHASE_NIGHT_VOTE)
-        if previous_votes:
-            max_votes = previous_votes[0][1]
-            tied_candidate_ids = [player_id for player_id, count in previous_votes if count == max_votes]
-
+        _, tied_candidate_ids = models.get_vote_leaders(round_num, config.PHASE_NIGHT_VOTE)
+        if tied_candidate_ids:
             # Target musí být v remíze
             if target_id not in tied_candidate_ids:
                 tied_names = [models.get_player(pid)['name'] for pid in tied_candidate_ids]
-                print(f"[red]❌ Můžete hlasovat pouze pro kandidáty z remíze: {', '.join(tied_names)}[/red]")
-                return
+                return f"[red]❌ Můžete hlasovat pouze pro kandidáty z remíze: {', '.join(tied_names)}[/red]"
 
         # Stále nemohou hlasovat pro jiného zrádce
         if target['role'] == config.ROLE_TRAITOR:
-            print(f"[red]❌ Nelze hlasovat pro spoluzrádce![/red]")
-            return
+            return "[red]❌ Nelze hlasovat pro spoluzrádce![/red]"
 
     elif phase == config.PHASE_DAY_VOTE:
         # Všichni živí mohou hlasovat
@@ -74,26 +65,139 @@ def vote(voter_id: int, target_id: int):
     elif phase == config.PHASE_DAY_REVOTE:
         # V opakovaném hlasování mohou hlasovat pouze ti, kteří NEJSOU v remíze
         # Zjistíme, kdo je v remíze z předchozího hlasování
-        previous_votes = models.count_votes(round_num, config.PHASE_DAY_VOTE)
-        if previous_votes:
-            max_votes = previous_votes[0][1]
-            tied_player_ids = [player_id for player_id, count in previous_votes if count == max_votes]
-
+        _, tied_player_ids = models.get_vote_leaders(round_num, config.PHASE_DAY_VOTE)
+        if tied_player_ids:
             # Voter nesmí být v remíze
             if voter_id in tied_player_ids:
-                print(f"[red]❌ {voter['name']} je v remíze a nemůže hlasovat![/red]")
-                return
+                return f"[red]❌ {voter['name']} je v remíze a nemůže hlasovat![/red]"
 
             # Target musí být v remíze
             if target_id not in tied_player_ids:
                 tied_names = [models.get_player(pid)['name'] for pid in tied_player_ids]
-                print(f"[red]❌ Můžete hlasovat pouze pro hráče v remíze: {', '.join(tied_names)}[/red]")
-                return
+                return f"[red]❌ Můžete hlasovat pouze pro hráče v remíze: {', '.join(tied_names)}[/red]"
 
     else:
-        print(f"[red]❌ Nyní není fáze hlasování! Aktuální fáze: {phase}[/red]")
+        return f"[red]❌ Nyní není fáze hlasování! Aktuální fáze: {phase}[/red]"
+
+    return None
+
+
+def vote(voter_id: int, target_id: int):
+    """🗳️  Zadání hlasu"""
+    state = models.get_game_state()
+
+    error = validate_vote(voter_id, target_id, state)
+    if error:
+        print(error)
         return
 
     # Zaznamenání hlasu
-    models.add_vote(voter_id, target_id, round_num, phase)
+    models.add_vote(voter_id, target_id, state['round_number'], state['phase'])
+    voter = models.get_player(voter_id)
+    target = models.get_player(target_id)
     print(f"[green]✅ Hlas zaznamenán: {voter['name']} → {target['name']}[/green]")
+
+
+def vote_bulk(ballots: List[Tuple[int, int]], messages: Optional[List[Vote]] = None) -> int:
+    """
+    🗳️  Ověření a hromadné zadání hlasů [(voter_id, target_id), ...] v jedné transakci
+
+    S `messages` (emaily, ze kterých hlasy pocházejí - stejné pořadí) se ve stejné
+    transakci zapíše i deník příchozích emailů, včetně důvodu odmítnutí - volající
+    (ingest_email_votes) ověřuje, že v deníku ještě nejsou, ve stejné transakci.
+    """
+    with models.transaction():
+        state = models.get_game_state()
+
+        valid = []
+        journal = []
+        for index, (voter_id, target_id) in enumerate(ballots):
+            error = validate_vote(voter_id, target_id, state)
+            if error:
+                print(error)
+            else:
+                valid.append((voter_id, target_id, state['round_number'], state['phase']))
+            if messages and messages[index].message_key:
+                journal.append(_journal_entry(messages[index], models.current_game(), voter_id, target_id, error))
+
+        recorded = models.add_votes_bulk(valid)
+        models.record_inbound(journal)
+
+    if recorded:
+        print(f"[green]✅ Zaznamenáno hlasů: {recorded}[/green]")
+    return recorded
+
+
+def _journal_entry(
+    message: Vote, game_id: Optional[int], voter_id: Optional[int], target_id: Optional[int], error: Optional[str]
+) -> tuple:
+    """Řádek deníku příchozích emailů pro models.record_inbound"""
+    status = models.INBOUND_REJECTED if error else models.INBOUND_APPLIED
+    # Důvod bez rich značek a ikony ("[red]❌ ...[/red]")
+    reason = re.sub(r"\[/?[a-z ]+\]", "", error).lstrip("❌ ").strip() if error else None
+    return (message.message_key, game_id, message.from_email, message.subject, voter_id, target_id, status, reason)
+
+
+def ingest_email_votes(messages: Optional[List[dict]] = None) -> int:
+    """
+    Načtení hlasů z příchozích emailů (nebo předaných `messages`) a jejich hromadné zpracování (po hrách)
+
+    Každý email se zpracuje právě jednou: výsledek (hlas, nebo důvod odmítnutí) se zapíše do deníku
+    příchozích ve stejné transakci jako hlasy a už zapsané emaily se přeskočí bez validace. Deník se
+    kontroluje uvnitř té transakce (pod zámkem pro zápis), takže ani souběžné příjmy nezapočítají email dvakrát.
+    """
+    from email_receiver import count_email_votes, fetch_unread_messages
+
+    if messages is None:
+        # Emaily se označí jako přečtené až po zápisu - po pádu se stáhnou znovu a deník je přeskočí
+        recorded = 0
+
+        def process(batch):
+            nonlocal recorded
+            recorded += ingest_email_votes(batch)
+
+        fetch_unread_messages(process=process)
+        return recorded
+
+    votes = count_email_votes(messages)
+
+    # Kontrola deníku až pod zámkem pro zápis (BEGIN IMMEDIATE) - druhý souběžný příjem počká na commit
+    recorded = 0
+    with models.transaction():
+        processed = models.get_processed_inbound([v.message_key for v in votes if v.message_key])
+
+        ballots_by_game = {}
+        rejected = []
+        for v in votes:
+            if v.message_key:
+                if v.message_key in processed:
+                    print(f"⏭️  Email z '{v.from_email[:30]}...' už byl zpracován")
+                    continue
+                processed.add(v.message_key)
+
+            game_id = v.game_id
+            if game_id is None:
+                print(f"❌ Email z '{v.from_email[:30]}...' nepatří do žádné rozehrané hry")
+                if v.message_key:
+                    rejected.append(_journal_entry(v, None, None, None, "Email nepatří do žádné rozehrané hry"))
+                continue
+
+            with models.use_game(game_id):
+                voter_id, target_id = v.from_player_id, v.for_player_id
+
+            # Logování pro debug
+            if voter_id and target_id:
+                print(f"✅ Platný hlas (hra {game_id}): hráč ID {voter_id} → cíl ID {target_id}")
+                ballots_by_game.setdefault(game_id, []).append((v, voter_id, target_id))
+            else:
+                print(f"❌ Neplatný hlas z '{v.from_email[:30]}...' (hráč: {voter_id}, cíl: {target_id})")
+                if v.message_key:
+                    reason = "Neznámý odesílatel" if not voter_id else "V emailu chybí číslo hráče"
+                    rejected.append(_journal_entry(v, game_id, voter_id, target_id, reason))
+
+        models.record_inbound(rejected)
+
+        for game_id, items in ballots_by_game.items():
+            with models.use_game(game_id):
+                recorded += vote_bulk([(voter_id, target_id) for _, voter_id, target_id in items], [v for v, _, _ in items])
+    return recorded